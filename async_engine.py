@@ -0,0 +1,349 @@
+import asyncio
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from midi_processing import resolve_msg, track_key, tune_current_thread, count_gated, release_all_held_keys, can_press, dispatch_ui, count_resolved, count_unresolved, playback_summary
+from midi_stream import open_midi_stream, schedule_events, compile_song
+from loop_region import LoopedEvents, loop_active
+from net_midi import open_midi_input, NET_INPUT_NAME
+from device_monitor import RECONNECT_TIMEOUT, FAST_SCAN_INTERVAL
+from playback_control import FINE_WAIT
+from thread_tuning import raise_timer_resolution
+from tracing import SPAN_WAIT, SPAN_RESOLVE_KEY, SPAN_KEY_LOCK, SPAN_EMIT
+from utils import press_keys_for_midi, midi_to_note_name
+
+
+def _resolve(fut):
+    if not fut.done(): fut.set_result(None)
+
+
+class RealClock:
+    virtual = False
+    now = staticmethod(time.perf_counter)
+
+    def sleep(self, loop, delay):
+        """Future that resolves after `delay` seconds. The engine may resolve it early to wake the sleeper.
+
+        Loop timers can fire up to one OS timer tick early, so callers waiting
+        for a deadline sleep until FINE_WAIT before it and finish with `fine_wait`.
+        """
+        fut = loop.create_future()
+        loop.call_later(delay, _resolve, fut)
+        return fut
+
+    def fine_wait(self, delay):
+        time.sleep(delay)
+
+
+class VirtualClock:
+    """Deterministic clock for tests and offline runs: sleeping jumps straight to the deadline.
+
+    The engine drains its output queue before every virtual sleep, so keys go
+    out at the virtual time they were scheduled for.
+    """
+    virtual = True
+
+    def __init__(self, start=0.0):
+        self.t = start
+
+    def now(self):
+        return self.t
+
+    def sleep(self, loop, delay):
+        self.t += max(0.0, delay)
+        fut = loop.create_future()
+        fut.set_result(None)
+        return fut
+
+
+class AsyncEngine:
+    """Engine core on a single asyncio loop running on one thread.
+
+    File playback deadlines, live MIDI input, control commands and key output
+    are all tasks on the same loop, so they are ordered by the loop instead of
+    by shared flags between threads. Blocking work (opening ports and files,
+    injecting keys) goes to one I/O thread through `run_in_executor`.
+
+    Exposes the same send/poll_events/is_alive/close surface as EngineProcess,
+    so the app drives either one the same way. Playback state stays owned by
+    `app.playback`; its listener forwards pause/resume/stop here.
+    """
+
+    def __init__(self, app, clock=None, press=press_keys_for_midi):
+        self.app = app
+        self.clock = clock or RealClock()
+        self.press = press
+        self.loop = asyncio.new_event_loop()
+        self.io = ThreadPoolExecutor(max_workers=1, thread_name_prefix="engine-io")
+        self.commands = None
+        self.output = None
+        self.paused = False
+        self.file_task = None
+        self.live_task = None
+        self._sleeper = None
+        self._ready = threading.Event()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+        self._ready.wait()
+
+    # --- Thread-safe handle used by the app ---
+    def send(self, cmd, *args):
+        try:
+            self.loop.call_soon_threadsafe(self.commands.put_nowait, (cmd, args))
+        except RuntimeError:
+            pass  # loop already closed
+
+    def poll_events(self):
+        # UI updates are posted straight to the Tk thread with app.after
+        return ()
+
+    def poll_stats(self):
+        # Runs in the app's process and counts into the app's own stats
+        return ()
+
+    def is_alive(self):
+        return self.thread.is_alive()
+
+    def close(self):
+        self.send("quit")
+        self.thread.join(timeout=1.0)
+
+    # --- Loop thread ---
+    def _run(self):
+        asyncio.set_event_loop(self.loop)
+        # Loop timers are only as fine as the OS tick
+        if not self.clock.virtual: raise_timer_resolution()
+        try:
+            self.loop.run_until_complete(self._main())
+        finally:
+            self.loop.close()
+
+    async def _main(self):
+        self.commands = asyncio.Queue()
+        self.output = asyncio.Queue()
+        self._ready.set()
+        writer = asyncio.create_task(self._output_worker())
+        while True:
+            cmd, args = await self.commands.get()
+            if cmd == "quit": break
+            try:
+                self.handle(cmd, args)
+            except Exception as e:
+                self.app.log(f"Engine command '{cmd}' failed: {e}")
+
+        tasks = [t for t in (self.file_task, self.live_task, writer) if t]
+        for t in tasks: t.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self.io.shutdown(wait=False)
+
+    def handle(self, cmd, args):
+        if cmd == "play":
+            if self.file_task: self.file_task.cancel()
+            self.paused = False
+            self.file_task = asyncio.create_task(self._play(*args))
+        elif cmd == "pause":
+            self.paused = True
+            self._wake()
+        elif cmd == "resume":
+            self.paused = False
+            self._wake()
+        elif cmd == "stop":
+            if self.file_task: self.file_task.cancel()
+            self.file_task = None
+        elif cmd == "live_start":
+            if self.live_task: self.live_task.cancel()
+            self.live_task = asyncio.create_task(self._live(args[0]))
+        elif cmd == "live_stop":
+            if self.live_task: self.live_task.cancel()
+            self.live_task = None
+        elif cmd == "release_keys" and not args:
+            # The app already released what is held; drop presses that haven't gone out yet
+            while not self.output.empty():
+                self.output.get_nowait()
+                self.output.task_done()
+        # "config" needs nothing: tasks read app.engine_config directly
+
+    def _wake(self):
+        if self._sleeper is not None: _resolve(self._sleeper)
+
+    async def _sleep(self, delay):
+        """Sleeps `delay` seconds (until woken, with None). Pause and resume wake it early."""
+        if self.clock.virtual: await self.output.join()
+        fut = self.loop.create_future() if delay is None else self.clock.sleep(self.loop, delay)
+        self._sleeper = fut
+        try:
+            await fut
+        finally:
+            self._sleeper = None
+
+    async def _play(self, source, session, start=0.0):
+        app = self.app
+        clock = self.clock
+        mid = None
+        completed = False
+        try:
+            if isinstance(source, str) and (start > 0 or loop_active(app.engine_config)):
+                source = await self.loop.run_in_executor(self.io, compile_song, source)
+            if isinstance(source, str):
+                mid = await self.loop.run_in_executor(self.io, open_midi_stream, source)
+                events = mid
+            else:
+                events = LoopedEvents(source, lambda: app.engine_config, start)
+
+            tune_current_thread(app)
+            lateness = app.latency
+            lateness.reset()
+            app.frame_output.stats.reset()
+            tracer = app.tracer
+
+            base = clock.now()
+            song_t = start
+            looped = mid is None
+            rate = (lambda: app.engine_config.speed * events.rate) if looped else (lambda: app.engine_config.speed)
+            for offset, msg in schedule_events(events, rate):
+                tracing = tracer.enabled
+                if tracing: t0 = time.perf_counter()
+                while True:
+                    if self.paused:
+                        paused_at = clock.now()
+                        await self._sleep(None)
+                        base += clock.now() - paused_at
+                        continue
+                    remaining = base + offset - clock.now()
+                    if remaining <= 0: break
+                    if remaining > FINE_WAIT or clock.virtual:
+                        await self._sleep(remaining if clock.virtual else remaining - FINE_WAIT)
+                        continue
+                    # Blocks the loop for at most FINE_WAIT, like PlaybackControl.wait
+                    clock.fine_wait(remaining)
+                    break
+                if tracing: tracer.add(SPAN_WAIT, t0, time.perf_counter())
+                lateness.add(clock.now() - base - offset)
+                song_t = events.position if looped else song_t + msg.time
+                app.position = (song_t, time.perf_counter(), events.rate if looped else 1.0)
+
+                if not can_press(app, tracing):
+                    count_gated(app, msg)
+                    continue
+                self._queue_msg(msg, 'file', session)
+            else:
+                await self.output.join()
+                completed = True
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            app.log(f"File Error: {e}")
+        finally:
+            if mid is not None: mid.close()
+            app.log(f"File task finished. {playback_summary(app)}")
+            app.after(0, lambda: app.on_file_finished(session, completed))
+
+    async def _live(self, device):
+        app = self.app
+        monitor = app.device_monitor
+        watch = device != NET_INPUT_NAME
+        inbox = asyncio.Queue()
+
+        def on_message(msg):
+            # rtmidi callback thread: stamp the recording here, hand the message to the loop
+            if app.recorder.active: app.recorder.record(msg)
+            self.loop.call_soon_threadsafe(inbox.put_nowait, msg)
+
+        def on_devices(names, added, removed):
+            # None in the inbox means "check whether our device is still there"
+            if removed: self.loop.call_soon_threadsafe(inbox.put_nowait, None)
+
+        monitor.add_listener(on_devices)
+        port = None
+        lost_at = None
+        try:
+            while True:
+                try:
+                    port = await self.loop.run_in_executor(
+                        self.io, lambda: open_midi_input(device, app.engine_config.net_buffer_ms, callback=on_message, log=app.log,
+                                                         peers=app.engine_config.net_peers))
+                except Exception:
+                    if lost_at is None or time.perf_counter() - lost_at > RECONNECT_TIMEOUT: raise
+                    await asyncio.sleep(FAST_SCAN_INTERVAL)
+                    continue
+                if lost_at is not None:
+                    app.log(f"Reconnected '{device}' after {time.perf_counter() - lost_at:.2f} s")
+                    lost_at = None
+
+                while True:
+                    msg = await inbox.get()
+                    if msg is None:
+                        if not watch or monitor.is_present(device): continue
+                        break
+                    if not can_press(app, app.tracer.enabled):
+                        count_gated(app, msg)
+                        continue
+                    self._queue_msg(msg, 'live')
+
+                self.io.submit(port.close)
+                port = None
+                lost_at = time.perf_counter()
+                await self.loop.run_in_executor(self.io, release_all_held_keys, app)
+                app.log(f"Live input '{device}' disconnected, waiting for it to return")
+                # Default executor: the I/O thread must keep serving file playback meanwhile
+                device = await self.loop.run_in_executor(None, monitor.wait_for, device, RECONNECT_TIMEOUT, lambda: app.live_running)
+                if device is None:
+                    raise RuntimeError(f"device did not return within {RECONNECT_TIMEOUT:.0f} s")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            app.log(f"Live Error: {e}")
+            app.live_running = False
+            app.after(0, app.stop_live)
+        finally:
+            monitor.remove_listener(on_devices)
+            if port is not None: self.io.submit(port.close)
+
+    def _queue_msg(self, msg, source, session=0):
+        tracer = self.app.tracer
+        tracing = tracer.enabled
+        if tracing: t0 = time.perf_counter()
+        resolved = resolve_msg(self.app.engine_config, msg)
+        if tracing: tracer.add(SPAN_RESOLVE_KEY, t0, time.perf_counter())
+        counters = self.app.counters
+        if resolved is None:
+            count_unresolved(counters, msg)
+            return
+        counters.events += 1
+        if resolved[1]: count_resolved(counters, self.app.engine_config.exact, resolved[0], resolved[2])
+        self.output.put_nowait((source, session) + resolved)
+
+    async def _output_worker(self):
+        app = self.app
+        while True:
+            source, session, note_val, is_down, keys = await self.output.get()
+            try:
+                if is_down:
+                    if app.engine_config.jitter:
+                        await asyncio.sleep(max(0, random.gauss(0.005, 0.002)))
+                    dispatch_ui(app, app.tracer.enabled, app.update_note_ui, midi_to_note_name(note_val), True)
+                else:
+                    dispatch_ui(app, app.tracer.enabled, app.update_note_ui, None, False)
+                if keys:
+                    await self.loop.run_in_executor(self.io, self._emit, source, session, is_down, keys)
+            finally:
+                self.output.task_done()
+
+    def _emit(self, source, session, is_down, keys):
+        app = self.app
+        tracer = app.tracer
+        tracing = tracer.enabled
+        if tracing: t0 = time.perf_counter()
+        with app.key_lock:
+            if tracing: tracer.add(SPAN_KEY_LOCK, t0, time.perf_counter())
+            if is_down:
+                # State may have changed while this press sat in the queue
+                if source == 'file' and (not app.playback.is_active(session) or app.playback.is_paused): return
+                if source == 'live' and not app.live_running: return
+            if tracing: t0 = time.perf_counter()
+            if app.engine_config.frame_rate: app.frame_output.submit(keys, 'down' if is_down else 'up')
+            else: app.frame_output.send_now(keys, 'down' if is_down else 'up', self.press)
+            if tracing: tracer.add(SPAN_EMIT, t0, time.perf_counter())
+            track_key(app, keys, is_down)
@@ -3,6 +3,8 @@ import customtkinter as ctk
 import json
 import os
 
+from theme_registry import ThemeRegistry
+
 ctk.set_appearance_mode("Dark")
 ctk.set_default_color_theme("dark-blue")
 
@@ -66,10 +68,12 @@ if os.path.exists(THEME_FILE):
     except:
         pass
 
-if CURRENT_THEME_NAME not in THEMES:
-    CURRENT_THEME_NAME = "Default"
+# Switching themes later goes through THEME.switch; the COLOR_* names below are kept current by it
+THEME = ThemeRegistry(THEMES, CURRENT_THEME_NAME, DEFAULT_THEMES["Default"])
+THEME.track_names(globals())
+CURRENT_THEME_NAME = THEME.name
 
-active_theme = THEMES[CURRENT_THEME_NAME]
+active_theme = THEME.colors
 
 # --- Accessible Color Palette (High Contrast) ---
 COLOR_BG = active_theme["BG"]
@@ -92,3 +96,9 @@ COLOR_BTN_DISABLED_BG = active_theme["BTN_DISABLED_BG"]
 COLOR_BTN_DISABLED_TEXT = active_theme["BTN_DISABLED_TEXT"]
 
 DEFAULT_FILENAME = "default_keymap.json"
+
+# --- Engine ---
+ENGINE_MODES = ["Threaded", "Separate Process", "Asyncio"]
+ENGINE_POLL_MS = 16
+CONTROL_HOST = "127.0.0.1"
+CONTROL_PORT = 47653
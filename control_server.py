@@ -0,0 +1,191 @@
+import json
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+from constants import CONTROL_HOST, CONTROL_PORT
+
+# How long a request thread waits for the Tk thread to run its command
+UI_TIMEOUT = 2.0
+
+
+class ControlError(Exception):
+    pass
+
+
+class ControlServer:
+    """Localhost HTTP API for stream decks, bots and scripts.
+
+        GET  /stats
+        POST /play[?file=PATH]  /pause  /resume  /stop  /seek?t=SECONDS
+        POST /transpose?delta=N | ?value=N  /profile?name=FILE
+
+    Requests are served on their own threads. Commands are handed to the Tk
+    thread with `after`, exactly like a button click, and stats only read
+    counters, so the playback thread is never touched.
+    """
+
+    def __init__(self, app, host=CONTROL_HOST, port=CONTROL_PORT):
+        self.app = app
+        self.host = host
+        self.port = port
+        self.httpd = None
+        self._last = (time.perf_counter(), 0)
+        # stats() runs on several request threads at once
+        self._last_lock = threading.Lock()
+        self.commands = {
+            "play": self._play,
+            "pause": lambda q: app.playback.pause(),
+            "resume": lambda q: app.playback.resume(),
+            "stop": lambda q: app.stop_file(),
+            "seek": self._seek,
+            "transpose": self._transpose,
+            "profile": self._profile,
+        }
+
+    def start(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                server._dispatch(self, "GET")
+
+            def do_POST(self):
+                server._dispatch(self, "POST")
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer((self.host, self.port), Handler)
+        self.httpd.daemon_threads = True
+        self.port = self.httpd.server_address[1]
+        threading.Thread(target=self.httpd.serve_forever, args=(0.5,), daemon=True).start()
+
+    def stop(self):
+        if self.httpd is None: return
+        self.httpd.shutdown()
+        self.httpd.server_close()
+        self.httpd = None
+
+    # --- Request handling (request threads) ---
+    def _dispatch(self, req, method):
+        url = urlparse(req.path)
+        name = url.path.strip("/")
+        query = {k: v[-1] for k, v in parse_qs(url.query).items()}
+        try:
+            if name == "stats" and method == "GET":
+                body = self.stats()
+            elif name in self.commands:
+                # Browsers always send Origin on cross-site POSTs; scripts don't
+                if method != "POST" or req.headers.get("Origin"):
+                    return self._reply(req, 405, {"error": "commands must be POSTed by a local client"})
+                body = {"ok": True, "result": self._run_on_ui(self.commands[name], query)}
+            else:
+                return self._reply(req, 404, {"error": f"unknown endpoint '{name}'"})
+        except ControlError as e:
+            return self._reply(req, 400, {"error": str(e)})
+        self._reply(req, 200, body)
+
+    def _reply(self, req, status, body):
+        data = json.dumps(body).encode()
+        req.send_response(status)
+        req.send_header("Content-Type", "application/json")
+        req.send_header("Content-Length", str(len(data)))
+        req.end_headers()
+        req.wfile.write(data)
+
+    def _run_on_ui(self, command, query):
+        done = threading.Event()
+        outcome = {}
+
+        def run():
+            try:
+                outcome["result"] = command(query)
+            except ControlError as e:
+                outcome["error"] = str(e)
+            except Exception as e:
+                outcome["error"] = f"{type(e).__name__}: {e}"
+            done.set()
+
+        self.app.after(0, run)
+        if not done.wait(UI_TIMEOUT):
+            raise ControlError("UI thread did not respond")
+        if "error" in outcome:
+            raise ControlError(outcome["error"])
+        return outcome.get("result")
+
+    def stats(self):
+        app = self.app
+        now = time.perf_counter()
+        counters = app.counters.snapshot()
+        # Rate since the previous stats request
+        with self._last_lock:
+            then, events_then = self._last
+            self._last = (now, counters["events"])
+        while True:
+            try:
+                held = sorted(app.held_keys)
+                break
+            except RuntimeError:
+                continue  # set changed size while copying
+        cfg = app.engine_config
+        return {
+            "state": app.playback.state,
+            "live": app.live_running,
+            "file": getattr(app, "current_midi_file", None),
+            "profile": app.current_filename,
+            "transpose": cfg.transpose,
+            "speed": cfg.speed,
+            "events": counters["events"],
+            "dropped_notes": counters["dropped"],
+            "note_outcomes": counters["notes"],
+            "frame_output": app.frame_output.stats.snapshot() if cfg.frame_rate else None,
+            "events_per_sec": round(max(0, counters["events"] - events_then) / (now - then), 1) if now > then else 0.0,
+            "held_keys": held,
+            "latency_ms": {("max" if p == 100 else f"p{p}"): round(v * 1000, 3) for p, v in app.latency.percentiles().items()},
+            "latency_samples": min(app.latency.count, app.latency.capacity),
+        }
+
+    # --- Commands (Tk thread) ---
+    def _play(self, query):
+        path = query.get("file")
+        if path:
+            if not os.path.isfile(path): raise ControlError(f"no such file '{path}'")
+            self.app.play_path(path)
+        else:
+            self.app.start_file()
+        return self.app.playback.state
+
+    def _seek(self, query):
+        self.app.seek_file(_number(query, "t", float))
+
+    def _transpose(self, query):
+        app = self.app
+        if "value" in query:
+            delta = _number(query, "value", int) - app.transpose_var.get()
+        else:
+            delta = _number(query, "delta", int)
+        app.change_transpose(delta)
+        return app.engine_config.transpose
+
+    def _profile(self, query):
+        name = query.get("name")
+        if not name: raise ControlError("missing 'name'")
+        # Only profiles the app lists: the loaded file becomes the one the editor saves over
+        if os.sep in name or "/" in name or (os.altsep and os.altsep in name):
+            raise ControlError("profile names can't contain a path")
+        if not any(p["filename"] == name for p in self.app.profile_index.profiles):
+            raise ControlError(f"no profile '{name}'")
+        self.app.auto_switch_profile(name)
+        return self.app.current_metadata.get("name", name)
+
+
+def _number(query, key, kind):
+    try:
+        return kind(query[key])
+    except KeyError:
+        raise ControlError(f"missing '{key}'")
+    except ValueError:
+        raise ControlError(f"'{key}' must be a number")
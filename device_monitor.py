@@ -0,0 +1,126 @@
+import re
+import threading
+import time
+
+import mido
+
+SCAN_INTERVAL = 1.5
+# While a live loop waits for its device to come back
+FAST_SCAN_INTERVAL = 0.25
+RECONNECT_TIMEOUT = 60.0
+
+
+def device_key(name):
+    """Port name without the index some backends append, so 'Piano 1' re-plugged as 'Piano 2' still matches.
+
+    Only used to recognise a device coming back; two identical controllers
+    share a key, so presence is always checked by full name.
+    """
+    return re.sub(r"\s+\d+$", "", name)
+
+
+class DeviceMonitor:
+    """Re-enumerates MIDI inputs in the background and reports changes.
+
+    One scan is a single `get_input_names` call every SCAN_INTERVAL seconds,
+    which drops to FAST_SCAN_INTERVAL while someone is waiting for a device to
+    return. Listeners are called as callback(names, added, removed) on the
+    monitor thread.
+    """
+
+    def __init__(self, list_inputs=None, log=print):
+        self.list_inputs = list_inputs or mido.get_input_names
+        self.log = log
+        self.cond = threading.Condition()
+        self.names = []
+        self.listed = set()
+        # Every name any scan has listed; a device nobody has listed yet can't have been unplugged
+        self.seen = set()
+        # Names that were listed alongside a device when it disappeared, so a twin isn't taken for it
+        self.companions = {}
+        self.listeners = []
+        self.waiting = 0
+        self.running = False
+        self.scan_cost = 0.0
+        self._scan_failed = False
+
+    def add_listener(self, callback):
+        self.listeners.append(callback)
+
+    def remove_listener(self, callback):
+        if callback in self.listeners: self.listeners.remove(callback)
+
+    def start(self):
+        self.running = True
+        self.scan(initial=True)
+        threading.Thread(target=self._loop, daemon=True).start()
+
+    def stop(self):
+        with self.cond:
+            self.running = False
+            self.cond.notify_all()
+
+    def is_present(self, name):
+        return name in self.listed or name not in self.seen
+
+    def wait_for(self, name, timeout=RECONNECT_TIMEOUT, keep_waiting=lambda: True):
+        """Blocks until a device matching `name` is listed again. Returns its current name, or None.
+
+        The exact name wins. Otherwise a newly listed port with the same
+        `device_key` is taken as the device re-plugged under another index;
+        a twin that was connected alongside it never matches.
+        """
+        key = device_key(name)
+        deadline = time.perf_counter() + timeout
+        with self.cond:
+            self.waiting += 1
+            self.cond.notify_all()
+            try:
+                while True:
+                    if name in self.listed: return name
+                    twins = self.companions.get(name, ())
+                    for n in self.names:
+                        if n not in twins and device_key(n) == key: return n
+                    remaining = deadline - time.perf_counter()
+                    if remaining <= 0 or not self.running or not keep_waiting(): return None
+                    self.cond.wait(min(remaining, FAST_SCAN_INTERVAL))
+            finally:
+                self.waiting -= 1
+
+    def _loop(self):
+        while True:
+            with self.cond:
+                self.cond.wait(FAST_SCAN_INTERVAL if self.waiting else SCAN_INTERVAL)
+                if not self.running: return
+            self.scan()
+
+    def scan(self, initial=False):
+        start = time.perf_counter()
+        try:
+            names = list(self.list_inputs())
+        except Exception as e:
+            if not self._scan_failed: self.log(f"MIDI device scan failed: {e}")
+            self._scan_failed = True
+            return
+        self._scan_failed = False
+        self.scan_cost = time.perf_counter() - start
+
+        with self.cond:
+            old = set(self.names)
+            self.names = names
+            self.listed = set(names)
+            self.seen |= self.listed
+            for n in old - self.listed:
+                self.companions[n] = old - {n}
+            self.cond.notify_all()
+        if initial:
+            self.log(f"MIDI device scan: {len(names)} input(s) in {self.scan_cost * 1000:.1f} ms")
+            return
+
+        added = [n for n in names if n not in old]
+        removed = [n for n in old if n not in set(names)]
+        if not added and not removed: return
+        for n in removed: self.log(f"MIDI device disconnected: {n}")
+        for n in added: self.log(f"MIDI device connected: {n}")
+        for cb in list(self.listeners):
+            cb(names, added, removed)
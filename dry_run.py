@@ -0,0 +1,89 @@
+from collections import Counter
+
+from midi_stream import open_midi_stream, schedule_events
+from utils import note_transition, midi_to_note_name
+
+# Offline renderer: runs a song through the same scheduling and key resolution
+# as file_loop/process_msg, but on a virtual clock and without injecting keys.
+# Jitter and focus protection are left out so traces are deterministic.
+
+
+class DryRunResult:
+    def __init__(self):
+        self.trace = []  # (time, key, 'down'/'up')
+        self.duration = 0.0
+        self.notes_played = 0
+        self.fallback_hits = 0
+        self.unmapped = Counter()
+        self.out_of_range = 0
+        self.stuck_keys = []
+
+    @property
+    def key_downs(self):
+        return sum(1 for _, _, action in self.trace if action == 'down')
+
+    @property
+    def keys_per_second(self):
+        return self.key_downs / self.duration if self.duration > 0 else 0.0
+
+    def summary(self):
+        lines = [
+            f"Duration: {self.duration:.2f}s, notes: {self.notes_played}, key presses: {self.key_downs} ({self.keys_per_second:.1f}/s)",
+            f"Fallback hits: {self.fallback_hits}, out of range after transpose: {self.out_of_range}",
+        ]
+        if self.unmapped:
+            worst = ", ".join(f"{midi_to_note_name(n)} x{c}" for n, c in self.unmapped.most_common(8))
+            lines.append(f"Unmapped notes: {sum(self.unmapped.values())} ({worst})")
+        if self.stuck_keys:
+            lines.append(f"Stuck keys at end: {', '.join(self.stuck_keys)}")
+        return "\n".join(lines)
+
+
+def render_keystrokes(timed_msgs, config):
+    """Turns (time, msg) pairs into a DryRunResult using an EngineConfig snapshot."""
+    result = DryRunResult()
+    held = set()
+    t = 0.0
+    for t, msg in timed_msgs:
+        if msg.type not in ('note_on', 'note_off'): continue
+        transition = note_transition(msg, config.transpose)
+        if transition is None:
+            # Only count the note once; its note_off falls out of range too
+            if msg.type == 'note_on' and msg.velocity: result.out_of_range += 1
+            continue
+        note_val, is_down = transition
+
+        keys = config.note_keys[note_val]
+        if not keys:
+            if is_down: result.unmapped[note_val] += 1
+            continue
+        if is_down:
+            result.notes_played += 1
+            if not config.exact[note_val]: result.fallback_hits += 1
+
+        action = 'down' if is_down else 'up'
+        for k in (keys if isinstance(keys, list) else [keys]):
+            result.trace.append((t, k, action))
+            if is_down: held.add(k)
+            else: held.discard(k)
+
+    result.duration = t
+    result.stuck_keys = sorted(held)
+    return result
+
+
+def dry_run_file(source, config):
+    """Renders a file path or compiled SongColumns at maximum speed."""
+    speed = lambda: config.speed
+    if isinstance(source, str):
+        with open_midi_stream(source) as mid:
+            return render_keystrokes(schedule_events(mid, speed), config)
+    return render_keystrokes(schedule_events(source.iter_events(), speed), config)
+
+
+def write_trace_csv(filepath, trace):
+    # Fixed formatting so traces diff cleanly when used as golden files
+    with open(filepath, 'w') as f:
+        f.write("time,key,action\n")
+        for t, key, action in trace:
+            f.write(f"{t:.6f},{key},{action}\n")
@@ -0,0 +1,67 @@
+from dataclasses import dataclass, field, replace
+
+from utils import resolve_note_keys
+
+
+def compile_key_table(key_map, fallback):
+    """Resolves every MIDI note once. Returns (keys per note, exact-hit flag per note)."""
+    keys = tuple(resolve_note_keys(n, key_map, fallback) for n in range(128))
+    exact = tuple(bool(key_map.get(n)) for n in range(128))
+    return keys, exact
+
+
+@dataclass(frozen=True)
+class EngineConfig:
+    """Immutable snapshot of everything the worker threads need.
+
+    The Tk thread builds a new snapshot with `with_changes` and swaps the
+    reference; workers read `app.engine_config` once per message, so they
+    never see a half-applied change and never touch Tk variables.
+    """
+    transpose: int = 0
+    speed: float = 1.0
+    fallback: bool = True
+    jitter: bool = False
+    use_target: bool = True
+    target_title: str = ""
+    realtime: bool = False
+    cpu_core: int = -1
+    net_buffer_ms: int = 0
+    # Remote hosts allowed to send network MIDI; empty accepts this machine only
+    net_peers: tuple = ()
+    # Key output quantized to this many frames per second; 0 sends immediately
+    frame_rate: int = 0
+    # A-B loop in song seconds; off unless loop_b > loop_a. loop_count 0 repeats until stopped.
+    loop_a: float = 0.0
+    loop_b: float = 0.0
+    loop_count: int = 0
+    loop_speedup: float = 0.0
+    # Treated as read-only once published; editors work on copies. Left out of the
+    # hash since a dict has none; equal snapshots still hash alike.
+    key_map: dict = field(default_factory=dict, hash=False)
+    version: int = 0
+    note_keys: tuple = field(default=(), repr=False, compare=False)
+    exact: tuple = field(default=(), repr=False, compare=False)
+
+    def __post_init__(self):
+        if not self.note_keys:
+            keys, exact = compile_key_table(self.key_map, self.fallback)
+            object.__setattr__(self, 'note_keys', keys)
+            object.__setattr__(self, 'exact', exact)
+
+    def with_changes(self, **changes):
+        if 'key_map' in changes:
+            changes['key_map'] = dict(changes['key_map'])
+        # Transpose is applied before the table lookup, so only these two affect it
+        if (changes.get('key_map', self.key_map) == self.key_map
+                and changes.get('fallback', self.fallback) == self.fallback):
+            # Keymap table is unaffected, carry it over instead of recompiling
+            changes.setdefault('note_keys', self.note_keys)
+            changes.setdefault('exact', self.exact)
+        else:
+            changes['note_keys'] = ()
+            changes['exact'] = ()
+        return replace(self, version=self.version + 1, **changes)
+
+    def resolve(self, note):
+        return self.note_keys[note]
@@ -0,0 +1,365 @@
+import array
+import multiprocessing
+import struct
+import threading
+import time
+from multiprocessing import shared_memory
+
+from engine_config import EngineConfig
+from midi_processing import file_loop, live_loop, process_msg, check_can_press, release_all_held_keys, release_keys
+from playback_control import PlaybackControl, PLAYING
+from recorder import SessionRecorder
+from engine_stats import LatencyStats, EngineCounters, NOTE_OUTCOMES
+from device_monitor import DeviceMonitor
+from tracing import SpanTracer
+from frame_output import FrameOutput
+from utils import midi_to_note_name
+
+# Events the engine process pushes to the UI through the shared-memory ring
+EV_NOTE_ON = 1
+EV_NOTE_OFF = 2
+EV_FILE_DONE = 4
+EV_LIVE_STOPPED = 5
+
+# Events the UI can't miss. Note display events may never fill the slots kept for these.
+# Pause, resume and stop always start in the UI, so the engine doesn't echo its state back.
+CONTROL_EVENTS = frozenset((EV_FILE_DONE, EV_LIVE_STOPPED))
+
+# How often the engine sends its counters and latency samples to the UI process.
+# They only feed /stats, the debug console and the end-of-song summary.
+STATS_INTERVAL = 0.25
+
+_NOTE_NUMBERS = {midi_to_note_name(n): n for n in range(128)}
+
+_HEADER = struct.Struct('<QQ')          # head (written by engine), tail (written by UI)
+_RECORD = struct.Struct('<dBBxxi')      # timestamp, kind, note, value
+RING_CAPACITY = 4096
+
+
+class EventRing:
+    """Single-consumer ring buffer in shared memory.
+
+    The engine only advances `head` and the UI only advances `tail`, so the
+    two processes never lock each other out. Several engine threads push
+    (playback, live input, the command thread), so pushes are serialized
+    by a lock local to the engine process. When the UI falls behind, new
+    events are dropped and counted rather than blocking the engine. The last
+    `capacity // 16` slots only take CONTROL_EVENTS, so a stalled UI loses
+    note display events before it loses a file end.
+    """
+
+    def __init__(self, shm, capacity):
+        self.shm = shm
+        self.capacity = capacity
+        self.mask = capacity - 1
+        self.telemetry_limit = capacity - capacity // 16
+        self.buf = shm.buf
+        self.dropped = 0
+        self.push_lock = threading.Lock()
+
+    @classmethod
+    def create(cls, capacity=RING_CAPACITY):
+        shm = shared_memory.SharedMemory(create=True, size=_HEADER.size + capacity * _RECORD.size)
+        _HEADER.pack_into(shm.buf, 0, 0, 0)
+        return cls(shm, capacity)
+
+    @classmethod
+    def attach(cls, name, capacity=RING_CAPACITY):
+        return cls(shared_memory.SharedMemory(name=name), capacity)
+
+    @property
+    def name(self):
+        return self.shm.name
+
+    def push(self, kind, note=0, value=0):
+        with self.push_lock:
+            head, tail = _HEADER.unpack_from(self.buf, 0)
+            if head - tail >= (self.capacity if kind in CONTROL_EVENTS else self.telemetry_limit):
+                self.dropped += 1
+                return False
+            _RECORD.pack_into(self.buf, _HEADER.size + (head & self.mask) * _RECORD.size, time.perf_counter(), kind, note, value)
+            struct.pack_into('<Q', self.buf, 0, head + 1)
+        return True
+
+    def drain(self):
+        head, tail = _HEADER.unpack_from(self.buf, 0)
+        events = [_RECORD.unpack_from(self.buf, _HEADER.size + (i & self.mask) * _RECORD.size) for i in range(tail, head)]
+        struct.pack_into('<Q', self.buf, 8, head)
+        return events
+
+    def close(self, unlink=False):
+        self.buf = None
+        self.shm.close()
+        if unlink: self.shm.unlink()
+
+
+class EngineLatency(LatencyStats):
+    """LatencyStats that counts its resets, so a reset between two reports isn't missed."""
+
+    def __init__(self):
+        super().__init__()
+        self.resets = 0
+
+    def reset(self):
+        self.count = 0
+        self.resets += 1
+
+
+class StatsReporter:
+    """Turns the engine's counters and latency samples into deltas for the UI process.
+
+    The playback threads only bump the usual in-process arrays; this is read
+    every STATS_INTERVAL and at song end, so the hot path never touches the
+    ring or the pipe.
+    """
+
+    def __init__(self, counters, latency):
+        self.counters = counters
+        self.latency = latency
+        self.lock = threading.Lock()
+        self.sent_notes = tuple(array.array('L', [0] * 128) for _ in NOTE_OUTCOMES)
+        self.sent_samples = 0
+        self.sent_resets = 0
+        self.sent_totals = (0, 0)
+
+    def take(self):
+        """Everything that changed since the last call, or None."""
+        with self.lock:
+            notes = []
+            for outcome, (counts, sent) in enumerate(zip(self.counters.notes, self.sent_notes)):
+                if counts == sent: continue
+                for note in range(128):
+                    delta = counts[note] - sent[note]
+                    if delta:
+                        notes.append((outcome, note, delta))
+                        sent[note] = counts[note]
+
+            latency = self.latency
+            count, resets = latency.count, latency.resets
+            reset = resets != self.sent_resets
+            first = max(0 if reset else self.sent_samples, count - latency.capacity)
+            samples = [latency.samples[i % latency.capacity] for i in range(first, count)]
+            self.sent_samples, self.sent_resets = count, resets
+
+            totals = (self.counters.events, self.counters.dropped)
+            if not notes and not samples and not reset and totals == self.sent_totals: return None
+            self.sent_totals = totals
+            return {"notes": notes, "latency_reset": reset, "latency": samples, "events": totals[0], "dropped": totals[1]}
+
+
+def apply_engine_stats(counters, latency, stats):
+    """UI side of StatsReporter: folds one report into the app's own counters."""
+    notes = counters.notes
+    for outcome, note, delta in stats["notes"]:
+        notes[outcome][note] += delta
+    if stats["latency_reset"]: latency.reset()
+    for seconds in stats["latency"]:
+        latency.add(seconds)
+    counters.events = stats["events"]
+    counters.dropped = stats["dropped"]
+
+
+class EngineHost:
+    """Stands in for the Tk app inside the engine process.
+
+    file_loop, live_loop and process_msg only need these attributes, so the
+    exact same playback code runs here. UI callbacks become ring events;
+    statistics go to the UI in batches over the log pipe.
+    """
+
+    def __init__(self, ring, log_conn):
+        self.ring = ring
+        self.log_conn = log_conn
+        self.log_lock = threading.Lock()
+        self.engine_config = EngineConfig()
+        self.playback = PlaybackControl()
+        self.playback.add_listener(self.on_playback_state)
+        self.held_keys = set()
+        self.key_lock = threading.Lock()
+        self.live_running = False
+        # Recording stays in the UI process; the Record button is disabled while this engine runs
+        self.recorder = SessionRecorder(capacity=1)
+        # Tracing is driven from the debug console, which only sees the UI process
+        self.tracer = SpanTracer(capacity=1)
+        self.latency = EngineLatency()
+        self.counters = EngineCounters()
+        self.stats = StatsReporter(self.counters, self.latency)
+        self.frame_output = FrameOutput(lambda: self.engine_config)
+        self.device_monitor = DeviceMonitor(log=self.log)
+        self.ui_sessions = {}
+        self.position = (0.0, 0.0, 1.0)
+
+    def report_stats(self):
+        """Sends whatever statistics changed. Runs on its own thread every STATS_INTERVAL."""
+        while True:
+            self.send_stats()
+            time.sleep(STATS_INTERVAL)
+
+    def send_stats(self):
+        stats = self.stats.take()
+        if stats is None: return
+        try:
+            with self.log_lock:
+                self.log_conn.send(("stats", stats))
+        except (OSError, EOFError):
+            pass
+
+    # --- App interface used by the playback code ---
+    @property
+    def file_playing(self):
+        return self.playback.is_playing
+
+    @property
+    def file_paused(self):
+        return self.playback.is_paused
+
+    def log(self, message):
+        try:
+            with self.log_lock:
+                self.log_conn.send(message)
+        except (OSError, EOFError):
+            pass
+
+    def after(self, _delay, callback, *args):
+        callback(*args)
+
+    def update_note_ui(self, name, active):
+        if active:
+            self.ring.push(EV_NOTE_ON, _NOTE_NUMBERS.get(name, 0))
+        else:
+            self.ring.push(EV_NOTE_OFF)
+
+    def process_msg(self, msg, source=None, session=None):
+        process_msg(self, msg, source, session)
+
+    def check_can_press(self):
+        return check_can_press(self)
+
+    def on_file_finished(self, session, completed):
+        ui_session = self.ui_sessions.pop(session, 0)
+        # Final numbers go out before the UI hears the song ended
+        self.send_stats()
+        if self.playback.is_active(session):
+            self.ring.push(EV_FILE_DONE, int(completed), ui_session)
+
+    def stop_live(self):
+        self.live_running = False
+        release_all_held_keys(self)
+        self.ring.push(EV_LIVE_STOPPED)
+
+    def on_playback_state(self, state, session):
+        if state != PLAYING:
+            release_all_held_keys(self)
+
+    # --- Commands from the UI process ---
+    def handle(self, cmd, args):
+        if cmd == "config":
+            self.engine_config = args[0]
+        elif cmd == "play":
+            source, ui_session, *start = args
+            session = self.playback.start()
+            self.ui_sessions[session] = ui_session
+            threading.Thread(target=file_loop, args=(self, source, session, *start), daemon=True).start()
+        elif cmd == "pause":
+            self.playback.pause()
+        elif cmd == "resume":
+            self.playback.resume()
+        elif cmd == "stop":
+            self.playback.stop()
+        elif cmd == "live_start":
+            self.live_running = True
+            threading.Thread(target=live_loop, args=(self, args[0]), daemon=True).start()
+        elif cmd == "live_stop":
+            self.live_running = False
+            release_all_held_keys(self)
+        elif cmd == "release_keys":
+            if args: release_keys(self, args[0])
+            else: release_all_held_keys(self)
+
+
+def engine_main(cmd_conn, log_conn, ring_name):
+    import pydirectinput
+    pydirectinput.PAUSE = 0
+    ring = EventRing.attach(ring_name)
+    host = EngineHost(ring, log_conn)
+    host.log("Engine process started")
+    host.device_monitor.start()
+    threading.Thread(target=host.report_stats, daemon=True).start()
+    try:
+        while True:
+            try:
+                cmd, *args = cmd_conn.recv()
+            except EOFError:
+                break
+            if cmd == "quit": break
+            try:
+                host.handle(cmd, args)
+            except Exception as e:
+                host.log(f"Engine command '{cmd}' failed: {e}")
+    finally:
+        host.live_running = False
+        host.device_monitor.stop()
+        host.playback.stop()
+        release_all_held_keys(host)
+        ring.close()
+
+
+class EngineProcess:
+    """UI-side handle on the engine process: commands go over a pipe, events come back over the ring.
+
+    Log lines and statistics reports share a second pipe; reports wait in
+    `stats` until the Tk thread picks them up with `poll_stats`.
+    """
+
+    def __init__(self, log=print):
+        self.log = log
+        self.stats = []
+        self.stats_lock = threading.Lock()
+        # The Tk thread, hotkey worker and playback listeners all send commands
+        self.send_lock = threading.Lock()
+        ctx = multiprocessing.get_context("spawn")
+        self.ring = EventRing.create()
+        cmd_recv, self.cmd_conn = ctx.Pipe(duplex=False)
+        self.log_conn, log_send = ctx.Pipe(duplex=False)
+        self.proc = ctx.Process(target=engine_main, args=(cmd_recv, log_send, self.ring.name), daemon=True)
+        self.proc.start()
+        cmd_recv.close()
+        log_send.close()
+        threading.Thread(target=self._log_reader, daemon=True).start()
+
+    def _log_reader(self):
+        while True:
+            try:
+                message = self.log_conn.recv()
+            except (EOFError, OSError):
+                return
+            if isinstance(message, tuple):
+                with self.stats_lock:
+                    self.stats.append(message[1])
+                continue
+            self.log(f"[engine] {message}")
+
+    def send(self, cmd, *args):
+        try:
+            with self.send_lock:
+                self.cmd_conn.send((cmd, *args))
+        except (OSError, BrokenPipeError) as e:
+            self.log(f"Engine process unreachable: {e}")
+
+    def poll_events(self):
+        return self.ring.drain()
+
+    def poll_stats(self):
+        with self.stats_lock:
+            stats, self.stats = self.stats, []
+        return stats
+
+    def is_alive(self):
+        return self.proc.is_alive()
+
+    def close(self):
+        self.send("quit")
+        self.proc.join(timeout=1.0)
+        if self.proc.is_alive(): self.proc.terminate()
+        self.cmd_conn.close()
+        self.ring.close(unlink=True)
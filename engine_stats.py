@@ -0,0 +1,90 @@
+import array
+import time
+
+from utils import midi_to_note_name
+
+
+class LatencyStats:
+    """Fixed-size ring of latency samples (seconds) with percentile summaries.
+
+    `add` only writes into a preallocated array, so it is safe to call from
+    the playback thread on every event.
+    """
+
+    def __init__(self, capacity=8192):
+        self.capacity = capacity
+        self.samples = array.array('d', bytes(8 * capacity))
+        self.count = 0
+
+    def reset(self):
+        self.count = 0
+
+    def add(self, seconds):
+        self.samples[self.count % self.capacity] = seconds
+        self.count += 1
+
+    def percentiles(self, points=(50, 90, 99, 100)):
+        n = min(self.count, self.capacity)
+        if not n: return {}
+        data = sorted(self.samples[:n])
+        return {p: data[min(n - 1, int(n * p / 100))] for p in points}
+
+    def summary(self):
+        pct = self.percentiles()
+        if not pct: return "no samples"
+        return ", ".join(f"{'max' if p == 100 else f'p{p}'} {v * 1000:.2f} ms" for p, v in pct.items()) + f" ({min(self.count, self.capacity)} samples)"
+
+
+# Outcome of each note-on. The first three are indexed by the note after transpose,
+# the last two by the incoming note, since they never get as far as a key lookup.
+NOTE_EXACT = 0
+NOTE_FALLBACK = 1
+NOTE_UNMAPPED = 2
+NOTE_GATED = 3
+NOTE_OUT_OF_RANGE = 4
+NOTE_OUTCOMES = ("exact", "fallback", "unmapped", "focus_gated", "out_of_range")
+
+
+class EngineCounters:
+    """Running totals bumped by the engine threads. Readers only take snapshots.
+
+    Per-note outcomes live in one preallocated 128-slot array per outcome, so
+    counting is a single indexed increment on the playback thread.
+    """
+
+    def __init__(self):
+        self.events = 0
+        self.dropped = 0
+        self.notes = tuple(array.array('L', [0] * 128) for _ in NOTE_OUTCOMES)
+        self.session_start = time.time()
+        self.profile = ""
+
+    def count_note(self, outcome, note):
+        self.notes[outcome][note] += 1
+
+    def reset_notes(self, profile=None):
+        """Starts a new coverage session, e.g. when another profile is loaded."""
+        for counts in self.notes:
+            counts[:] = array.array('L', [0] * 128)
+        self.session_start = time.time()
+        if profile is not None: self.profile = profile
+
+    def note_totals(self):
+        return {name: sum(counts) for name, counts in zip(NOTE_OUTCOMES, self.notes)}
+
+    def snapshot(self):
+        return {"events": self.events, "dropped": self.dropped, "notes": self.note_totals()}
+
+    def export_csv(self, filepath):
+        """Writes one row per note that saw any traffic this session. Returns the row count."""
+        rows = 0
+        with open(filepath, "w") as f:
+            f.write(f"# profile: {self.profile}\n")
+            f.write(f"# session start: {time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(self.session_start))}\n")
+            f.write("note,name," + ",".join(NOTE_OUTCOMES) + "\n")
+            for note in range(128):
+                values = [counts[note] for counts in self.notes]
+                if not any(values): continue
+                f.write(f"{note},{midi_to_note_name(note)}," + ",".join(map(str, values)) + "\n")
+                rows += 1
+        return rows
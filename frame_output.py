@@ -0,0 +1,178 @@
+import math
+import threading
+import time
+from collections import deque
+
+from engine_stats import LatencyStats
+from utils import press_key_batch
+
+FRAME_RATE_OPTIONS = ["Off", "30 Hz", "60 Hz", "120 Hz", "144 Hz", "240 Hz"]
+# Largest batch size listed on its own in the report; bigger ones are pooled
+MAX_BATCH_BUCKET = 8
+# Same trick as PlaybackControl.wait: finish short waits with a plain sleep
+FINE_WAIT = 0.002
+
+
+def parse_frame_rate(option):
+    return 0 if option == "Off" else int(option.split()[0])
+
+
+class FrameStats:
+    """What quantization did to the output: batch sizes, deferrals and added latency.
+
+    Submitting threads, the frame thread and readers all go through `lock`.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latency = LatencyStats()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.transitions = 0
+            self.batches = 0
+            self.deferred = 0
+            self.merged = 0
+            self.batch_sizes = [0] * (MAX_BATCH_BUCKET + 1)
+            self.latency.reset()
+
+    def add_merged(self, count):
+        with self.lock:
+            self.merged += count
+
+    def add_batch(self, size, moved, latencies):
+        with self.lock:
+            self.transitions += size
+            self.batches += 1
+            self.deferred += moved
+            self.batch_sizes[min(size, MAX_BATCH_BUCKET)] += 1
+            for seconds in latencies:
+                self.latency.add(seconds)
+
+    def summary(self):
+        with self.lock:
+            return self._summary()
+
+    def _summary(self):
+        if not self.batches: return "no frames sent"
+        sizes = ", ".join(f"{n if n < MAX_BATCH_BUCKET else f'{n}+'}: {c}" for n, c in enumerate(self.batch_sizes) if c)
+        return (f"{self.transitions} key transitions in {self.batches} frames "
+                f"({self.transitions - self.batches} fewer injection calls), "
+                f"{self.deferred} spread to a later frame, {self.merged} merged away; per frame {sizes}; added latency {self.latency.summary()}")
+
+    def snapshot(self):
+        with self.lock:
+            return self._snapshot()
+
+    def _snapshot(self):
+        return {"transitions": self.transitions, "frames": self.batches, "deferred": self.deferred,
+                "merged": self.merged,
+                "batch_sizes": self.batch_sizes[:],
+                "added_latency_ms": {("max" if p == 100 else f"p{p}"): round(v * 1000, 3) for p, v in self.latency.percentiles().items()}}
+
+
+class FrameOutput:
+    """Quantizes key transitions to a frame grid for games that poll input once per frame.
+
+    Transitions submitted between two frame boundaries go out together at the
+    next boundary as one SendInput batch. A key changes state at most once per
+    frame: a release (or re-press) of a key that already changed this frame
+    waits for the following frame, so the game always sees the key down for at
+    least one poll. A key tapped faster than the frame rate can't be shown
+    every tap, so a press and its release queued behind the next frame are
+    dropped together instead of piling up latency; they count as merged.
+    The rate comes from `get_config().frame_rate` and is read at every
+    frame, so switching it needs no restart.
+    """
+
+    def __init__(self, get_config, send=press_key_batch):
+        self.get_config = get_config
+        self.send = send
+        self.cond = threading.Condition()
+        # Serializes sending with `clear`, so a batch can't land after a release-all
+        self.send_lock = threading.Lock()
+        self.pending = {}      # key -> deque of (is_down, submitted_at), in submission order
+        self.last_frame = {}   # key -> frame index of its last sent transition
+        self.origin = time.perf_counter()
+        self.stats = FrameStats()
+        self.thread = None
+
+    def submit(self, keys, action):
+        now = time.perf_counter()
+        is_down = action == 'down'
+        with self.cond:
+            for k in keys if isinstance(keys, list) else [keys]:
+                queue = self.pending.get(k)
+                if queue is None: queue = self.pending[k] = deque()
+                if not is_down and len(queue) >= 2 and queue[-1][0]:
+                    # Press still waiting behind the next frame: drop it with this release
+                    queue.pop()
+                    self.stats.add_merged(2)
+                    continue
+                queue.append((is_down, now))
+            if self.thread is None:
+                self.thread = threading.Thread(target=self._run, daemon=True)
+                self.thread.start()
+            self.cond.notify()
+
+    def send_now(self, keys, action, press):
+        """Unquantized output. With transitions still queued from before quantization was
+        switched off, this one queues behind them so a key can't be left stuck down."""
+        with self.send_lock:
+            with self.cond:
+                queued = bool(self.pending)
+            if not queued:
+                press(keys, action)
+                return
+        self.submit(keys, action)
+
+    def clear(self):
+        """Drops everything not yet sent and returns the keys involved. Used before releasing all held keys."""
+        with self.send_lock, self.cond:
+            keys = set(self.pending)
+            self.pending.clear()
+        return keys
+
+    def _run(self):
+        while True:
+            with self.cond:
+                while not self.pending:
+                    self.cond.wait()
+            rate = self.get_config().frame_rate
+            if not rate:
+                # Switched off with transitions still queued: send them right away
+                self._flush(None, time.perf_counter(), 0.0)
+                continue
+            period = 1.0 / rate
+            frame = math.floor((time.perf_counter() - self.origin) / period) + 1
+            boundary = self.origin + frame * period
+            remaining = boundary - time.perf_counter()
+            if remaining > FINE_WAIT: time.sleep(remaining - FINE_WAIT)
+            remaining = boundary - time.perf_counter()
+            if remaining > 0: time.sleep(remaining)
+            self._flush(frame, boundary, period)
+
+    def _flush(self, frame, boundary, period):
+        batch = []
+        moved = 0
+        latencies = []
+        with self.send_lock:
+            with self.cond:
+                for k in list(self.pending):
+                    queue = self.pending[k]
+                    if frame is None:
+                        batch.extend((k, is_down) for is_down, _ in queue)
+                        queue.clear()
+                    elif self.last_frame.get(k) != frame:
+                        # One transition per key per frame; the rest wait for later frames
+                        is_down, submitted = queue.popleft()
+                        batch.append((k, is_down))
+                        self.last_frame[k] = frame
+                        latencies.append(boundary - submitted)
+                        # Submitted before the previous boundary: it was held back at least a frame
+                        if submitted < boundary - period: moved += 1
+                    if not queue: del self.pending[k]
+            if not batch: return
+            self.send(batch)
+        self.stats.add_batch(len(batch), moved, latencies)
@@ -0,0 +1,163 @@
+import queue
+import threading
+import time
+
+DEBOUNCE = 0.2
+# How long after we inject a key a matching hook event is treated as our own echo
+INJECT_WINDOW = 0.05
+
+# pydirectinput key names -> names reported by the keyboard hook
+_KEY_ALIASES = {
+    "shiftleft": "shift", "shiftright": "right shift",
+    "ctrlleft": "ctrl", "ctrlright": "right ctrl",
+    "altleft": "alt", "altright": "right alt",
+    "winleft": "left windows", "winright": "right windows",
+    "pageup": "page up", "pagedown": "page down", "pgup": "page up", "pgdn": "page down",
+    "escape": "esc", "return": "enter", "capslock": "caps lock", "backspace": "backspace",
+}
+
+# Modifier names from the hook, folded to the names used in hotkey strings
+_MODIFIERS = {
+    "ctrl": "ctrl", "left ctrl": "ctrl", "right ctrl": "ctrl",
+    "shift": "shift", "left shift": "shift", "right shift": "shift",
+    "alt": "alt", "left alt": "alt", "right alt": "alt", "alt gr": "alt",
+    "windows": "windows", "left windows": "windows", "right windows": "windows",
+}
+
+
+def _hook_name(key):
+    key = key.lower()
+    return _KEY_ALIASES.get(key, key)
+
+
+class InjectedKeyFilter:
+    """Remembers keys we just sent so the global hook can drop their echoes.
+
+    When another process injects the keys (the separate-process engine), the
+    marks never reach this one. `output_keys` then holds every key the
+    current keymap can send, and those count as injected until cleared.
+    """
+
+    def __init__(self):
+        self.recent = {}
+        self.output_keys = frozenset()
+
+    def mark(self, keys):
+        now = time.perf_counter()
+        for k in keys:
+            self.recent[_hook_name(k)] = now
+
+    def set_output_keys(self, note_keys):
+        """Treats every key in a compiled key table as injected; an empty table turns this off."""
+        names = set()
+        for keys in note_keys:
+            if not keys: continue
+            for k in (keys if isinstance(keys, list) else [keys]):
+                names.add(_hook_name(k))
+        self.output_keys = frozenset(names)
+
+    def is_injected(self, name):
+        if name in self.output_keys: return True
+        t = self.recent.get(name)
+        return t is not None and time.perf_counter() - t < INJECT_WINDOW
+
+
+INJECTED_KEYS = InjectedKeyFilter()
+
+
+def parse_hotkey(combo):
+    """'Ctrl+Shift+F9' -> ('f9', frozenset({'ctrl', 'shift'}))"""
+    parts = [p.strip().lower() for p in combo.split('+') if p.strip()]
+    if not parts: return None, frozenset()
+    mods = frozenset(_MODIFIERS.get(p, p) for p in parts[:-1])
+    return parts[-1], mods
+
+
+class HotkeyDispatcher:
+    """Global hotkeys compiled into a trigger-key lookup table.
+
+    `on_event` runs on the keyboard hook thread for every key on the system,
+    so it does one dict lookup for keys that aren't bound and drops our own
+    injected keys. Matched actions run on one persistent worker thread.
+    """
+
+    def __init__(self, injected=INJECTED_KEYS, log=print):
+        self.injected = injected
+        self.log = log
+        self.actions = {}
+        self.bindings = {}
+        self.held_mods = set()
+        self.down_keys = set()
+        self.last_fired = {}
+        self.monitor = False
+        self.queue = queue.Queue()
+        threading.Thread(target=self._worker, daemon=True).start()
+
+    def register(self, action, callback):
+        self.actions[action] = callback
+
+    def compile(self, hotkeys):
+        table = {}
+        for action, combo in hotkeys.items():
+            if not combo or action not in self.actions: continue
+            trigger, mods = parse_hotkey(combo)
+            # A modifier-only combo like "shift" is triggered by either side of it
+            trigger = _MODIFIERS.get(trigger, trigger)
+            if trigger: table.setdefault(trigger, []).append((mods, action))
+        # Most specific combination first, so ctrl+f9 wins over a plain f9 binding
+        for entries in table.values():
+            entries.sort(key=lambda e: -len(e[0]))
+        self.bindings = table
+
+    def on_event(self, event):
+        name = event.name.lower() if event.name else "unknown"
+        is_down = event.event_type == "down"
+
+        mod = _MODIFIERS.get(name)
+        if mod:
+            if self.injected.is_injected(name): return
+            if not is_down:
+                self.held_mods.discard(mod)
+                return
+            # Auto-repeat of a held modifier changes nothing
+            if mod in self.held_mods: return
+            entries = self.bindings.get(mod)
+            if entries: self._match(entries)
+            self.held_mods.add(mod)
+            return
+
+        if not is_down:
+            self.down_keys.discard(name)
+            return
+        if self.monitor:
+            self.log(f"Input detected: {name}{' (injected)' if self.injected.is_injected(name) else ''}")
+
+        entries = self.bindings.get(name)
+        if entries is None: return
+        # Auto-repeat while a key is held only fires once
+        if name in self.down_keys: return
+        if self.injected.is_injected(name): return
+        self.down_keys.add(name)
+        self._match(entries)
+
+    def _match(self, entries):
+        for mods, action in entries:
+            if mods <= self.held_mods:
+                self.fire(action)
+                return
+
+    def fire(self, action):
+        now = time.perf_counter()
+        if now - self.last_fired.get(action, 0.0) < DEBOUNCE: return
+        self.last_fired[action] = now
+        self.queue.put(action)
+
+    def _worker(self):
+        while True:
+            action = self.queue.get()
+            callback = self.actions.get(action)
+            if callback is None: continue
+            try:
+                callback()
+            except Exception as e:
+                self.log(f"Hotkey '{action}' failed: {e}")
@@ -0,0 +1,119 @@
+import re
+
+NOTE_NAMES = ['C', 'C#', 'D', 'D#', 'E', 'F', 'F#', 'G', 'G#', 'A', 'A#', 'B']
+FLATS = {"DB": "C#", "EB": "D#", "GB": "F#", "AB": "G#", "BB": "A#"}
+
+SCALES = {
+    "Chromatic": (0, 1, 2, 3, 4, 5, 6, 7, 8, 9, 10, 11),
+    "Major (white keys)": (0, 2, 4, 5, 7, 9, 11),
+    "Natural Minor": (0, 2, 3, 5, 7, 8, 10),
+    "Major Pentatonic": (0, 2, 4, 7, 9),
+    "Minor Pentatonic": (0, 3, 5, 7, 10),
+    "Black keys": (1, 3, 6, 8, 10),
+}
+
+HISTORY_LIMIT = 200
+
+
+def parse_note(text):
+    """'60', 'C4', 'c#4' or 'Db-1' -> MIDI note number. Raises ValueError."""
+    text = text.strip()
+    if re.fullmatch(r"\d+", text):
+        note = int(text)
+    else:
+        m = re.fullmatch(r"([A-Ga-g][#bB]?)(-?\d+)", text)
+        if not m: raise ValueError(f"not a note: {text!r}")
+        name = m.group(1).upper()
+        name = FLATS.get(name, name)
+        if name not in NOTE_NAMES: raise ValueError(f"not a note: {text!r}")
+        note = (int(m.group(2)) + 1) * 12 + NOTE_NAMES.index(name)
+    if not 0 <= note <= 127: raise ValueError(f"note out of range: {text!r}")
+    return note
+
+
+def parse_key_sequence(text):
+    """'z x c shift+v' -> ['z', 'x', 'c', ['shift', 'v']], in the same shape the keymap stores."""
+    keys = []
+    for token in re.split(r"[\s,]+", text.strip().lower()):
+        if not token: continue
+        parts = [p for p in token.split("+") if p]
+        if parts: keys.append(parts[0] if len(parts) == 1 else parts)
+    return keys
+
+
+def scale_notes(low, high, scale, root=0):
+    """Notes in [low, high] that belong to `scale` (semitone offsets from `root`)."""
+    steps = set(scale)
+    return [n for n in range(low, high + 1) if (n - root) % 12 in steps]
+
+
+# Every operation returns a changeset {note: (old, new)}, with None meaning unmapped.
+# Only notes whose binding actually changes are included, so a changeset is also its own undo record.
+
+def diff(key_map, updates):
+    changes = {}
+    for note, new in updates.items():
+        old = key_map.get(note)
+        if old != new: changes[note] = (old, new)
+    return changes
+
+
+def map_sequence(key_map, notes, keys):
+    """Binds notes[i] to keys[i]; extra notes or keys are left alone."""
+    return diff(key_map, dict(zip(notes, keys)))
+
+
+def shift_range(key_map, low, high, semitones):
+    """Moves the bindings of [low, high] by `semitones`. Bindings pushed past 0-127 are dropped."""
+    updates = {n: None for n in range(low, high + 1) if n in key_map}
+    for n in range(low, high + 1):
+        if n in key_map and 0 <= n + semitones <= 127:
+            updates[n + semitones] = key_map[n]
+    return diff(key_map, updates)
+
+
+def copy_range(key_map, source_map, low=0, high=127):
+    """Makes [low, high] match `source_map`, including its unmapped notes."""
+    return diff(key_map, {n: source_map.get(n) for n in range(low, high + 1)})
+
+
+def clear_range(key_map, low=0, high=127):
+    return diff(key_map, {n: None for n in range(low, high + 1)})
+
+
+def apply_changes(key_map, changes, undo=False):
+    for note, (old, new) in changes.items():
+        value = old if undo else new
+        if value is None: key_map.pop(note, None)
+        else: key_map[note] = value
+
+
+class EditHistory:
+    """Undo/redo of changesets applied to one keymap."""
+    def __init__(self, key_map, limit=HISTORY_LIMIT):
+        self.key_map = key_map
+        self.limit = limit
+        self.done = []
+        self.undone = []
+
+    def apply(self, changes):
+        if not changes: return changes
+        apply_changes(self.key_map, changes)
+        self.done.append(changes)
+        if len(self.done) > self.limit: del self.done[0]
+        self.undone.clear()
+        return changes
+
+    def undo(self):
+        if not self.done: return {}
+        changes = self.done.pop()
+        apply_changes(self.key_map, changes, undo=True)
+        self.undone.append(changes)
+        return changes
+
+    def redo(self):
+        if not self.undone: return {}
+        changes = self.undone.pop()
+        apply_changes(self.key_map, changes)
+        self.done.append(changes)
+        return changes
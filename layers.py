@@ -0,0 +1,156 @@
+import bisect
+import heapq
+import threading
+from collections import namedtuple
+
+from midi_stream import compile_song, EV_NOTE_ON, EV_NOTE_OFF
+from engine_config import compile_key_table
+from utils import load_profile_data
+
+# A NoteEvent tagged with the Layer it came from
+LayeredEvent = namedtuple("LayeredEvent", "type note velocity time channel layer")
+
+_TYPE_NAMES = {EV_NOTE_OFF: "note_off", EV_NOTE_ON: "note_on"}
+
+
+class Layer:
+    """One song of a layered playback.
+
+    mute, solo and transpose are plain attributes the Tk thread may change
+    mid-song; the scheduler reads them per event. `offset` delays the layer
+    on the shared clock and is read when playback starts.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.song = None
+        self.error = None
+        self.mute = False
+        self.solo = False
+        self.transpose = 0
+        self.offset = 0.0
+        self.profile = None
+        # Key table of `profile`; None plays through the app's current keymap
+        self.note_keys = None
+        self.exact = None
+
+    @property
+    def ready(self):
+        return self.song is not None
+
+    def set_profile(self, filename, fallback=True):
+        self.profile = filename
+        if filename is None:
+            self.note_keys = self.exact = None
+            return
+        key_map, _ = load_profile_data(filename)
+        self.note_keys, self.exact = compile_key_table(key_map, fallback)
+
+    def load(self, on_done):
+        """Compiles the song on a background thread, then calls on_done(layer) there."""
+        def run():
+            try:
+                self.song = compile_song(self.path)
+            except Exception as e:
+                self.error = e
+            on_done(self)
+        threading.Thread(target=run, daemon=True).start()
+
+
+class LayerSet:
+    def __init__(self):
+        self.layers = []
+
+    def __len__(self):
+        return len(self.layers)
+
+    def __iter__(self):
+        return iter(self.layers)
+
+    def __getitem__(self, i):
+        return self.layers[i]
+
+    def add(self, layer):
+        self.layers.append(layer)
+
+    def remove(self, layer):
+        self.layers.remove(layer)
+
+    @property
+    def ready(self):
+        return bool(self.layers) and all(layer.ready for layer in self.layers)
+
+    @property
+    def duration(self):
+        return max((layer.offset + layer.song.duration for layer in self.layers if layer.ready), default=0.0)
+
+    def audible(self, layer):
+        if layer.mute: return False
+        return layer.solo or not any(other.solo for other in self.layers)
+
+    def iter_events(self, start=0.0):
+        """All layers merged onto one timeline from `start`, as LayeredEvents with delta times.
+
+        A heap holds the next event of each layer, so each event costs
+        O(log layers) however many layers play.
+        """
+        heap = []
+        layers = list(self.layers)
+        # Offsets are fixed for the whole run; an edit mid-song would break the heap order
+        offsets = [layer.offset for layer in layers]
+        for n, layer in enumerate(layers):
+            times = layer.song.times
+            offset = offsets[n]
+            if times:
+                # Skip to the first event at or after `start` on the shared timeline
+                i = bisect.bisect_left(times, start - offset) if start > offset else 0
+                if i < len(times): heap.append((times[i] + offset, n, i))
+        heapq.heapify(heap)
+        prev = start
+        while heap:
+            t, n, i = heap[0]
+            song = layers[n].song
+            if i + 1 < len(song.times):
+                heapq.heapreplace(heap, (song.times[i + 1] + offsets[n], n, i + 1))
+            else:
+                heapq.heappop(heap)
+            yield LayeredEvent(_TYPE_NAMES[song.kinds[i]], song.notes[i], song.velocities[i], t - prev, song.channels[i], layers[n])
+            prev = t
+
+
+class KeyRefCounts:
+    """Reference-counted key state shared by all layers.
+
+    Two layers holding the same key produce one key-down; the key-up goes
+    out when the last of them lets go, so one layer can't cut off another's
+    note.
+    """
+
+    def __init__(self):
+        self.counts = {}
+
+    def press(self, keys):
+        """Returns the keys that actually need a key-down."""
+        counts = self.counts
+        fresh = []
+        for k in keys if isinstance(keys, list) else [keys]:
+            n = counts.get(k, 0)
+            counts[k] = n + 1
+            if not n: fresh.append(k)
+        return fresh
+
+    def release(self, keys):
+        """Returns the keys that actually need a key-up."""
+        counts = self.counts
+        gone = []
+        for k in keys if isinstance(keys, list) else [keys]:
+            n = counts.get(k, 0)
+            if n <= 1:
+                if n: gone.append(k)
+                counts.pop(k, None)
+            else:
+                counts[k] = n - 1
+        return gone
+
+    def clear(self):
+        self.counts.clear()
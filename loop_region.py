@@ -0,0 +1,129 @@
+import bisect
+
+from midi_stream import NoteEvent, EV_NOTE_ON, EV_NOTE_OFF
+
+# Ceiling for the per-repeat speed-up, as a multiple of the slider speed
+MAX_LOOP_RATE = 2.0
+
+LOOP_COUNT_OPTIONS = ["∞", "2x", "4x", "8x", "16x"]
+LOOP_SPEEDUP_OPTIONS = ["+0%", "+2%", "+5%", "+10%"]
+
+
+def parse_loop_count(option):
+    return 0 if option == "∞" else int(option.rstrip("x"))
+
+
+def parse_loop_speedup(option):
+    return float(option.strip("+%"))
+
+
+def format_song_time(seconds):
+    return f"{int(seconds // 60)}:{seconds % 60:04.1f}"
+
+
+def loop_active(cfg):
+    return cfg.loop_b > cfg.loop_a
+
+
+class LoopedEvents:
+    """Plays a compiled song from `start`, wrapping from B back to A.
+
+    Yields NoteEvents with delta times like SongColumns.iter_events. At the
+    wrap, the notes still sounding are released at exactly B and the notes
+    that would be sounding at A are pressed again with zero delta, so both
+    land in the same scheduling tick as the jump. Nothing is re-read; the
+    wrap just moves the index back.
+
+    The markers, loop count and speed-up are read from `get_config()` as
+    playback goes, so moving a marker takes effect on the next pass.
+    `position` is the song time of the last event yielded and `rate` the
+    current speed-up multiplier, which the caller folds into its speed. The
+    speed-up and pass count belong to one region: clearing the loop, moving a
+    marker or leaving through B puts `rate` back to 1.
+    """
+
+    def __init__(self, song, get_config, start=0.0):
+        self.song = song
+        self.get_config = get_config
+        self.start = start
+        self.position = start
+        self.rate = 1.0
+        self.passes = 0
+        self._region = None
+        self._held_at = (None, ())
+
+    def held_at(self, t):
+        """(channel, note, velocity) of every note sounding just before `t`, cached per marker."""
+        if self._held_at[0] == t: return self._held_at[1]
+        song = self.song
+        sounding = {}
+        for i in range(bisect.bisect_left(song.times, t)):
+            key = (song.channels[i], song.notes[i])
+            if song.kinds[i] == EV_NOTE_ON:
+                sounding[key] = song.velocities[i]
+            elif song.kinds[i] == EV_NOTE_OFF:
+                sounding.pop(key, None)
+        held = tuple((chan, note, vel) for (chan, note), vel in sounding.items())
+        self._held_at = (t, held)
+        return held
+
+    def __iter__(self):
+        song = self.song
+        times, kinds, notes, vels, chans = song.times, song.kinds, song.notes, song.velocities, song.channels
+        end = len(times)
+        i = bisect.bisect_left(times, self.start) if self.start > 0 else 0
+        prev = self.start
+        # Song time already passed but not yet spent on an event's delta
+        carry = 0.0
+        # Notes this iterator has pressed and not yet released, so the wrap knows what to let go of
+        sounding = {}
+
+        while True:
+            cfg = self.get_config()
+            region = (cfg.loop_a, cfg.loop_b) if loop_active(cfg) else None
+            if region != self._region:
+                self._region = region
+                self.rate = 1.0
+                self.passes = 0
+            a, b = cfg.loop_a, min(cfg.loop_b, song.duration)
+            next_t = times[i] if i < end else float('inf')
+            crossing_b = a <= prev < b <= next_t
+            if crossing_b and not self.should_wrap(cfg, a, b):
+                # Last pass done: the rest of the song plays at the normal speed
+                self.rate = 1.0
+            elif crossing_b:
+                # Release at B, press what sounds at A, carry on from A: one tick, no gap
+                carry += b - prev
+                for chan, note in sounding:
+                    self.position = b
+                    yield NoteEvent("note_off", note, 0, carry, chan)
+                    carry = 0.0
+                sounding.clear()
+                for chan, note, vel in self.held_at(a):
+                    self.position = a
+                    yield NoteEvent("note_on", note, vel, carry, chan)
+                    carry = 0.0
+                    sounding[(chan, note)] = vel
+                self.passes += 1
+                if cfg.loop_speedup:
+                    self.rate = min(MAX_LOOP_RATE, self.rate * (1 + cfg.loop_speedup / 100))
+                i = bisect.bisect_left(times, a)
+                prev = self.position = a
+                continue
+            if i >= end: return
+
+            kind = kinds[i]
+            key = (chans[i], notes[i])
+            if kind == EV_NOTE_ON: sounding[key] = vels[i]
+            elif kind == EV_NOTE_OFF: sounding.pop(key, None)
+            msg = NoteEvent("note_on" if kind == EV_NOTE_ON else "note_off", notes[i], vels[i], next_t - prev + carry, chans[i])
+            carry = 0.0
+            prev = self.position = next_t
+            i += 1
+            yield msg
+
+    def should_wrap(self, cfg, a, b):
+        if cfg.loop_count and self.passes >= cfg.loop_count - 1: return False
+        # A region with nothing in it would wrap forever without yielding
+        times = self.song.times
+        return bisect.bisect_left(times, a) != bisect.bisect_left(times, b) or bool(self.held_at(a))
@@ -1,3 +1,11 @@
+import sys
+from single_instance import forward_to_running_instance
+
+# A second launch ("open with", double-clicked .mid) hands its files to the running app and quits
+# before any of the heavy imports below
+if __name__ == "__main__" and forward_to_running_instance(sys.argv[1:]):
+    sys.exit(0)
+
 import customtkinter as ctk
 import tkinter as tk
 from tkinter import filedialog
@@ -12,8 +20,7 @@ import os
 import ctypes
 import webbrowser
 import shutil
-import sys
-import random
+import multiprocessing
 
 try:
     import rtmidi
@@ -28,6 +35,30 @@ from constants import *
 from utils import *
 from ui_components import *
 from midi_processing import *
+from playlist import *
+from recorder import *
+from dry_run import *
+from playback_control import *
+from engine_config import *
+from hotkeys import *
+from window_watcher import *
+from engine_process import *
+from async_engine import *
+from profile_index import *
+from profile_watcher import *
+from keymap_ops import copy_range
+from loop_region import *
+from layers import *
+from frame_output import *
+from engine_stats import *
+from control_server import *
+from single_instance import *
+from net_midi import *
+from device_monitor import *
+from tracing import *
+from piano_roll import *
+
+THEME.track_names(globals())
 
 class MidiKeyTranslatorApp(ctk.CTk):
     def __init__(self):
@@ -50,8 +81,30 @@ class MidiKeyTranslatorApp(ctk.CTk):
         self.grid_rowconfigure(0, weight=1)
 
         self.live_running = False
-        self.file_playing = False
-        self.file_paused = False
+        self.engine_backend = None
+        self.engine_mode_var = ctk.StringVar(value=ENGINE_MODES[0])
+        self.realtime_var = tk.BooleanVar(value=False)
+        self.cpu_core_var = ctk.StringVar(value="Auto")
+        self.net_buffer_var = ctk.StringVar(value=NET_BUFFER_OPTIONS[0])
+        self.net_peers_var = ctk.StringVar(value="")
+        self.frame_rate_var = ctk.StringVar(value=FRAME_RATE_OPTIONS[0])
+        self.latency = LatencyStats()
+        self.counters = EngineCounters()
+        self.frame_output = FrameOutput(lambda: self.engine_config)
+        self.tracer = SpanTracer()
+        self.control_api_var = tk.BooleanVar(value=False)
+        self.control_server = None
+        self.device_monitor = DeviceMonitor(log=self.log)
+        self.device_monitor.add_listener(lambda names, added, removed: self.after(0, lambda: self.update_device_menu(names)))
+        self.playback = PlaybackControl()
+        self.playback.add_listener(self.on_playback_state)
+        # (song seconds, perf_counter when reached, loop speed-up), written by the playback thread on every event
+        self.position = (0.0, 0.0, 1.0)
+        self.roll_win = None
+        self.roll_song = None
+        self.layer_set = LayerSet()
+        self.layers_win = None
+        self.now_playing = ""
         self.file_thread = None
         self.live_thread = None
         self.held_keys = set()
@@ -68,17 +121,31 @@ class MidiKeyTranslatorApp(ctk.CTk):
         self.target_window_title = tk.StringVar(value="")
         self.transpose_var = tk.IntVar(value=0)
 
-        self.safe_speed = 1.0
-        self.safe_use_target = True
-        self.safe_target_title = ""
-        self.safe_jitter = False
-        self.safe_fallback = True
-
         self.current_filename = DEFAULT_FILENAME
         self.key_map, self.current_metadata = load_profile_data(self.current_filename)
+        self.counters.profile = self.current_filename
+        # Worker threads only ever read this snapshot; see publish_config
+        self.engine_config = EngineConfig(key_map=dict(self.key_map))
         
+        self.profile_index = ProfileIndex()
+        self.profile_win = None
         self.profile_cache = []
+        self.window_matcher = WindowMatcher([])
         self.scan_profiles()
+        self.window_watcher = WindowWatcher(lambda: self.window_matcher, self.on_linked_window_focused, log=self.log)
+
+        self.playlist = Playlist()
+        self.song_preparer = SongPreparer(self.log)
+        self.recorder = SessionRecorder()
+        self.hotkeys = HotkeyDispatcher(log=self.log)
+        self.hotkeys.register("play_pause", self._handle_play_pause_logic)
+        self.hotkeys.register("stop", self._handle_stop_logic)
+        self.hotkeys.register("transpose_up", lambda: self.after(0, lambda: self.change_transpose(1)))
+        self.hotkeys.register("transpose_down", lambda: self.after(0, lambda: self.change_transpose(-1)))
+        self.hotkeys.register("next_track", lambda: self.after(0, lambda: self._skip_track(1)))
+        self.hotkeys.register("prev_track", lambda: self.after(0, lambda: self._skip_track(-1)))
+        self.debug_monitor_var.trace_add("write", lambda *_: setattr(self.hotkeys, "monitor", self.debug_monitor_var.get()))
+        self.record_trace_var = tk.BooleanVar(value=False)
 
         self.main_container = ctk.CTkScrollableFrame(self, fg_color=COLOR_BG, corner_radius=0)
         self.main_container.grid(row=0, column=0, sticky="nsew")
@@ -91,7 +158,16 @@ class MidiKeyTranslatorApp(ctk.CTk):
         self.build_file_card()
         self.build_footer()
 
+        for var in (self.fallback_var, self.jitter_var, self.use_target_window, self.target_window_title, self.speed_modifier_var,
+                    self.realtime_var, self.cpu_core_var, self.net_buffer_var, self.net_peers_var, self.frame_rate_var):
+            var.trace_add("write", self.sync_config)
+        self.sync_config()
+        self.control_api_var.trace_add("write", lambda *_: self.toggle_control_api())
+
         self.populate_midi_devices()
+        self.device_monitor.start()
+        self.profile_watcher = ProfileWatcher(".", lambda names: self.after(0, self.on_profiles_changed, names), log=self.log)
+        self.profile_watcher.start()
         self.populate_window_list()
         self.protocol("WM_DELETE_WINDOW", self.on_closing)
         self.setup_hotkeys()
@@ -99,6 +175,12 @@ class MidiKeyTranslatorApp(ctk.CTk):
         self.after(1000, self.check_initial_profile)
         self.after(200, self.check_disclaimer)
 
+        launch = parse_launch_args(sys.argv[1:])
+        self.instance_server = InstanceServer(lambda req: self.after(0, self.on_launch_request, req), self.log)
+        self.instance_server.start(TAKEOVER_WAIT if launch["takeover"] else 0.0)
+        if launch["files"]:
+            self.after(300, self.on_launch_request, launch)
+
     def extract_bundled_configs(self):
         if hasattr(sys, '_MEIPASS'):
             try:
@@ -111,26 +193,30 @@ class MidiKeyTranslatorApp(ctk.CTk):
                 print(f"Config extraction failed: {e}")
 
     def scan_profiles(self):
-        self.profile_cache = []
+        # Only profiles whose file changed since the last scan are parsed again
         try:
-            for f in os.listdir("."):
-                if f.lower().endswith(".json"):
-                    _, meta = load_profile_data(f)
-                    self.profile_cache.append({"filename": f, "metadata": meta})
+            self.profile_index.scan()
         except Exception as e:
             print(f"Scan error: {e}")
+        self.profile_cache = self.profile_index.profiles
+        self.window_matcher = WindowMatcher(self.profile_cache)
 
     def check_initial_profile(self):
-        open_windows = get_open_windows()
-        open_windows_lower = [w.lower() for w in open_windows]
-
-        for prof in self.profile_cache:
-            link = prof["metadata"].get("linked_window", "")
-            if link:
-                link_lower = link.lower()
-                if any(link_lower in w for w in open_windows_lower) and prof["filename"] != self.current_filename:
-                    self.load_profile(prof["filename"])
-                    break
+        filename = self.window_matcher.match_any(get_open_windows())
+        if filename and filename != self.current_filename:
+            self.load_profile(filename)
+        self.window_watcher.start()
+
+    def on_linked_window_focused(self, filename):
+        # Watcher thread: hand the switch to the Tk thread
+        self.after(0, lambda: self.auto_switch_profile(filename))
+
+    def auto_switch_profile(self, filename):
+        if filename == self.current_filename: return
+        self.log(f"Auto-switching profile: {filename}")
+        # Keys held under the old mapping would not be released by the new one
+        self.release_held_keys()
+        self.load_profile(filename)
 
     def check_disclaimer(self):
         marker_file = "eula_accepted"
@@ -178,10 +264,9 @@ class MidiKeyTranslatorApp(ctk.CTk):
 
     def restart_as_admin(self):
         try:
-            if getattr(sys, 'frozen', False):
-                ctypes.windll.shell32.ShellExecuteW(None, "runas", sys.executable, " ".join(sys.argv[1:]), None, 1)
-            else:
-                ctypes.windll.shell32.ShellExecuteW(None, "runas", sys.executable, " ".join(sys.argv), None, 1)
+            # The elevated copy waits for this one to let go of the instance port
+            self.instance_server.stop()
+            ctypes.windll.shell32.ShellExecuteW(None, "runas", sys.executable, " ".join(relaunch_args()), None, 1)
             self.destroy()
         except Exception as e:
             print(f"Admin restart failed: {e}")
@@ -196,6 +281,7 @@ class MidiKeyTranslatorApp(ctk.CTk):
         ctrl_frame = ctk.CTkFrame(header, fg_color="transparent")
         ctrl_frame.pack(pady=(5, 0))
         ctk.CTkButton(ctrl_frame, text="🎨 Theme", width=80, height=24, fg_color="#333", hover_color="#444", font=ctk.CTkFont(size=11), command=self.open_theme_editor).pack(side="left", padx=5)
+        ctk.CTkButton(ctrl_frame, text="⚙ Engine", width=80, height=24, fg_color="#333", hover_color="#444", font=ctk.CTkFont(size=11), command=self.open_engine_settings).pack(side="left", padx=5)
 
         if not ctypes.windll.shell32.IsUserAnAdmin():
             ctk.CTkButton(ctrl_frame, text="🛡️ Run as Admin", width=120, height=24, fg_color="#333", hover_color="#444", command=self.restart_as_admin).pack(side="left", padx=5)
@@ -347,6 +433,12 @@ class MidiKeyTranslatorApp(ctk.CTk):
         )
         self.stop_live_btn.grid(row=0, column=1, padx=(5, 0), sticky="ew")
 
+        rec_frame = ctk.CTkFrame(card, fg_color="transparent")
+        rec_frame.grid(row=3, column=0, padx=20, pady=(0, 15), sticky="ew")
+        self.record_btn = ctk.CTkButton(rec_frame, text="⏺ Record", width=100, height=24, fg_color="#333", hover_color="#444", command=self.toggle_recording)
+        self.record_btn.pack(side="left")
+        ctk.CTkCheckBox(rec_frame, text="Also export key trace", variable=self.record_trace_var, font=ctk.CTkFont(size=12)).pack(side="left", padx=10)
+
     def build_file_card(self):
         card = ctk.CTkFrame(self.main_container, fg_color=COLOR_CARD, corner_radius=15)
         card.grid(row=4, column=0, padx=20, pady=10, sticky="ew")
@@ -363,10 +455,26 @@ class MidiKeyTranslatorApp(ctk.CTk):
 
         self.file_lbl = ctk.CTkLabel(file_frame, text="No file selected", text_color="gray")
         self.file_lbl.pack(side="left", fill="x", expand=True, anchor="w")
+        ctk.CTkButton(file_frame, text="Layers", width=55, command=self.open_layers, fg_color="#333", hover_color="#444").pack(side="right", padx=(5, 0))
+        ctk.CTkButton(file_frame, text="Roll", width=45, command=self.open_piano_roll, fg_color="#333", hover_color="#444").pack(side="right", padx=(5, 0))
+        ctk.CTkButton(file_frame, text="Dry Run", width=60, command=self.dry_run_current, fg_color="#333", hover_color="#444").pack(side="right", padx=(5, 0))
+        ctk.CTkButton(file_frame, text="+ Queue", width=60, command=self.queue_files, fg_color="#333", hover_color="#444").pack(side="right", padx=(5, 0))
         ctk.CTkButton(file_frame, text="Select File", width=80, command=self.select_file, fg_color="#333", hover_color="#444").pack(side="right")
 
+        queue_frame = ctk.CTkFrame(card, fg_color="transparent")
+        queue_frame.grid(row=2, column=0, padx=20, pady=(0, 5), sticky="ew")
+        ctk.CTkButton(queue_frame, text="⏮", width=30, height=24, command=self.play_previous, fg_color="#333", hover_color="#444").pack(side="left")
+        ctk.CTkButton(queue_frame, text="⏭", width=30, height=24, command=self.play_next, fg_color="#333", hover_color="#444").pack(side="left", padx=5)
+        self.queue_lbl = ctk.CTkLabel(queue_frame, text="Queue empty", font=ctk.CTkFont(size=12), text_color=COLOR_TEXT_SUB)
+        self.queue_lbl.pack(side="left", padx=5)
+
+        self.repeat_var = ctk.StringVar(value=REPEAT_MODES[0])
+        ctk.CTkOptionMenu(queue_frame, values=REPEAT_MODES, variable=self.repeat_var, command=self.on_repeat_change, width=110, height=24, fg_color="#333", button_color="#444").pack(side="right")
+        self.shuffle_var = tk.BooleanVar(value=False)
+        ctk.CTkSwitch(queue_frame, text="Shuffle", variable=self.shuffle_var, command=self.on_shuffle_toggle, button_color=COLOR_PRIMARY, progress_color=COLOR_PRIMARY).pack(side="right", padx=5)
+
         speed_frame = ctk.CTkFrame(card, fg_color="transparent")
-        speed_frame.grid(row=2, column=0, padx=20, pady=(5, 10), sticky="ew")
+        speed_frame.grid(row=3, column=0, padx=20, pady=(5, 10), sticky="ew")
         speed_frame.grid_columnconfigure(1, weight=1)
 
         ctk.CTkLabel(speed_frame, text="Playback Speed:", font=ctk.CTkFont(size=12)).grid(row=0, column=0, sticky="w")
@@ -385,8 +493,21 @@ class MidiKeyTranslatorApp(ctk.CTk):
         self.speed_label = ctk.CTkLabel(speed_frame, text="1.00x", font=ctk.CTkFont(size=12, weight="bold"))
         self.speed_label.grid(row=0, column=2, padx=(10, 0), sticky="e")
 
+        loop_frame = ctk.CTkFrame(card, fg_color="transparent")
+        loop_frame.grid(row=4, column=0, padx=20, pady=(0, 5), sticky="ew")
+        ctk.CTkLabel(loop_frame, text="Loop:", font=ctk.CTkFont(size=12)).pack(side="left")
+        ctk.CTkButton(loop_frame, text="A", width=28, height=24, command=lambda: self.set_loop_marker("a"), fg_color="#333", hover_color="#444").pack(side="left", padx=(10, 0))
+        ctk.CTkButton(loop_frame, text="B", width=28, height=24, command=lambda: self.set_loop_marker("b"), fg_color="#333", hover_color="#444").pack(side="left", padx=5)
+        ctk.CTkButton(loop_frame, text="✕", width=28, height=24, command=self.clear_loop, fg_color="#333", hover_color=COLOR_DANGER).pack(side="left")
+        self.loop_lbl = ctk.CTkLabel(loop_frame, text="Off", font=ctk.CTkFont(size=12), text_color=COLOR_TEXT_SUB)
+        self.loop_lbl.pack(side="left", padx=10)
+        self.loop_speedup_var = ctk.StringVar(value=LOOP_SPEEDUP_OPTIONS[0])
+        ctk.CTkOptionMenu(loop_frame, values=LOOP_SPEEDUP_OPTIONS, variable=self.loop_speedup_var, command=self.on_loop_options, width=70, height=24, fg_color="#333", button_color="#444").pack(side="right")
+        self.loop_count_var = ctk.StringVar(value=LOOP_COUNT_OPTIONS[0])
+        ctk.CTkOptionMenu(loop_frame, values=LOOP_COUNT_OPTIONS, variable=self.loop_count_var, command=self.on_loop_options, width=60, height=24, fg_color="#333", button_color="#444").pack(side="right", padx=5)
+
         ctrl_frame = ctk.CTkFrame(card, fg_color="transparent")
-        ctrl_frame.grid(row=3, column=0, padx=20, pady=(10, 15), sticky="ew")
+        ctrl_frame.grid(row=5, column=0, padx=20, pady=(10, 15), sticky="ew")
         ctrl_frame.grid_columnconfigure((0,1,2), weight=1)
         
         self.btn_play = ctk.CTkButton(
@@ -432,25 +553,146 @@ class MidiKeyTranslatorApp(ctk.CTk):
         self.pin_check.pack(side="left", padx=20, pady=10)
         ctk.CTkButton(footer, text="☕ Donate", width=80, height=24, fg_color="#333", hover_color="#FF5E5B", font=ctk.CTkFont(size=11), command=lambda: webbrowser.open("https://ko-fi.com/unbutteredbagel")).pack(side="right", padx=20)
 
+    def set_loop_marker(self, which):
+        t = self.playback_position()
+        cfg = self.engine_config
+        if which == "a":
+            self.publish_config(loop_a=t, loop_b=cfg.loop_b if cfg.loop_b > t else 0.0)
+        else:
+            self.publish_config(loop_a=cfg.loop_a if cfg.loop_a < t else 0.0, loop_b=t)
+        self.update_loop_ui()
+
+    def clear_loop(self):
+        self.publish_config(loop_a=0.0, loop_b=0.0)
+        self.update_loop_ui()
+
+    def on_loop_options(self, _value=None):
+        self.publish_config(loop_count=parse_loop_count(self.loop_count_var.get()),
+                            loop_speedup=parse_loop_speedup(self.loop_speedup_var.get()))
+
+    def update_loop_ui(self):
+        cfg = self.engine_config
+        if loop_active(cfg):
+            self.loop_lbl.configure(text=f"{format_song_time(cfg.loop_a)} → {format_song_time(cfg.loop_b)}", text_color=COLOR_PRIMARY)
+        elif cfg.loop_a:
+            self.loop_lbl.configure(text=f"{format_song_time(cfg.loop_a)} → ?", text_color=COLOR_TEXT_SUB)
+        else:
+            self.loop_lbl.configure(text="Off", text_color=COLOR_TEXT_SUB)
+
     def on_speed_change(self, value):
         self.speed_label.configure(text=f"{value:.2f}x")
-        self.sync_config()
 
-    def on_window_select(self, value):
-        self.sync_config()
+    def sync_config(self, *_):
+        self.publish_config(
+            speed=self.speed_modifier_var.get(),
+            use_target=self.use_target_window.get(),
+            target_title=self.target_window_title.get(),
+            jitter=self.jitter_var.get(),
+            fallback=self.fallback_var.get(),
+            realtime=self.realtime_var.get(),
+            cpu_core=int(self.cpu_core_var.get()) if self.cpu_core_var.get().isdigit() else -1,
+            net_buffer_ms=parse_buffer_option(self.net_buffer_var.get()),
+            net_peers=parse_peer_list(self.net_peers_var.get()),
+            frame_rate=parse_frame_rate(self.frame_rate_var.get()),
+        )
 
-    def sync_config(self, _=None):
-        self.safe_speed = self.speed_modifier_var.get()
-        self.safe_use_target = self.use_target_window.get()
-        self.safe_target_title = self.target_window_title.get()
-        self.safe_jitter = self.jitter_var.get()
-        self.safe_fallback = self.fallback_var.get()
+    def publish_config(self, **changes):
+        # Tk thread only. Workers pick up the new snapshot with a single attribute read.
+        self.engine_config = self.engine_config.with_changes(**changes)
+        if self.engine_backend:
+            self.engine_backend.send("config", self.engine_config)
+            self.sync_output_filter()
+
+    def sync_output_filter(self):
+        # Keys sent from the engine process are never marked in this one, so while it plays,
+        # anything the keymap can send is kept away from the hotkeys
+        remote = isinstance(self.engine_backend, EngineProcess) and (self.playback.is_playing or self.live_running)
+        INJECTED_KEYS.set_output_keys(self.engine_config.note_keys if remote else ())
+
+    def release_held_keys(self):
+        release_all_held_keys(self)
+        if self.engine_backend:
+            self.engine_backend.send("release_keys")
+
+    def open_engine_settings(self):
+        EngineSettings(self)
+
+    def set_engine_mode(self, mode):
+        backend = {"Separate Process": EngineProcess, "Asyncio": AsyncEngine}.get(mode)
+        if backend is (type(self.engine_backend) if self.engine_backend else None): return
+        self.stop_file()
+        if self.live_running: self.stop_live()
+        # Finish a take before live input can move to a backend that doesn't record
+        if self.recorder.active: self.toggle_recording()
+
+        if self.engine_backend:
+            self.engine_backend.close()
+            self.engine_backend = None
+            self.sync_output_filter()
+        self.record_btn.configure(state="normal")
+        if backend is None:
+            self.log("Engine: threaded")
+            return
+        try:
+            self.engine_backend = EngineProcess(self.log) if backend is EngineProcess else AsyncEngine(self)
+        except Exception as e:
+            self.log(f"Could not start {mode} engine: {e}")
+            self.engine_mode_var.set(ENGINE_MODES[0])
+            return
+        self.engine_backend.send("config", self.engine_config)
+        if backend is EngineProcess:
+            # Live input is read in the child process, where nothing is recorded
+            self.record_btn.configure(state="disabled")
+        self.log(f"Engine: {mode.lower()}")
+        self.poll_engine_events()
+
+    def toggle_control_api(self):
+        if self.control_api_var.get() == (self.control_server is not None): return
+        if self.control_server:
+            self.control_server.stop()
+            self.control_server = None
+            self.log("Control API stopped")
+            return
+        server = ControlServer(self)
+        try:
+            server.start()
+        except OSError as e:
+            self.log(f"Control API could not listen on {server.host}:{server.port}: {e}")
+            self.control_api_var.set(False)
+            return
+        self.control_server = server
+        self.log(f"Control API listening on http://{server.host}:{server.port}")
+
+    def poll_engine_events(self):
+        proc = self.engine_backend
+        if proc is None: return
+        # Stats first: the report sent at song end is already here when EV_FILE_DONE is
+        for stats in proc.poll_stats():
+            apply_engine_stats(self.counters, self.latency, stats)
+        for _t, kind, note, value in proc.poll_events():
+            if kind == EV_NOTE_ON:
+                self.update_note_ui(midi_to_note_name(note), True)
+            elif kind == EV_NOTE_OFF:
+                self.update_note_ui(None, False)
+            elif kind == EV_FILE_DONE:
+                self.on_file_finished(value, bool(note))
+            elif kind == EV_LIVE_STOPPED and self.live_running:
+                self.stop_live()
+        if not proc.is_alive():
+            self.log("Engine backend exited, falling back to threaded engine")
+            self.engine_backend = None
+            self.engine_mode_var.set(ENGINE_MODES[0])
+            self.record_btn.configure(state="normal")
+            self.sync_output_filter()
+            self.playback.stop()
+            return
+        self.after(ENGINE_POLL_MS, self.poll_engine_events)
 
     def open_debug_console(self):
         if self.debug_win is None or not self.debug_win.winfo_exists():
             self.debug_win = ctk.CTkToplevel(self)
             self.debug_win.title("Debug Console")
-            self.debug_win.geometry("400x300")
+            self.debug_win.geometry("480x500")
             self.debug_win.attributes("-topmost", True)
             self.debug_text = ctk.CTkTextbox(self.debug_win, font=ctk.CTkFont(family="Consolas", size=12))
             self.debug_text.pack(fill="both", expand=True, padx=5, pady=5)
@@ -459,8 +701,51 @@ class MidiKeyTranslatorApp(ctk.CTk):
             self.log(f"Debug Console Opened. Admin Mode: {is_admin}")
             
             ctk.CTkCheckBox(self.debug_win, text="Monitor Key Input", variable=self.debug_monitor_var, font=ctk.CTkFont(size=12)).pack(pady=5)
+            self.trace_btn = ctk.CTkButton(self.debug_win, text="", width=160, height=24, fg_color="#333", hover_color="#444",
+                                           font=ctk.CTkFont(size=11), command=self.toggle_trace)
+            self.trace_btn.pack(pady=(0, 5))
+            self.update_trace_btn()
+
+            NoteHeatmap(self.debug_win, self.counters).pack(pady=(5, 0))
+            stats_frame = ctk.CTkFrame(self.debug_win, fg_color="transparent")
+            stats_frame.pack(pady=5)
+            ctk.CTkButton(stats_frame, text="Export Note Stats", width=120, height=24, fg_color="#333", hover_color="#444",
+                          font=ctk.CTkFont(size=11), command=self.export_note_stats).pack(side="left", padx=5)
+            ctk.CTkButton(stats_frame, text="Reset", width=60, height=24, fg_color="#333", hover_color="#444",
+                          font=ctk.CTkFont(size=11), command=lambda: self.counters.reset_notes()).pack(side="left", padx=5)
         self.debug_win.lift()
 
+    def export_note_stats(self):
+        name = os.path.splitext(os.path.basename(self.current_filename))[0]
+        path = filedialog.asksaveasfilename(defaultextension=".csv", filetypes=[("CSV", "*.csv")], initialfile=f"{name}_note_stats.csv")
+        if not path: return
+        try:
+            rows = self.counters.export_csv(path)
+            self.log(f"Exported note stats for {rows} notes to {path}")
+        except OSError as e:
+            self.log(f"Note stats export failed: {e}")
+
+    def toggle_trace(self):
+        tracer = self.tracer
+        if not tracer.enabled:
+            tracer.start()
+            self.log(f"Tracing playback (~{measure_trace_overhead(10000):.2f} µs per span)")
+        else:
+            tracer.stop()
+            path = filedialog.asksaveasfilename(defaultextension=".json", filetypes=[("Chrome Trace", "*.json")], initialfile="playback_trace.json")
+            if path:
+                try:
+                    count = tracer.export_chrome(path)
+                    self.log(f"Exported {count} spans to {path}")
+                except OSError as e:
+                    self.log(f"Trace export failed: {e}")
+        self.update_trace_btn()
+
+    def update_trace_btn(self):
+        recording = self.tracer.enabled
+        self.trace_btn.configure(text="■ Stop & Export Trace" if recording else "● Start Trace",
+                                 fg_color=COLOR_DANGER if recording else "#333")
+
     def log(self, message):
         timestamp = time.strftime("%H:%M:%S")
         full_msg = f"[{timestamp}] {message}"
@@ -483,17 +768,18 @@ class MidiKeyTranslatorApp(ctk.CTk):
 
     def populate_midi_devices(self):
         try:
-            devices = mido.get_input_names()
-            if devices:
-                self.device_menu.configure(values=devices)
-                self.device_var.set("Select Device...")
-            else:
-                self.device_menu.configure(values=["No Device Found"])
-                self.device_var.set("No Device Found")
+            # The network input is always available, even with no local devices
+            devices = mido.get_input_names() + [NET_INPUT_NAME]
+            self.device_menu.configure(values=devices)
+            self.device_var.set("Select Device...")
         except Exception as e:
             self.device_menu.configure(values=[f"Error: {e}"])
             self.device_var.set("Error")
 
+    def update_device_menu(self, names):
+        # Hot-plug refresh: keep the current selection
+        self.device_menu.configure(values=names + [NET_INPUT_NAME])
+
     def on_device_select(self, choice):
         if choice in ["No Device Found", "Error", "Select Device..."]: return
         if self.live_running:
@@ -512,8 +798,12 @@ class MidiKeyTranslatorApp(ctk.CTk):
 
     def start_live(self, device_name):
         self.live_running = True
-        self.live_thread = threading.Thread(target=live_loop, args=(self, device_name,), daemon=True)
-        self.live_thread.start()
+        if self.engine_backend:
+            self.engine_backend.send("live_start", device_name)
+            self.sync_output_filter()
+        else:
+            self.live_thread = threading.Thread(target=live_loop, args=(self, device_name,), daemon=True)
+            self.live_thread.start()
 
         self.start_live_btn.configure(state="disabled")
         self.stop_live_btn.configure(state="normal")
@@ -523,6 +813,9 @@ class MidiKeyTranslatorApp(ctk.CTk):
 
     def stop_live(self):
         self.live_running = False
+        if self.engine_backend:
+            self.engine_backend.send("live_stop")
+            self.sync_output_filter()
         release_all_held_keys(self)
         self.stop_live_btn.configure(state="disabled")
         self.start_live_btn.configure(state="normal")
@@ -534,62 +827,309 @@ class MidiKeyTranslatorApp(ctk.CTk):
         else:
             self.update_status_ui("Ready", "Live input stopped", COLOR_BTN_DISABLED_BG)
 
+    def toggle_recording(self):
+        if not self.recorder.active:
+            self.recorder.start()
+            self.record_btn.configure(text="⏹ Stop Rec", fg_color=COLOR_DANGER)
+            self.log("Recording live input")
+            return
+
+        count = self.recorder.stop()
+        self.record_btn.configure(text="⏺ Record", fg_color="#333")
+        self.log(f"Recording stopped: {count} events")
+        if not count: return
+
+        path = filedialog.asksaveasfilename(defaultextension=".mid", filetypes=[("MIDI", "*.mid")])
+        if not path: return
+        try:
+            self.recorder.export_midi(path)
+            self.log(f"Saved recording: {path}")
+            if self.record_trace_var.get():
+                trace_path = os.path.splitext(path)[0] + "_keys.csv"
+                self.recorder.export_key_trace(trace_path, self.engine_config)
+                self.log(f"Saved key trace: {trace_path}")
+        except Exception as e:
+            messagebox.showerror("Export Error", f"Could not save recording:\n{e}")
+
+    def dry_run_current(self):
+        if not getattr(self, 'current_midi_file', None): return
+        path = filedialog.asksaveasfilename(defaultextension=".csv", filetypes=[("Keystroke Trace", "*.csv")],
+                                            initialfile=os.path.splitext(os.path.basename(self.current_midi_file))[0] + "_keys.csv")
+        if not path: return
+        src = self.current_midi_file
+        cfg = self.engine_config
+
+        def worker():
+            try:
+                t0 = time.perf_counter()
+                result = dry_run_file(src, cfg)
+                write_trace_csv(path, result.trace)
+                self.log(f"Dry run of {os.path.basename(src)} rendered in {(time.perf_counter() - t0) * 1000:.0f} ms -> {path}")
+                for line in result.summary().splitlines(): self.log(line)
+            except Exception as e:
+                self.log(f"Dry run failed: {e}")
+        threading.Thread(target=worker, daemon=True).start()
+
     def select_file(self):
-        f = filedialog.askopenfilename(filetypes=[("MIDI", "*.mid *.midi")])
-        if f:
-            self.current_midi_file = f
-            self.file_lbl.configure(text=os.path.basename(f))
-            self.btn_play.configure(state="normal", fg_color=COLOR_FILE_GO)
+        files = filedialog.askopenfilenames(filetypes=[("MIDI", "*.mid *.midi")])
+        if files:
+            self.playlist.set_entries(files)
+            self.load_current_entry()
+
+    def queue_files(self):
+        files = filedialog.askopenfilenames(filetypes=[("MIDI", "*.mid *.midi")])
+        if not files: return
+        self.playlist.add(files)
+        if not getattr(self, 'current_midi_file', None):
+            self.load_current_entry()
+        else:
+            self.update_queue_ui()
+            self.prefetch_next()
+
+    def load_current_entry(self):
+        f = self.playlist.current()
+        if not f: return
+        # Markers belong to the song they were set in
+        if f != getattr(self, 'current_midi_file', None) and (self.engine_config.loop_a or self.engine_config.loop_b):
+            self.clear_loop()
+        self.current_midi_file = f
+        self.file_lbl.configure(text=os.path.basename(f))
+        self.btn_play.configure(state="normal", fg_color=COLOR_FILE_GO)
+        self.update_queue_ui()
+        self.prefetch_next()
+        if self.roll_win is not None and self.roll_win.winfo_exists():
+            self.load_roll_song(f)
+
+    def open_piano_roll(self):
+        if self.roll_win is None or not self.roll_win.winfo_exists():
+            self.roll_win = PianoRollWindow(self)
+            if getattr(self, 'current_midi_file', None):
+                self.load_roll_song(self.current_midi_file)
+        self.roll_win.lift()
+
+    def load_roll_song(self, path):
+        if self.roll_song and self.roll_song[0] == path:
+            self.roll_win.set_song(self.roll_song[1], os.path.basename(path))
+            return
 
-    def start_file(self):
-        self.log("Attempting to start file...")
-        if not hasattr(self, 'current_midi_file'): return
+        def build():
+            try:
+                spans = NoteSpans(compile_song(path))
+            except Exception as e:
+                self.log(f"Piano roll failed for {os.path.basename(path)}: {e}")
+                return
+            self.after(0, lambda: self.show_roll_song(path, spans))
+        threading.Thread(target=build, daemon=True).start()
+
+    def show_roll_song(self, path, spans):
+        self.roll_song = (path, spans)
+        if path == getattr(self, 'current_midi_file', None) and self.roll_win is not None and self.roll_win.winfo_exists():
+            self.roll_win.set_song(spans, os.path.basename(path))
+
+    def playback_position(self):
+        """Current song time in seconds, extrapolated from the last event the playback thread reached."""
+        song_t, wall_t, rate = self.position
+        if self.playback.state != PLAYING: return song_t
+        return song_t + (time.perf_counter() - wall_t) * self.engine_config.speed * rate
+
+    def prefetch_next(self):
+        # Idle: prepare the selected song so Play starts instantly. Playing: prepare the one after it.
+        if self.file_playing:
+            self.song_preparer.prefetch(self.playlist.peek_next())
+        else:
+            self.song_preparer.prefetch(self.playlist.current())
 
-        if self.file_playing and not self.file_paused: return
+    def update_queue_ui(self):
+        self.queue_lbl.configure(text=self.playlist.label())
+
+    def on_repeat_change(self, value):
+        self.playlist.repeat = value
+        self.prefetch_next()
+
+    def on_shuffle_toggle(self):
+        self.playlist.set_shuffle(self.shuffle_var.get())
+        self.update_queue_ui()
+        self.prefetch_next()
+
+    def play_next(self):
+        self._skip_track(1)
+
+    def play_previous(self):
+        self._skip_track(-1)
 
+    def _skip_track(self, step):
+        if not self.playlist.entries: return
+        if self.playlist.advance(step) is None: return
+        self.load_current_entry()
+        if self.file_playing:
+            self._launch_file()
+
+    def on_file_finished(self, session, completed):
+        if not self.playback.is_active(session): return
+        if completed and self.playlist.peek_next():
+            self.playlist.advance(auto=True)
+            self.load_current_entry()
+            self._launch_file()
+        else:
+            self.playback.stop(session)
+
+    @property
+    def file_playing(self):
+        return self.playback.is_playing
+
+    @property
+    def file_paused(self):
+        return self.playback.is_paused
+
+    def focus_target_window(self):
         if self.use_target_window.get():
             target = self.window_dropdown.get()
             if target and target != "Select Window":
                 focus_window_by_title(target)
 
-        if self.file_playing and self.file_paused:
+    def start_file(self):
+        self.log("Attempting to start file...")
+        if not hasattr(self, 'current_midi_file'): return
+
+        if self.file_playing and not self.file_paused: return
+
+        self.focus_target_window()
+
+        if self.file_paused:
             self.log("Resuming from pause via start_file")
-            self.file_paused = False
-            self.btn_pause.configure(text="⏸ Pause", fg_color=COLOR_WARN, text_color=COLOR_TEXT_ON_WARN)
-            self.update_status_ui("Playing File", os.path.basename(self.current_midi_file), COLOR_FILE_GO)
+            self.playback.resume()
             return
 
-        self.file_playing = True
-        self.file_paused = False
-        self.file_thread = threading.Thread(target=file_loop, args=(self, self.current_midi_file,), daemon=True)
+        # With a loop set, practice starts at its beginning
+        cfg = self.engine_config
+        self._launch_file(cfg.loop_a if loop_active(cfg) else 0.0)
+
+    def on_launch_request(self, req):
+        """Files passed on the command line, by this launch or forwarded from a later one."""
+        self.deiconify()
+        self.lift()
+        self.focus_force()
+        files = [f for f in req["files"] if os.path.isfile(f)]
+        if not files: return
+        self.log(f"Opened from shell: {', '.join(os.path.basename(f) for f in files)}")
+        if req["play"]:
+            self.playlist.set_entries(files)
+            self.load_current_entry()
+            self.focus_target_window()
+            self._launch_file()
+        elif not getattr(self, 'current_midi_file', None):
+            self.playlist.set_entries(files)
+            self.load_current_entry()
+        else:
+            self.playlist.add(files)
+            self.update_queue_ui()
+            self.prefetch_next()
+
+    def play_path(self, path):
+        self.playlist.set_entries([path])
+        self.load_current_entry()
+        self.focus_target_window()
+        self._launch_file()
+
+    def seek_file(self, seconds):
+        if not hasattr(self, 'current_midi_file'): return
+        self.log(f"Seeking to {seconds:.2f}s")
+        # Seeks come from the control API or the piano roll, which may hold focus; a stopped
+        # song starts playing here, so the keys have to go to the game like start_file's
+        self.focus_target_window()
+        self._launch_file(max(0.0, seconds))
+
+    def _launch_file(self, start=0.0):
+        # Starting a new session makes any previous file_loop thread exit on its next wait,
+        # without sending its note-offs; whatever it held has to be let go of here. The new
+        # session starts first, so the old thread can't press anything once the keys are released.
+        superseded = self.playback.is_playing
+        session = self.playback.start()
+        if superseded:
+            self.release_held_keys()
+        self.position = (start, time.perf_counter(), 1.0)
+        self.now_playing = os.path.basename(self.current_midi_file)
+        if self.engine_backend:
+            self.engine_backend.send("play", self.current_midi_file, session, start)
+            self.log(f"Engine backend playing: {self.current_midi_file}")
+            self.prefetch_next()
+            return
+        source = self.song_preparer.take(self.current_midi_file) or self.current_midi_file
+        self.file_thread = threading.Thread(target=file_loop, args=(self, source, session, start), daemon=True)
         self.file_thread.start()
         self.log(f"File thread started: {self.current_midi_file}")
+        self.prefetch_next()
+
+    def open_layers(self):
+        if self.layers_win is None or not self.layers_win.winfo_exists():
+            self.layers_win = LayersWindow(self)
+        self.layers_win.lift()
+
+    def play_layers(self):
+        failed = [layer for layer in self.layer_set if layer.error is not None]
+        if failed:
+            for layer in failed:
+                self.log(f"Layer failed to load: {os.path.basename(layer.path)} ({layer.error}); remove it to play the rest")
+            return
+        if not self.layer_set.ready:
+            self.log("Layers are still loading" if len(self.layer_set) else "No layers to play")
+            return
+        self.focus_target_window()
+        superseded = self.playback.is_playing
+        # Layers always run on the in-process scheduler: one clock, one output path.
+        # A song playing on an engine backend has to stop first; the PLAYING that start()
+        # reports only tells the backend to "resume", which wouldn't stop it
+        if self.engine_backend:
+            self.engine_backend.send("stop")
+        session = self.playback.start()
+        if superseded:
+            self.release_held_keys()
+        self.position = (0.0, time.perf_counter(), 1.0)
+        self.now_playing = f"{len(self.layer_set)} layers"
+        self.file_thread = threading.Thread(target=layers_loop, args=(self, self.layer_set, session), daemon=True)
+        self.file_thread.start()
+        self.log(f"Layer thread started: {self.now_playing}")
 
-        self.btn_play.configure(state="disabled", fg_color=COLOR_BTN_DISABLED_BG)
-        self.btn_pause.configure(state="normal", text="⏸ Pause", fg_color=COLOR_WARN, text_color=COLOR_TEXT_ON_WARN)
-        self.btn_stop.configure(state="normal", fg_color=COLOR_DANGER)
-        self.update_status_ui("Playing File", os.path.basename(self.current_midi_file), COLOR_FILE_GO)
+    def on_layers_finished(self, session, completed):
+        self.playback.stop(session)
 
     def pause_file(self):
         self.log(f"Pause requested. Current state: Paused={self.file_paused}")
-        self.file_paused = not self.file_paused
-        if self.file_paused:
-            release_all_held_keys(self)
-        
-        if self.file_paused:
-            self.btn_pause.configure(text="▶ Resume", fg_color=COLOR_FILE_GO, text_color="white")
-            self.update_status_ui("Paused", "File playback paused", COLOR_WARN)
-        else:
-            self.btn_pause.configure(text="⏸ Pause", fg_color=COLOR_WARN, text_color=COLOR_TEXT_ON_WARN)
-            self.update_status_ui("Playing File", os.path.basename(self.current_midi_file), COLOR_FILE_GO)
+        self.playback.toggle_pause()
 
     def stop_file(self):
         self.log("Stop requested.")
-        self.file_playing = False
-        self.file_paused = False
-        release_all_held_keys(self)
-        
-        self.update_stop_ui()
+        self.playback.stop()
+
+    def on_playback_state(self, state, session):
+        # Runs on whichever thread changed the state; UI work is handed to the Tk thread
+        song_t, wall_t, rate = self.position
+        now = time.perf_counter()
+        if state == PAUSED:
+            # Freeze the playhead where it was; resuming restarts extrapolation from here
+            song_t += (now - wall_t) * self.engine_config.speed * rate
+        self.position = (song_t, now, rate)
+        if state != PLAYING:
+            release_all_held_keys(self)
+        if self.engine_backend:
+            self.engine_backend.send({PLAYING: "resume", PAUSED: "pause", STOPPED: "stop"}[state])
+            self.sync_output_filter()
+        self.after(0, self.refresh_file_ui)
+
+    def refresh_file_ui(self):
+        state = self.playback.state
+        if state == STOPPED:
+            self.update_stop_ui()
+            return
+
+        self.btn_play.configure(state="disabled", fg_color=COLOR_BTN_DISABLED_BG)
+        self.btn_stop.configure(state="normal", fg_color=COLOR_DANGER)
+        if state == PAUSED:
+            self.btn_pause.configure(state="normal", text="▶ Resume", fg_color=COLOR_FILE_GO, text_color="white")
+            self.update_status_ui("Paused", "File playback paused", COLOR_WARN)
+        else:
+            self.btn_pause.configure(state="normal", text="⏸ Pause", fg_color=COLOR_WARN, text_color=COLOR_TEXT_ON_WARN)
+            self.update_status_ui("Playing File", self.now_playing, COLOR_FILE_GO)
 
     def update_stop_ui(self):
         self.btn_play.configure(state="normal", fg_color=COLOR_FILE_GO)
@@ -610,56 +1150,14 @@ class MidiKeyTranslatorApp(ctk.CTk):
             self.note_display.configure(text_color=color)
             self.file_note_display.configure(text_color=color)
 
-    def process_msg(self, msg, source=None):
-        if msg.type == 'note_on' and msg.velocity > 0:
-            if self.safe_jitter:
-                time.sleep(max(0, random.gauss(0.005, 0.002)))
-
-            # Apply transposition
-            note_val = msg.note + self.transpose_var.get()
-            if not (0 <= note_val <= 127): return
-
-            name = midi_to_note_name(note_val)
-            self.after(0, lambda: self.update_note_ui(name, True))
-            k = self.resolve_key(note_val)
-            if k:
-                with self.key_lock:
-                    if source == 'file' and (not self.file_playing or self.file_paused): return
-                    if source == 'live' and not self.live_running: return
-                    
-                    press_keys_for_midi(k, 'down')
-                    self._track_key_internal(k, True)
-        elif msg.type == 'note_off' or (msg.type == 'note_on' and msg.velocity == 0):
-            note_val = msg.note + self.transpose_var.get()
-            if not (0 <= note_val <= 127): return
-
-            self.after(0, lambda: self.update_note_ui(None, False))
-            k = self.resolve_key(note_val)
-            if k:
-                with self.key_lock:
-                    press_keys_for_midi(k, 'up')
-                    self._track_key_internal(k, False)
-
-    def _track_key_internal(self, key, is_down):
-        keys = key if isinstance(key, list) else [key]
-        for k in keys:
-            if is_down:
-                self.held_keys.add(k)
-            else:
-                self.held_keys.discard(k)
+    def process_msg(self, msg, source=None, session=None):
+        process_msg(self, msg, source, session)
 
     def check_can_press(self):
-        if not self.safe_use_target: return True
-        target = self.safe_target_title
-        if not target or target == "Select Window": return True
-        return get_active_window_title() == target
+        return check_can_press(self)
 
     def resolve_key(self, note):
-        key = self.key_map.get(note)
-        if key: return key
-        if self.safe_fallback:
-            return find_fallback_key(note, self.key_map)
-        return None
+        return self.engine_config.note_keys[note]
 
     def toggle_pin(self):
         self.attributes("-topmost", self.pin_var.get())
@@ -668,51 +1166,30 @@ class MidiKeyTranslatorApp(ctk.CTk):
         if keyboard:
             keyboard.unhook_all()
         self.live_running = False
-        release_all_held_keys(self)
-        self.live_running = False
-        self.file_playing = False
+        self.window_watcher.stop()
+        self.device_monitor.stop()
+        self.profile_watcher.stop()
+        self.playback.stop()
+        self.release_held_keys()
+        if self.engine_backend:
+            self.engine_backend.close()
+        if self.control_server:
+            self.control_server.stop()
+        self.instance_server.stop()
         self.destroy()
 
     def setup_hotkeys(self):
         self.log("Setting up hotkeys (Raw Hook)...")
+        self.hotkeys.compile(self.current_metadata.get("hotkeys", {}))
         if keyboard:
             try:
                 keyboard.unhook_all()
                 time.sleep(0.05)
-                keyboard.hook(self.on_key_event)
+                keyboard.hook(self.hotkeys.on_event)
                 self.log("Global hook registered.")
             except Exception as e:
                 self.log(f"Warning: Could not set up global hotkeys. Administrator rights might be required. {e}")
 
-    def on_key_event(self, event):
-        if event.event_type == keyboard.KEY_DOWN:
-            key = event.name.lower() if event.name else "unknown"
-            
-            if self.debug_monitor_var.get():
-                self.log(f"Input detected: {key}")
-
-            hk = self.current_metadata.get("hotkeys", {})
-            pp = hk.get("play_pause", "f9").lower()
-            stop = hk.get("stop", "f10").lower()
-            t_up = hk.get("transpose_up", "page up").lower()
-            t_down = hk.get("transpose_down", "page down").lower()
-
-            if key == pp:
-                self.on_play_pause_hotkey()
-            elif key == stop:
-                self.on_stop_hotkey()
-            elif key == t_up:
-                self.change_transpose(1)
-            elif key == t_down:
-                self.change_transpose(-1)
-
-    def on_play_pause_hotkey(self):
-        if hasattr(self, '_last_pp_time') and time.time() - self._last_pp_time < 0.2:
-            return
-        self._last_pp_time = time.time()
-
-        threading.Thread(target=self._handle_play_pause_logic, daemon=True).start()
-
     def _handle_play_pause_logic(self):
         self.log("Hotkey: Play/Pause pressed")
         if not hasattr(self, 'current_midi_file') or not self.current_midi_file:
@@ -723,44 +1200,22 @@ class MidiKeyTranslatorApp(ctk.CTk):
             self.after(0, self.start_file)
         else:
             self.log("Hotkey: Toggling Pause")
-            self.file_paused = not self.file_paused
-            if self.file_paused:
-                release_all_held_keys(self)
-            
-            self.after(0, self._update_pause_ui_from_hotkey)
-
-    def _update_pause_ui_from_hotkey(self):
-        if self.file_paused:
-            self.btn_pause.configure(text="▶ Resume", fg_color=COLOR_FILE_GO, text_color="white")
-            self.update_status_ui("Paused", "File playback paused", COLOR_WARN)
-        else:
-            self.btn_pause.configure(text="⏸ Pause", fg_color=COLOR_WARN, text_color=COLOR_TEXT_ON_WARN)
-            self.update_status_ui("Playing File", os.path.basename(self.current_midi_file), COLOR_FILE_GO)
-
-    def on_stop_hotkey(self):
-        if hasattr(self, '_last_stop_time') and time.time() - self._last_stop_time < 0.2:
-            return
-        self._last_stop_time = time.time()
-
-        threading.Thread(target=self._handle_stop_logic, daemon=True).start()
+            self.playback.toggle_pause()
 
     def _handle_stop_logic(self):
         self.log("Hotkey: Stop pressed")
-        self.file_playing = False
-        self.file_paused = False
-        release_all_held_keys(self)
-        
-        self.after(0, self.update_stop_ui)
+        self.playback.stop()
 
     def change_transpose(self, delta):
         new_val = self.transpose_var.get() + delta
         self.transpose_var.set(new_val)
+        self.publish_config(transpose=new_val)
         
         if hasattr(self, 'transpose_lbl'):
             prefix = "+" if new_val > 0 else ""
             self.transpose_lbl.configure(text=f"{prefix}{new_val}")
             
-        release_all_held_keys(self)
+        self.release_held_keys()
 
     def open_hotkey_editor(self):
         if not keyboard:
@@ -775,11 +1230,44 @@ class MidiKeyTranslatorApp(ctk.CTk):
 
     def open_profile_manager(self):
         self.scan_profiles()
-        ProfileManager(self, self.profile_cache, self.load_profile, self.scan_profiles)
+        self.profile_win = ProfileManager(self, self.profile_index, self.load_profile, self.scan_profiles)
+
+    def on_profiles_changed(self, names):
+        """Profile files changed on disk: rescan (only those get parsed) and hot-swap the active one."""
+        self.scan_profiles()
+        if self.profile_win is not None and self.profile_win.winfo_exists():
+            self.profile_win.refresh()
+        if self.current_filename in names and os.path.exists(self.current_filename):
+            self.reload_current_profile()
+
+    def reload_current_profile(self):
+        key_map, meta = load_profile_data(self.current_filename)
+        changes = copy_range(self.key_map, key_map)
+        if meta != self.current_metadata:
+            self.current_metadata = meta
+            self.hotkeys.compile(meta.get("hotkeys", {}))
+            self.profile_lbl.configure(text=meta.get("name", self.current_filename))
+            self.title(f"MIDI Keybind Pro - {meta.get('name', self.current_filename)}")
+        if not changes: return
+        old_cfg = self.engine_config
+        self.key_map = key_map
+        # One snapshot swap: workers see either the whole old keymap or the whole new one
+        self.publish_config(key_map=self.key_map)
+        # Keys held through a note whose binding moved would never get their key-up; let go of those
+        stale = stale_keys(old_cfg.note_keys, self.engine_config.note_keys)
+        if stale:
+            release_keys(self, stale)
+            if self.engine_backend:
+                self.engine_backend.send("release_keys", list(stale))
+        self.log(f"Reloaded {self.current_filename}: {len(changes)} binding(s) changed")
 
     def load_profile(self, filename):
         self.current_filename = filename
         self.key_map, self.current_metadata = load_profile_data(filename)
+        self.publish_config(key_map=self.key_map)
+        # Coverage numbers are per profile
+        self.counters.reset_notes(filename)
+        self.hotkeys.compile(self.current_metadata.get("hotkeys", {}))
         self.profile_lbl.configure(text=self.current_metadata.get("name", filename))
         self.title(f"MIDI Keybind Pro - {self.current_metadata.get('name', filename)}")
 
@@ -791,22 +1279,20 @@ class MidiKeyTranslatorApp(ctk.CTk):
 
     def update_key_map(self, new_map):
         self.key_map = new_map
+        self.publish_config(key_map=self.key_map)
         save_profile_data(self.current_filename, self.key_map, self.current_metadata)
 
     def open_theme_editor(self):
-        ThemeEditor(self, self.restart_app)
+        ThemeEditor(self, self.apply_theme)
 
-    def restart_app(self):
-        try:
-            if getattr(sys, 'frozen', False):
-                os.execl(sys.executable, sys.executable, *sys.argv[1:])
-            else:
-                os.execl(sys.executable, sys.executable, *sys.argv)
-        except Exception as e:
-            print(f"Restart failed: {e}")
-            self.destroy()
+    def apply_theme(self, name):
+        # Re-colors the existing widgets in place; playback, live input and hooks carry on untouched
+        start = time.perf_counter()
+        THEME.switch(name, self)
+        self.log(f"Theme '{THEME.name}' applied in {(time.perf_counter() - start) * 1000:.1f} ms")
 
 if __name__ == "__main__":
+    multiprocessing.freeze_support()
     pydirectinput.PAUSE = 0
     app = MidiKeyTranslatorApp()
     app.mainloop()
@@ -1,73 +1,360 @@
-import mido
 import time
 import random
-import pydirectinput
+from utils import press_keys_for_midi, note_transition, midi_to_note_name, get_active_window_title
+from midi_stream import open_midi_stream, schedule_events, compile_song
+from loop_region import LoopedEvents, loop_active
+from layers import KeyRefCounts
+from engine_stats import LatencyStats, NOTE_EXACT, NOTE_FALLBACK, NOTE_UNMAPPED, NOTE_GATED, NOTE_OUT_OF_RANGE
+from thread_tuning import apply_thread_tuning
+from net_midi import open_midi_input, NET_INPUT_NAME
+from device_monitor import RECONNECT_TIMEOUT, FAST_SCAN_INTERVAL
+from tracing import SPAN_WAIT, SPAN_CHECK_FOCUS, SPAN_RESOLVE_KEY, SPAN_KEY_LOCK, SPAN_EMIT
+
+def tune_current_thread(app):
+    cfg = app.engine_config
+    result = apply_thread_tuning(cfg.realtime, cfg.cpu_core)
+    if result: app.log(result)
 
 def live_loop(app, device):
+    monitor = app.device_monitor
+    # The network input isn't enumerated, so it can't be unplugged
+    watch = device != NET_INPUT_NAME
+    lost_at = None
+    # Input-to-emit latency, split by whether the recorder was running, to show what recording costs
+    emit_latency = {False: LatencyStats(), True: LatencyStats()}
+    was_recording = False
     try:
-        with mido.open_input(device) as port:
-            while app.live_running:
-                for msg in port.iter_pending():
-                    if not app.check_can_press(): continue
-                    app.process_msg(msg, source='live')
-                time.sleep(0.001)
+        tune_current_thread(app)
+        # A device plugged in since the last background scan isn't listed yet
+        if watch: monitor.scan()
+        while app.live_running:
+            try:
+                port = open_midi_input(device, app.engine_config.net_buffer_ms, log=app.log, peers=app.engine_config.net_peers)
+            except Exception:
+                # A re-plugged device can be listed a moment before its driver accepts opens
+                if lost_at is None or time.perf_counter() - lost_at > RECONNECT_TIMEOUT: raise
+                time.sleep(FAST_SCAN_INTERVAL)
+                continue
+            with port:
+                if lost_at is not None:
+                    app.log(f"Reconnected '{device}' after {time.perf_counter() - lost_at:.2f} s")
+                    lost_at = None
+                try:
+                    while app.live_running:
+                        if watch and not monitor.is_present(device): break
+                        recorder = app.recorder
+                        if was_recording and not recorder.active: log_record_overhead(app, emit_latency)
+                        was_recording = recorder.active
+                        for msg in port.iter_pending():
+                            t0 = time.perf_counter()
+                            # Checked per message: recording may stop halfway through a batch
+                            recording = recorder.active and recorder.record(msg)
+                            if not can_press(app, app.tracer.enabled):
+                                count_gated(app, msg)
+                                continue
+                            app.process_msg(msg, source='live')
+                            emit_latency[recording].add(time.perf_counter() - t0)
+                        time.sleep(0.001)
+                except Exception as e:
+                    if not watch: raise
+                    app.log(f"Live input error: {e}")
+            if not app.live_running: break
+
+            # Unplugged: let go of whatever it was holding, then wait for it to come back
+            lost_at = time.perf_counter()
+            release_all_held_keys(app)
+            app.log(f"Live input '{device}' disconnected, waiting for it to return")
+            device = monitor.wait_for(device, RECONNECT_TIMEOUT, lambda: app.live_running)
+            if device is None:
+                if not app.live_running: break
+                raise RuntimeError(f"device did not return within {RECONNECT_TIMEOUT:.0f} s")
     except Exception as e:
         print(f"Live Error: {e}")
         app.live_running = False
         app.after(0, app.stop_live)
+    finally:
+        if emit_latency[True].count: log_record_overhead(app, emit_latency)
 
-def file_loop(app, filepath):
+def log_record_overhead(app, emit_latency):
+    app.log(f"Live input-to-emit while recording: {emit_latency[True].summary()}; "
+            f"without: {emit_latency[False].summary()}")
+    emit_latency[True].reset()
+
+def file_loop(app, source, session, start=0.0):
+    mid = None
+    completed = False
+    playback = app.playback
     try:
         app.log("File loop running")
-        mid = mido.MidiFile(filepath)
-        # Iterate over messages to manually control timing for speed modification
-        for msg in mid:
-            if not app.file_playing: break
-            
-            # Check pause before waiting
-            while app.file_paused and app.file_playing:
-                time.sleep(0.1)
-            
-            # Manually sleep based on message time and speed modifier
-            if msg.time > 0:
-                wait_duration = msg.time / app.safe_speed
-                start_time = time.time()
-                
-                while True:
-                    now = time.time()
-                    elapsed = now - start_time
-                    remaining = wait_duration - elapsed
-                    
-                    if remaining <= 0: break
-                    if not app.file_playing: break
-                    
-                    if app.file_paused:
-                        while app.file_paused and app.file_playing:
-                            time.sleep(0.1)
-                        start_time = time.time()
-                        wait_duration = remaining
-                        continue
-                    
-                    time.sleep(min(0.01, remaining))
-
-            if not app.file_playing: break # Check again in case stop was pressed during sleep
-
-            if not app.check_can_press(): continue
-            app.process_msg(msg, source='file')
+        if isinstance(source, str) and (start > 0 or loop_active(app.engine_config)):
+            # Seeking and looping need random access, which the streaming reader doesn't have
+            source = compile_song(source)
+        if isinstance(source, str):
+            # Stream events straight from the file so playback starts before the whole song is decoded
+            mid = open_midi_stream(source)
+            events = mid
+        else:
+            # Song was already compiled in the background by the playlist preparer
+            events = LoopedEvents(source, lambda: app.engine_config, start)
+
+        tune_current_thread(app)
+        lateness = app.latency
+        lateness.reset()
+        app.frame_output.stats.reset()
+        tracer = app.tracer
+
+        # Wall-clock time of offset 0. Pausing pushes it forward by the paused duration.
+        base = time.perf_counter()
+        song_t = start
+        looped = mid is None
+        rate = (lambda: app.engine_config.speed * events.rate) if looped else (lambda: app.engine_config.speed)
+        for offset, msg in schedule_events(events, rate):
+            tracing = tracer.enabled
+            if tracing: t0 = time.perf_counter()
+            # Wakes immediately on pause/stop; returns None once this session is stopped or superseded
+            shift = playback.wait(session, base + offset)
+            if tracing: tracer.add(SPAN_WAIT, t0, time.perf_counter())
+            if shift is None: break
+            base += shift
+            now = time.perf_counter()
+            lateness.add(now - base - offset)
+            # Unscaled song time, for the piano roll playhead
+            song_t = events.position if looped else song_t + msg.time
+            app.position = (song_t, now, events.rate if looped else 1.0)
+
+            if not can_press(app, tracing):
+                count_gated(app, msg)
+                continue
+            app.process_msg(msg, source='file', session=session)
+        else:
+            completed = True
     except Exception as e:
         app.log(f"File Error: {e}")
         print(f"File Error: {e}")
     finally:
-        app.log("File loop finished")
-        app.after(0, app.stop_file)
+        if mid is not None: mid.close()
+        app.log(f"File loop finished. {playback_summary(app)}")
+        app.after(0, lambda: app.on_file_finished(session, completed))
+
+def layers_loop(app, layer_set, session, start=0.0):
+    """Plays every layer of `layer_set` on one clock through one output path."""
+    completed = False
+    playback = app.playback
+    refs = KeyRefCounts()
+    # (layer, channel, note) -> keys its note-on pressed, so the note-off releases the same ones
+    sounding = {}
+    try:
+        app.log(f"Layer loop running: {len(layer_set)} layer(s)")
+        tune_current_thread(app)
+        lateness = app.latency
+        lateness.reset()
+        app.frame_output.stats.reset()
+        tracer = app.tracer
+
+        base = time.perf_counter()
+        song_t = start
+        for offset, msg in schedule_events(layer_set.iter_events(start), lambda: app.engine_config.speed):
+            tracing = tracer.enabled
+            if tracing: t0 = time.perf_counter()
+            shift = playback.wait(session, base + offset)
+            if tracing: tracer.add(SPAN_WAIT, t0, time.perf_counter())
+            if shift is None: break
+            if shift:
+                # Pausing released every held key, so the counts start over
+                refs.clear()
+                sounding.clear()
+            base += shift
+            now = time.perf_counter()
+            lateness.add(now - base - offset)
+            song_t += msg.time
+            app.position = (song_t, now, 1.0)
+            process_layered_msg(app, layer_set, msg, refs, sounding, tracing, session)
+        else:
+            completed = True
+    except Exception as e:
+        app.log(f"Layer Error: {e}")
+        print(f"Layer Error: {e}")
+    finally:
+        app.log(f"Layer loop finished. {playback_summary(app)}")
+        app.after(0, lambda: app.on_layers_finished(session, completed))
+
+def process_layered_msg(app, layer_set, msg, refs, sounding, tracing, session):
+    layer = msg.layer
+    held = (layer, msg.channel, msg.note)
+    if not (msg.type == 'note_on' and msg.velocity > 0):
+        keys = sounding.pop(held, None)
+        dispatch_ui(app, tracing, app.update_note_ui, None, False)
+        if not keys: return
+        with app.key_lock:
+            release_refs(app, tracing, refs, keys)
+        return
+
+    if not layer_set.audible(layer): return
+    if not can_press(app, tracing):
+        count_gated(app, msg)
+        return
+    cfg = app.engine_config
+    note_val = msg.note + cfg.transpose + layer.transpose
+    if not 0 <= note_val <= 127:
+        app.counters.count_note(NOTE_OUT_OF_RANGE, msg.note)
+        return
+    keys = (layer.note_keys or cfg.note_keys)[note_val]
+    app.counters.events += 1
+    dispatch_ui(app, tracing, app.update_note_ui, midi_to_note_name(note_val), True)
+    count_resolved(app.counters, layer.exact or cfg.exact, note_val, keys)
+    if not keys: return
+    with app.key_lock:
+        # A superseded session must not press anything after the keys were released for its successor
+        if not app.playback.is_active(session) or app.playback.is_paused: return
+        # Retriggering a note this layer still holds lets go of it first
+        previous = sounding.pop(held, None)
+        if previous: release_refs(app, tracing, refs, previous)
+        sounding[held] = keys
+        fresh = refs.press(keys)
+        if fresh:
+            emit_keys(app, tracing, fresh, 'down')
+            track_key(app, fresh, True)
+
+def release_refs(app, tracing, refs, keys):
+    gone = refs.release(keys)
+    if gone:
+        emit_keys(app, tracing, gone, 'up')
+        track_key(app, gone, False)
+
+def resolve_msg(cfg, msg):
+    """(transposed_note, is_down, keys) for a note message, None for anything else."""
+    # Apply transposition
+    transition = note_transition(msg, cfg.transpose)
+    if transition is None: return None
+    note_val, is_down = transition
+    return note_val, is_down, cfg.note_keys[note_val]
+
+def process_msg(app, msg, source=None, session=None):
+    cfg = app.engine_config
+    tracer = app.tracer
+    tracing = tracer.enabled
+    if tracing: t0 = time.perf_counter()
+    resolved = resolve_msg(cfg, msg)
+    if tracing: tracer.add(SPAN_RESOLVE_KEY, t0, time.perf_counter())
+    if resolved is None:
+        count_unresolved(app.counters, msg)
+        return
+    note_val, is_down, k = resolved
+    app.counters.events += 1
+
+    if is_down:
+        if cfg.jitter:
+            time.sleep(max(0, random.gauss(0.005, 0.002)))
+
+        dispatch_ui(app, tracing, app.update_note_ui, midi_to_note_name(note_val), True)
+        count_resolved(app.counters, cfg.exact, note_val, k)
+        if k:
+            if tracing: t0 = time.perf_counter()
+            with app.key_lock:
+                if tracing: tracer.add(SPAN_KEY_LOCK, t0, time.perf_counter())
+                # Checked against this thread's session: a superseded one must not press after the hand-over
+                if source == 'file' and (not app.playback.is_active(session) or app.playback.is_paused): return
+                if source == 'live' and not app.live_running: return
+
+                emit_keys(app, tracing, k, 'down')
+                track_key(app, k, True)
+    else:
+        dispatch_ui(app, tracing, app.update_note_ui, None, False)
+        if k:
+            if tracing: t0 = time.perf_counter()
+            with app.key_lock:
+                if tracing: tracer.add(SPAN_KEY_LOCK, t0, time.perf_counter())
+                emit_keys(app, tracing, k, 'up')
+                track_key(app, k, False)
+
+# Traced variants of the pipeline steps. `tracing` is read once per event by the caller.
+def can_press(app, tracing):
+    if not tracing: return app.check_can_press()
+    t0 = time.perf_counter()
+    ok = app.check_can_press()
+    app.tracer.add(SPAN_CHECK_FOCUS, t0, time.perf_counter())
+    return ok
+
+def emit_keys(app, tracing, keys, action):
+    if tracing: t0 = time.perf_counter()
+    if app.engine_config.frame_rate: app.frame_output.submit(keys, action)
+    else: app.frame_output.send_now(keys, action, press_keys_for_midi)
+    if tracing: app.tracer.add(SPAN_EMIT, t0, time.perf_counter())
+
+def dispatch_ui(app, tracing, callback, *args):
+    if tracing: app.after(0, app.tracer.run_dispatched, time.perf_counter(), callback, *args)
+    else: app.after(0, callback, *args)
+
+def count_gated(app, msg):
+    # A note that should have sounded but was held back by the focus check
+    if msg.type == 'note_on' and msg.velocity:
+        app.counters.dropped += 1
+        app.counters.count_note(NOTE_GATED, msg.note)
+
+def count_resolved(counters, exact, note, keys):
+    # Note-ons only: how the profile covered the note it was asked for
+    if not keys:
+        counters.dropped += 1
+        counters.count_note(NOTE_UNMAPPED, note)
+    else:
+        counters.count_note(NOTE_EXACT if exact[note] else NOTE_FALLBACK, note)
+
+def count_unresolved(counters, msg):
+    # resolve_msg only gives up on a note-on when the transpose pushes it out of range
+    if msg.type == 'note_on' and msg.velocity: counters.count_note(NOTE_OUT_OF_RANGE, msg.note)
+
+def track_key(app, key, is_down):
+    keys = key if isinstance(key, list) else [key]
+    for k in keys:
+        if is_down:
+            app.held_keys.add(k)
+        else:
+            app.held_keys.discard(k)
+
+def check_can_press(app):
+    cfg = app.engine_config
+    if not cfg.use_target: return True
+    target = cfg.target_title
+    if not target or target == "Select Window": return True
+    return get_active_window_title() == target
+
+def playback_summary(app):
+    summary = f"Scheduling lateness: {app.latency.summary()}"
+    if app.engine_config.frame_rate: summary += f". Frame output: {app.frame_output.stats.summary()}"
+    return summary
 
 def release_all_held_keys(app):
+    # A key whose release was still waiting for its frame is physically down too
+    unsent = app.frame_output.clear()
     with app.key_lock:
-        if not app.held_keys: return
-        keys_to_release = list(app.held_keys)
+        if not app.held_keys and not unsent: return
+        keys_to_release = list(app.held_keys | unsent)
         app.held_keys.clear()
         app.log(f"Releasing keys: {keys_to_release}")
         
-    for k in keys_to_release:
-        pydirectinput.keyUp(k)
+    press_keys_for_midi(keys_to_release, 'up')
     app.after(0, lambda: app.update_note_ui(None, False))
+
+def _key_set(keys):
+    if not keys: return set()
+    return set(keys) if isinstance(keys, list) else {keys}
+
+def stale_keys(old_table, new_table):
+    """Keys a note may be holding that its note-off won't release any more under the new table.
+
+    A key also bound to an unchanged note is included: held_keys doesn't say
+    which note pressed it, and releasing it early beats leaving it stuck.
+    """
+    stale = set()
+    for old, new in zip(old_table, new_table):
+        if old != new: stale |= _key_set(old) - _key_set(new)
+    return stale
+
+def release_keys(app, keys):
+    """Releases just `keys`, and only those actually held; everything else stays down."""
+    with app.key_lock:
+        held = [k for k in keys if k in app.held_keys]
+        app.held_keys.difference_update(held)
+    if not held: return
+    app.log(f"Releasing keys: {held}")
+    press_keys_for_midi(held, 'up')
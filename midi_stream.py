@@ -0,0 +1,282 @@
+import array
+import bisect
+import heapq
+import mmap
+import struct
+from collections import namedtuple
+
+# Streaming Standard MIDI File reader.
+# Track chunks are decoded straight into small array-backed blocks and merged
+# with a k-way heap, so events can be played while the rest of the file is
+# still being decoded. Only what playback needs is kept (notes + tempo).
+
+EV_NOTE_OFF = 0
+EV_NOTE_ON = 1
+EV_TEMPO = 2
+
+DEFAULT_TEMPO = 500000
+DECODE_BLOCK = 4096
+
+# Duck-types the parts of mido.Message that process_msg uses.
+NoteEvent = namedtuple("NoteEvent", "type note velocity time channel")
+
+_TYPE_NAMES = ("note_off", "note_on")
+_DATA_LEN = {0x80: 2, 0x90: 2, 0xA0: 2, 0xB0: 2, 0xC0: 1, 0xD0: 1, 0xE0: 2}
+# System common and real-time messages (0xF1-0xFE). They never become running status.
+_SYSTEM_DATA_LEN = {0xF1: 1, 0xF2: 2, 0xF3: 1}
+
+
+class MidiFormatError(ValueError):
+    pass
+
+
+def _read_varlen(buf, pos, end):
+    value = 0
+    while pos < end:
+        b = buf[pos]
+        pos += 1
+        value = (value << 7) | (b & 0x7F)
+        if not b & 0x80: break
+    return value, pos
+
+
+class TrackCursor:
+    """Lazily decodes one MTrk chunk into (tick, kind, data) columns."""
+
+    def __init__(self, buf, start, end):
+        self.buf = buf
+        self.pos = start
+        self.end = end
+        self.tick = 0
+        self.running = None
+        self.ticks = array.array('Q')
+        self.kinds = array.array('B')
+        self.data = array.array('L')
+        self.idx = 0
+
+    def refill(self):
+        buf, pos, end = self.buf, self.pos, self.end
+        ticks, kinds, data = array.array('Q'), array.array('B'), array.array('L')
+        tick, running = self.tick, self.running
+
+        while pos < end and len(ticks) < DECODE_BLOCK:
+            delta, pos = _read_varlen(buf, pos, end)
+            tick += delta
+            if pos >= end: break
+            status = buf[pos]
+
+            if status == 0xFF:
+                if pos + 2 > end: raise MidiFormatError("Truncated meta event")
+                meta_type = buf[pos + 1]
+                length, pos = _read_varlen(buf, pos + 2, end)
+                if pos + length > end: raise MidiFormatError("Truncated meta event")
+                if meta_type == 0x51 and length == 3:
+                    ticks.append(tick)
+                    kinds.append(EV_TEMPO)
+                    data.append((buf[pos] << 16) | (buf[pos + 1] << 8) | buf[pos + 2])
+                elif meta_type == 0x2F:
+                    pos = end
+                    break
+                pos += length
+                continue
+
+            if status in (0xF0, 0xF7):
+                length, pos = _read_varlen(buf, pos + 1, end)
+                if pos + length > end: raise MidiFormatError("Truncated SysEx event")
+                pos += length
+                continue
+
+            if status > 0xF0:
+                pos += 1 + _SYSTEM_DATA_LEN.get(status, 0)
+                if pos > end: raise MidiFormatError("Truncated track data")
+                continue
+
+            if status & 0x80:
+                running = status
+                pos += 1
+            elif running is None:
+                raise MidiFormatError("Running status without a previous status byte")
+
+            kind = running & 0xF0
+            n = _DATA_LEN[kind]
+            if pos + n > end: raise MidiFormatError("Truncated track data")
+            if kind == 0x90 or kind == 0x80:
+                note, vel = buf[pos], buf[pos + 1]
+                ticks.append(tick)
+                if kind == 0x90 and vel > 0:
+                    kinds.append(EV_NOTE_ON)
+                else:
+                    kinds.append(EV_NOTE_OFF)
+                data.append(note | (vel << 8) | ((running & 0x0F) << 16))
+            pos += n
+
+        self.pos, self.tick, self.running = pos, tick, running
+        self.ticks, self.kinds, self.data = ticks, kinds, data
+        self.idx = 0
+        return len(ticks) > 0
+
+    def peek_tick(self):
+        if self.idx >= len(self.ticks) and not self.refill():
+            return None
+        return self.ticks[self.idx]
+
+
+class StreamingMidiFile:
+    """Memory-mapped MIDI file whose events are decoded on demand.
+
+    Iterating yields NoteEvent tuples with `time` holding the delta in seconds
+    from the previous event, the same convention as iterating a mido.MidiFile.
+    """
+
+    def __init__(self, filepath):
+        self.filepath = filepath
+        with open(filepath, 'rb') as f:
+            try:
+                self.buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:
+                self.buf = f.read()
+        self.tracks = []
+        self._parse_chunks()
+
+    def _parse_chunks(self):
+        buf = self.buf
+        if len(buf) < 14 or buf[0:4] != b'MThd':
+            raise MidiFormatError("Not a Standard MIDI File")
+        hdr_len = struct.unpack('>I', buf[4:8])[0]
+        _fmt, n_tracks, division = struct.unpack('>HHH', buf[8:14])
+        if division & 0x8000:
+            fps = 256 - (division >> 8)
+            self.ticks_per_beat = None
+            self.ticks_per_second = fps * (division & 0xFF)
+        else:
+            self.ticks_per_beat = division
+            self.ticks_per_second = None
+
+        pos = 8 + hdr_len
+        while pos + 8 <= len(buf) and len(self.tracks) < n_tracks:
+            chunk_id = buf[pos:pos + 4]
+            length = struct.unpack('>I', buf[pos + 4:pos + 8])[0]
+            start = pos + 8
+            end = min(start + length, len(buf))
+            if chunk_id == b'MTrk':
+                self.tracks.append((start, end))
+            pos = start + length
+
+    def close(self):
+        if isinstance(self.buf, mmap.mmap):
+            self.buf.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def iter_raw(self):
+        """Yields (seconds, kind, data) with absolute seconds, merged across tracks."""
+        cursors = [TrackCursor(self.buf, s, e) for s, e in self.tracks]
+        heap = []
+        for i, cur in enumerate(cursors):
+            t = cur.peek_tick()
+            if t is not None:
+                heap.append((t, i))
+        heapq.heapify(heap)
+
+        tempo = DEFAULT_TEMPO
+        last_tick = 0
+        seconds = 0.0
+        tpb, tps = self.ticks_per_beat, self.ticks_per_second
+
+        while heap:
+            tick, i = heap[0]
+            cur = cursors[i]
+            kind = cur.kinds[cur.idx]
+            data = cur.data[cur.idx]
+            cur.idx += 1
+
+            if tick != last_tick:
+                if tps:
+                    seconds += (tick - last_tick) / tps
+                else:
+                    seconds += (tick - last_tick) * tempo / (tpb * 1e6)
+                last_tick = tick
+
+            nxt = cur.peek_tick()
+            if nxt is None:
+                heapq.heappop(heap)
+            else:
+                heapq.heapreplace(heap, (nxt, i))
+
+            if kind == EV_TEMPO:
+                tempo = data
+                continue
+            yield seconds, kind, data
+
+    def __iter__(self):
+        prev = 0.0
+        for seconds, kind, data in self.iter_raw():
+            yield NoteEvent(_TYPE_NAMES[kind], data & 0x7F, (data >> 8) & 0x7F, seconds - prev, (data >> 16) & 0x0F)
+            prev = seconds
+
+
+class SongColumns:
+    """Fully decoded song: one typed array per field, absolute times in seconds."""
+
+    def __init__(self, filepath=None):
+        self.filepath = filepath
+        self.times = array.array('d')
+        self.kinds = array.array('B')
+        self.notes = array.array('B')
+        self.velocities = array.array('B')
+        self.channels = array.array('B')
+
+    def __len__(self):
+        return len(self.times)
+
+    @property
+    def duration(self):
+        return self.times[-1] if self.times else 0.0
+
+    def append(self, seconds, kind, note, velocity, channel=0):
+        self.times.append(seconds)
+        self.kinds.append(kind)
+        self.notes.append(note)
+        self.velocities.append(velocity)
+        self.channels.append(channel)
+
+    def __iter__(self):
+        return self.iter_events()
+
+    def iter_events(self, start=0.0):
+        """Events from `start` seconds on. The first delta is measured from `start`, so playback begins there."""
+        times, kinds, notes, vels, chans = self.times, self.kinds, self.notes, self.velocities, self.channels
+        prev = start
+        for i in range(bisect.bisect_left(times, start) if start > 0 else 0, len(times)):
+            t = times[i]
+            yield NoteEvent(_TYPE_NAMES[kinds[i]], notes[i], vels[i], t - prev, chans[i])
+            prev = t
+
+
+def schedule_events(events, get_speed):
+    """Yields (offset, msg) where offset is the playback time in seconds after speed scaling.
+
+    Shared by file_loop (which waits for each offset on the wall clock) and the
+    dry-run renderer (which jumps straight to it on a virtual clock).
+    """
+    offset = 0.0
+    for msg in events:
+        if msg.time > 0:
+            offset += msg.time / get_speed()
+        yield offset, msg
+
+
+def open_midi_stream(filepath):
+    return StreamingMidiFile(filepath)
+
+
+def compile_song(filepath):
+    song = SongColumns(filepath)
+    with StreamingMidiFile(filepath) as smf:
+        for seconds, kind, data in smf.iter_raw():
+            song.append(seconds, kind, data & 0x7F, (data >> 8) & 0x7F, (data >> 16) & 0x0F)
+    return song
@@ -0,0 +1,348 @@
+import heapq
+import random
+import select
+import socket
+import struct
+import threading
+import time
+from collections import deque
+
+import mido
+
+from engine_stats import LatencyStats
+
+# Network MIDI input: a minimal RTP-MIDI (RFC 6295) subset over plain UDP.
+# Packets carry an RTP header and a MIDI command section; there is no
+# AppleMIDI session handshake and no recovery journal, so lost packets are
+# detected and reported but not repaired.
+
+NET_MIDI_PORT = 5004
+NET_INPUT_NAME = f"Network MIDI (UDP {NET_MIDI_PORT})"
+NET_BUFFER_OPTIONS = ["Off", "5 ms", "10 ms", "20 ms", "40 ms"]
+# Senders on this machine are always accepted; remote instruments must be listed as peers
+LOOPBACK = "127.0.0.1"
+
+PAYLOAD_TYPE = 97
+CLOCK_RATE = 10000  # RTP timestamp ticks per second, as AppleMIDI uses
+_RTP = struct.Struct('!BBHII')  # V/P/X/CC, M/PT, sequence, timestamp, SSRC
+_MAX_COMMANDS = 0x0FFF
+
+
+def _data_length(status):
+    if status < 0xF0:
+        return 1 if 0xC0 <= status < 0xE0 else 2
+    return {0xF1: 1, 0xF2: 2, 0xF3: 1}.get(status, 0)
+
+
+def encode_packet(seq, timestamp, ssrc, messages):
+    """RTP-MIDI packet for `messages` (raw MIDI bytes), all at `timestamp`."""
+    body = bytearray()
+    for i, data in enumerate(messages):
+        if i: body.append(0)  # delta time before every command but the first
+        body += data
+    if len(body) > _MAX_COMMANDS:
+        raise ValueError("too many MIDI bytes for one packet")
+    header = bytes([len(body)]) if len(body) < 16 else bytes([0x80 | (len(body) >> 8), len(body) & 0xFF])
+    return _RTP.pack(0x80, PAYLOAD_TYPE, seq & 0xFFFF, timestamp & 0xFFFFFFFF, ssrc) + header + body
+
+
+def decode_packet(packet):
+    """Returns (seq, timestamp, ssrc, [(delta_ticks, midi_bytes)]). Raises ValueError on garbage."""
+    if len(packet) < _RTP.size + 1:
+        raise ValueError("short packet")
+    vpxcc, _mpt, seq, timestamp, ssrc = _RTP.unpack_from(packet)
+    if vpxcc & 0xC0 != 0x80:
+        raise ValueError("not RTP version 2")
+    pos = _RTP.size + 4 * (vpxcc & 0x0F)
+    flags = packet[pos]
+    if flags & 0x80:
+        length = ((flags & 0x0F) << 8) | packet[pos + 1]
+        pos += 2
+    else:
+        length = flags & 0x0F
+        pos += 1
+    end = pos + length
+    if end > len(packet):
+        raise ValueError("truncated command section")
+
+    commands = []
+    status = 0
+    delta = 0
+    has_delta = bool(flags & 0x20)  # Z: first command carries a delta time too
+    while pos < end:
+        if has_delta:
+            # Deltas are relative to the previous command; `delta` stays relative to the packet timestamp
+            d = 0
+            while True:
+                b = packet[pos]
+                pos += 1
+                d = (d << 7) | (b & 0x7F)
+                if not b & 0x80: break
+            delta += d
+        has_delta = True
+        if packet[pos] & 0x80:
+            status = packet[pos]
+            pos += 1
+        elif not status:
+            raise ValueError("running status without a status byte")
+        if status == 0xF0:
+            # SysEx isn't mapped to keys; skip to its end
+            while pos < end and packet[pos] != 0xF7: pos += 1
+            pos += 1
+            status = 0
+            continue
+        n = _data_length(status)
+        commands.append((delta, bytes((status,)) + packet[pos:pos + n]))
+        pos += n
+    return seq, timestamp, ssrc, commands
+
+
+class _Source:
+    """Per-sender state: sequence tracking, timestamp unwrapping and transit times."""
+
+    def __init__(self, seq):
+        self.expected = seq
+        self.last_ts = None
+        self.cycles = 0
+        self.min_transit = None
+        self.last_transit = None
+
+    def unwrap(self, ts):
+        if self.last_ts is not None and ts < self.last_ts and self.last_ts - ts > 0x80000000:
+            self.cycles += 1
+        self.last_ts = ts
+        return ((self.cycles << 32) + ts) / CLOCK_RATE
+
+
+class NetMidiStats:
+    """Packet counters plus per-packet delay. Sender and receiver clocks aren't
+    synchronised, so delay is measured above the fastest packet seen so far."""
+
+    def __init__(self):
+        self.packets = 0
+        self.messages = 0
+        self.lost = 0
+        self.late = 0
+        self.malformed = 0
+        self.rejected = 0  # packets from senders that aren't in the peer allowlist
+        self.jitter = 0.0  # RFC 3550 interarrival jitter, seconds
+        self.delay = LatencyStats()
+
+    def summary(self):
+        return (f"{self.packets} packets, {self.messages} messages, {self.lost} lost, {self.late} late/duplicate, "
+                f"{self.malformed} malformed, {self.rejected} rejected, jitter {self.jitter * 1000:.2f} ms, delay {self.delay.summary()}")
+
+
+class NetMidiInput:
+    """UDP receiver that stands in for a mido input port.
+
+    A receiver thread decodes packets and releases messages either at once or,
+    with a playout delay, at the sender's timestamp plus a fixed buffer so
+    network jitter doesn't reach the keys. Released messages go to `callback`
+    when one is given, otherwise they wait for `iter_pending`.
+
+    Only packets from `peers` (addresses or host names) and from this machine
+    are decoded. With no peers the socket binds to loopback, so nothing on the
+    network can reach the keys until a peer is configured.
+    """
+
+    def __init__(self, port=NET_MIDI_PORT, host=None, playout_ms=0, callback=None, log=print, peers=()):
+        self.name = NET_INPUT_NAME
+        self.playout = playout_ms / 1000.0
+        self.callback = callback
+        self.log = log
+        self.stats = NetMidiStats()
+        self.sources = {}
+        self.pending = deque()
+        self.buffer = []
+        self._order = 0
+        self.allowed = {LOOPBACK} | resolve_peers(peers, log)
+        self.refused = set()
+        if host is None: host = "0.0.0.0" if peers else LOOPBACK
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.bind((host, port))
+        self.sock.setblocking(False)
+        self.running = True
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+        log(f"Listening for network MIDI on UDP {host}:{port}" + (f", {playout_ms} ms jitter buffer" if playout_ms else ""))
+
+    def iter_pending(self):
+        pending = self.pending
+        while pending:
+            yield pending.popleft()
+
+    def close(self):
+        if not self.running: return
+        self.running = False
+        self.thread.join(timeout=1.0)
+        self.sock.close()
+        self.log(f"Network MIDI closed: {self.stats.summary()}")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _run(self):
+        buffer = self.buffer
+        while self.running:
+            timeout = 0.25 if not buffer else min(0.25, max(0.0, buffer[0][0] - time.perf_counter()))
+            readable, _, _ = select.select([self.sock], [], [], timeout)
+            if readable:
+                while True:
+                    try:
+                        packet, addr = self.sock.recvfrom(2048)
+                    except (BlockingIOError, OSError):
+                        break
+                    if addr[0] not in self.allowed:
+                        self._reject(addr[0])
+                        continue
+                    self._receive(packet, time.perf_counter())
+            now = time.perf_counter()
+            while buffer and buffer[0][0] <= now:
+                self._release(heapq.heappop(buffer)[2])
+
+    def _reject(self, sender):
+        self.stats.rejected += 1
+        if sender not in self.refused:
+            self.refused.add(sender)
+            self.log(f"Network MIDI: ignoring packets from {sender}, which is not a configured peer")
+
+    def _receive(self, packet, arrival):
+        stats = self.stats
+        try:
+            seq, ts, ssrc, commands = decode_packet(packet)
+        except (ValueError, IndexError):
+            stats.malformed += 1
+            return
+
+        src = self.sources.get(ssrc)
+        if src is None:
+            src = self.sources[ssrc] = _Source(seq)
+        gap = (seq - src.expected) & 0xFFFF
+        if gap >= 0x8000:
+            stats.late += 1
+            return
+        if gap:
+            stats.lost += gap
+            self.log(f"Network MIDI: {gap} packet(s) lost before seq {seq}")
+        src.expected = (seq + 1) & 0xFFFF
+        stats.packets += 1
+
+        sent = src.unwrap(ts)
+        transit = arrival - sent
+        if src.last_transit is not None:
+            stats.jitter += (abs(transit - src.last_transit) - stats.jitter) / 16
+        src.last_transit = transit
+        if src.min_transit is None or transit < src.min_transit:
+            src.min_transit = transit
+        stats.delay.add(transit - src.min_transit)
+
+        for delta, data in commands:
+            try:
+                msg = mido.Message.from_bytes(data)
+            except (ValueError, TypeError):
+                stats.malformed += 1
+                continue
+            stats.messages += 1
+            if not self.playout:
+                self._release(msg)
+                continue
+            due = sent + delta / CLOCK_RATE + src.min_transit + self.playout
+            self._order += 1
+            heapq.heappush(self.buffer, (due, self._order, msg))
+
+    def _release(self, msg):
+        if self.callback: self.callback(msg)
+        else: self.pending.append(msg)
+
+
+def resolve_peers(peers, log=print):
+    """IPv4 addresses for the peer allowlist. Names that don't resolve are logged and left out."""
+    allowed = set()
+    for peer in peers:
+        try:
+            allowed.add(socket.gethostbyname(peer))
+        except OSError:
+            log(f"Network MIDI: can't resolve peer '{peer}'")
+    return allowed
+
+
+def open_midi_input(name, playout_ms=0, callback=None, log=print, peers=()):
+    """Opens a local mido port or, for NET_INPUT_NAME, the network receiver."""
+    if name == NET_INPUT_NAME:
+        return NetMidiInput(playout_ms=playout_ms, callback=callback, log=log, peers=peers)
+    return mido.open_input(name, callback=callback)
+
+
+def parse_buffer_option(value):
+    return int(value.split()[0]) if value[:1].isdigit() else 0
+
+
+def parse_peer_list(value):
+    """Peer allowlist from the comma or space separated settings field."""
+    return tuple(p for p in value.replace(",", " ").split() if p)
+
+
+class NetMidiSender:
+    """Sends MIDI messages to a NetMidiInput, one packet per call."""
+
+    def __init__(self, host="127.0.0.1", port=NET_MIDI_PORT):
+        self.addr = (host, port)
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.ssrc = random.getrandbits(32)
+        self.seq = random.getrandbits(16)
+
+    def send(self, messages):
+        data = [bytes(m.bin()) if hasattr(m, 'bin') else bytes(m) for m in messages]
+        packet = encode_packet(self.seq, int(time.perf_counter() * CLOCK_RATE), self.ssrc, data)
+        self.seq = (self.seq + 1) & 0xFFFF
+        self.sock.sendto(packet, self.addr)
+
+    def close(self):
+        self.sock.close()
+
+
+def send_file(path, host="127.0.0.1", port=NET_MIDI_PORT, speed=1.0):
+    """Loopback/test sender: plays a MIDI file over the network in real time."""
+    from midi_stream import open_midi_stream, schedule_events
+    sender = NetMidiSender(host, port)
+    try:
+        with open_midi_stream(path) as events:
+            base = time.perf_counter()
+            for offset, msg in schedule_events(events, lambda: speed):
+                if msg.type not in ('note_on', 'note_off'): continue
+                delay = base + offset - time.perf_counter()
+                if delay > 0: time.sleep(delay)
+                status = (0x90 if msg.type == 'note_on' else 0x80) | msg.channel
+                sender.send([bytes((status, msg.note, msg.velocity))])
+    finally:
+        sender.close()
+
+
+def forward_input(device, host, port=NET_MIDI_PORT):
+    """Forwards a local MIDI input on this machine to a remote NetMidiInput."""
+    sender = NetMidiSender(host, port)
+    try:
+        with mido.open_input(device) as inp:
+            for msg in inp:
+                sender.send([msg])
+    finally:
+        sender.close()
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Send MIDI to a MIDI Keybind Pro network input.")
+    parser.add_argument("source", help="MIDI file to play, or an input device name with --device")
+    parser.add_argument("host", nargs="?", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=NET_MIDI_PORT)
+    parser.add_argument("--device", action="store_true", help="forward a live input device instead of a file")
+    parser.add_argument("--speed", type=float, default=1.0)
+    args = parser.parse_args()
+    if args.device:
+        forward_input(args.source, args.host, args.port)
+    else:
+        send_file(args.source, args.host, args.port, args.speed)
@@ -0,0 +1,91 @@
+import array
+
+from midi_stream import EV_NOTE_ON, EV_NOTE_OFF
+
+MAPPED = 0
+FALLBACK = 1
+UNMAPPED = 2
+
+BUCKET_SECONDS = 1.0
+
+
+class NoteSpans:
+    """A song's notes as (start, end, note) spans, indexed by one-second buckets.
+
+    Each bucket lists the spans overlapping it, so `visible(t0, t1)` only
+    looks at the handful of buckets under the viewport however long the song
+    is. Built once per song, off the Tk thread.
+    """
+
+    def __init__(self, song):
+        starts = array.array('d')
+        ends = array.array('d')
+        notes = array.array('B')
+        sounding = {}
+        for t, kind, note, chan in zip(song.times, song.kinds, song.notes, song.channels):
+            if kind == EV_NOTE_ON:
+                sounding.setdefault((chan, note), []).append(t)
+            elif kind == EV_NOTE_OFF:
+                held = sounding.get((chan, note))
+                if held:
+                    starts.append(held.pop(0))
+                    ends.append(t)
+                    notes.append(note)
+        # Notes never released run to the end of the song
+        for (_chan, note), held in sounding.items():
+            for t in held:
+                starts.append(t)
+                ends.append(song.duration)
+                notes.append(note)
+
+        order = sorted(range(len(starts)), key=starts.__getitem__)
+        self.starts = array.array('d', (starts[i] for i in order))
+        self.ends = array.array('d', (ends[i] for i in order))
+        self.notes = array.array('B', (notes[i] for i in order))
+        self.duration = song.duration
+        self.low = min(self.notes) if self.notes else 60
+        self.high = max(self.notes) if self.notes else 72
+
+        buckets = [[] for _ in range(int(self.duration // BUCKET_SECONDS) + 1)]
+        last = len(buckets) - 1
+        for i, (s, e) in enumerate(zip(self.starts, self.ends)):
+            for b in range(int(s // BUCKET_SECONDS), min(last, int(e // BUCKET_SECONDS)) + 1):
+                buckets[b].append(i)
+        self.offsets = array.array('L', [0])
+        self.index = array.array('L')
+        for bucket in buckets:
+            self.index.extend(bucket)
+            self.offsets.append(len(self.index))
+
+    def __len__(self):
+        return len(self.starts)
+
+    def visible(self, t0, t1):
+        """Indices of spans overlapping [t0, t1), each once."""
+        starts, ends, index, offsets = self.starts, self.ends, self.index, self.offsets
+        first = max(0, int(t0 // BUCKET_SECONDS))
+        last = min(len(offsets) - 2, int(t1 // BUCKET_SECONDS))
+        for b in range(first, last + 1):
+            for i in index[offsets[b]:offsets[b + 1]]:
+                # A span crossing buckets is only reported from the first visible one
+                if b != first and int(starts[i] // BUCKET_SECONDS) < b: continue
+                if starts[i] < t1 and ends[i] > t0:
+                    yield i
+
+    def category_counts(self, categories):
+        counts = [0, 0, 0]
+        for note in self.notes:
+            counts[categories[note]] += 1
+        return counts
+
+
+def note_categories(cfg):
+    """MAPPED/FALLBACK/UNMAPPED for every source note under the current keymap and transpose."""
+    cats = []
+    for n in range(128):
+        t = n + cfg.transpose
+        if not 0 <= t < 128 or not cfg.note_keys[t]:
+            cats.append(UNMAPPED)
+        else:
+            cats.append(MAPPED if cfg.exact[t] else FALLBACK)
+    return cats
@@ -0,0 +1,102 @@
+import threading
+import time
+
+STOPPED = "stopped"
+PLAYING = "playing"
+PAUSED = "paused"
+
+# Below this the scheduler finishes with a plain sleep, which is more precise than a
+# timed Condition.wait on Windows. A stop arriving inside this window waits for it.
+FINE_WAIT = 0.003
+
+
+class PlaybackControl:
+    """Single owner of file playback state.
+
+    Every control path (buttons, hotkeys, worker threads) goes through these
+    methods. A waiting scheduler is woken through the condition variable, so
+    pause, resume and stop take effect immediately and a paused player sleeps
+    without polling.
+    """
+
+    def __init__(self):
+        self.cond = threading.Condition()
+        self.state = STOPPED
+        self.session = 0
+        self.listeners = []
+
+    def add_listener(self, callback):
+        # Called as callback(state, session) outside the lock, on the thread that made the change
+        self.listeners.append(callback)
+
+    def _transition(self, state, session=None, expect=None):
+        with self.cond:
+            if session is not None and session != self.session: return False
+            # Checked under the same lock as the change, so a concurrent stop can't be undone
+            if expect is not None and self.state != expect: return False
+            if self.state == state: return False
+            self.state = state
+            session = self.session
+            self.cond.notify_all()
+        for cb in self.listeners: cb(state, session)
+        return True
+
+    @property
+    def is_playing(self):
+        return self.state != STOPPED
+
+    @property
+    def is_paused(self):
+        return self.state == PAUSED
+
+    def is_active(self, session):
+        return self.state != STOPPED and self.session == session
+
+    def start(self):
+        """Begins a new session, superseding any running one. Returns the session id."""
+        with self.cond:
+            self.session += 1
+            self.state = PLAYING
+            session = self.session
+            self.cond.notify_all()
+        for cb in self.listeners: cb(PLAYING, session)
+        return session
+
+    def pause(self):
+        return self._transition(PAUSED, expect=PLAYING)
+
+    def resume(self):
+        return self._transition(PLAYING, expect=PAUSED)
+
+    def toggle_pause(self):
+        with self.cond:
+            state = self.state
+        if state == PLAYING: return self.pause()
+        if state == PAUSED: return self.resume()
+        return False
+
+    def stop(self, session=None):
+        """Stops playback. With `session`, only if that session is still the current one."""
+        return self._transition(STOPPED, session)
+
+    def wait(self, session, deadline):
+        """Blocks until `deadline` (perf_counter time) while honouring pause.
+
+        Returns the seconds spent paused, which the caller adds to its timeline,
+        or None once the session has been stopped or superseded.
+        """
+        shift = 0.0
+        while True:
+            with self.cond:
+                while self.state == PAUSED and self.session == session:
+                    paused_at = time.perf_counter()
+                    self.cond.wait()
+                    shift += time.perf_counter() - paused_at
+                if self.state == STOPPED or self.session != session: return None
+
+                remaining = deadline + shift - time.perf_counter()
+                if remaining <= 0: return shift
+                if remaining > FINE_WAIT:
+                    self.cond.wait(remaining - FINE_WAIT)
+                    continue
+            time.sleep(remaining)
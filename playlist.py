@@ -0,0 +1,141 @@
+import os
+import random
+import threading
+
+from midi_stream import compile_song
+
+REPEAT_MODES = ["Repeat Off", "Repeat All", "Repeat One"]
+
+
+class Playlist:
+    def __init__(self):
+        self.entries = []
+        self.order = []
+        self.pos = -1
+        self.shuffle = False
+        self.repeat = "Repeat Off"
+
+    def __len__(self):
+        return len(self.entries)
+
+    def set_entries(self, paths):
+        self.entries = list(paths)
+        # A new entry list has no current song to carry over into the order
+        self.order = []
+        self.pos = -1
+        self._rebuild_order()
+
+    def add(self, paths):
+        was_empty = not self.entries
+        start = len(self.entries)
+        self.entries.extend(paths)
+        new_idx = list(range(start, len(self.entries)))
+        if self.shuffle: random.shuffle(new_idx)
+        self.order.extend(new_idx)
+        if was_empty and self.entries: self.pos = 0
+
+    def clear(self):
+        self.entries = []
+        self.order = []
+        self.pos = -1
+
+    def set_shuffle(self, enabled):
+        self.shuffle = enabled
+        self._rebuild_order()
+
+    def _rebuild_order(self):
+        current = self.order[self.pos] if 0 <= self.pos < len(self.order) else None
+        self.order = list(range(len(self.entries)))
+        if self.shuffle:
+            random.shuffle(self.order)
+            # Keep the song that is loaded right now at the head of the new order
+            if current is not None:
+                self.order.remove(current)
+                self.order.insert(0, current)
+        if current is not None:
+            self.pos = self.order.index(current)
+        else:
+            self.pos = 0 if self.entries else -1
+
+    def current(self):
+        if 0 <= self.pos < len(self.order):
+            return self.entries[self.order[self.pos]]
+        return None
+
+    def _step(self, step, auto):
+        if not self.order: return None
+        if auto and self.repeat == "Repeat One": return self.pos
+        nxt = self.pos + step
+        if 0 <= nxt < len(self.order): return nxt
+        if self.repeat == "Repeat Off" and auto: return None
+        return nxt % len(self.order)
+
+    def peek_next(self, auto=True):
+        idx = self._step(1, auto)
+        return None if idx is None else self.entries[self.order[idx]]
+
+    def advance(self, step=1, auto=False):
+        """Moves the cursor. `auto` is True when the previous song ended by itself."""
+        idx = self._step(step, auto)
+        if idx is None: return None
+        self.pos = idx
+        return self.current()
+
+    def label(self):
+        if not self.entries: return "Queue empty"
+        return f"Queue {self.pos + 1}/{len(self.entries)}"
+
+
+class SongPreparer:
+    """Compiles the next playlist entry on a background thread.
+
+    At most two songs are kept: the one playing and the one queued after it.
+    """
+
+    def __init__(self, log=print):
+        self.log = log
+        self.cond = threading.Condition()
+        self.current = None  # (path, SongColumns)
+        self.next = None
+        self.pending = None
+        self.worker = threading.Thread(target=self._run, daemon=True)
+        self.worker.start()
+
+    def prefetch(self, path):
+        with self.cond:
+            if not path: return
+            if self.next and self.next[0] == path: return
+            if self.current and self.current[0] == path: return
+            self.next = None
+            self.pending = path
+            self.cond.notify()
+
+    def take(self, path):
+        """Returns the compiled song for `path` if it was prepared, else None."""
+        with self.cond:
+            if self.next and self.next[0] == path:
+                self.current, self.next = self.next, None
+                return self.current[1]
+            if self.current and self.current[0] == path:
+                return self.current[1]
+            # Starting a song that was not prepared drops the stale one
+            self.current = None
+            return None
+
+    def _run(self):
+        while True:
+            with self.cond:
+                while self.pending is None:
+                    self.cond.wait()
+                path = self.pending
+            try:
+                song = compile_song(path)
+            except Exception as e:
+                self.log(f"Preparse failed for {os.path.basename(path)}: {e}")
+                song = None
+            with self.cond:
+                if self.pending == path:
+                    self.pending = None
+                    if song is not None:
+                        self.next = (path, song)
+                        self.log(f"Prepared next song: {os.path.basename(path)} ({len(song)} events)")
@@ -0,0 +1,61 @@
+import os
+
+from utils import load_profile_data
+
+
+class ProfileIndex:
+    """Metadata of every profile JSON in a directory.
+
+    A rescan only stats the files; a profile is parsed again only when its
+    size or mtime changed. Each entry carries a lowercase search key over the
+    name and linked window, so filtering is a substring scan.
+    """
+
+    def __init__(self, directory=".", load=load_profile_data):
+        self.directory = directory
+        self.load = load
+        self.stamps = {}   # filename -> ((mtime_ns, size), entry)
+        self.profiles = []
+        self._last_query = ""
+        self._last_result = []
+
+    def scan(self):
+        """Refreshes the index. Returns the filenames that were (re)parsed."""
+        seen = {}
+        parsed = []
+        for f in sorted(os.listdir(self.directory)):
+            if not f.lower().endswith(".json"): continue
+            path = os.path.join(self.directory, f)
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            stamp = (st.st_mtime_ns, st.st_size)
+            cached = self.stamps.get(f)
+            if cached and cached[0] == stamp:
+                seen[f] = cached
+                continue
+            _, meta = self.load(path if self.directory != "." else f)
+            seen[f] = (stamp, make_entry(f, meta))
+            parsed.append(f)
+        self.stamps = seen
+        self.profiles = [entry for _, entry in seen.values()]
+        self._last_query = ""
+        self._last_result = self.profiles
+        return parsed
+
+    def filter(self, query):
+        """Profiles whose name or linked window contains every word of `query`."""
+        q = query.strip().lower()
+        if not q: return self.profiles
+        # Typing extends the previous query, so only its matches need checking
+        pool = self._last_result if self._last_query and q.startswith(self._last_query) else self.profiles
+        terms = q.split()
+        result = [p for p in pool if all(t in p["search"] for t in terms)]
+        self._last_query, self._last_result = q, result
+        return result
+
+
+def make_entry(filename, meta):
+    return {"filename": filename, "metadata": meta,
+            "search": f"{meta.get('name', '')}\n{meta.get('linked_window', '')}\n{filename}".lower()}
@@ -0,0 +1,154 @@
+import ctypes
+import ctypes.util
+import json
+import os
+import select
+import struct
+import sys
+import threading
+import time
+
+# A file must sit unchanged this long before it is reloaded; editors and sync tools write in pieces
+DEBOUNCE = 0.3
+POLL_INTERVAL = 1.0
+
+IN_MODIFY = 0x002
+IN_CLOSE_WRITE = 0x008
+IN_MOVED_FROM = 0x040
+IN_MOVED_TO = 0x080
+IN_CREATE = 0x100
+IN_DELETE = 0x200
+IN_Q_OVERFLOW = 0x4000
+WATCH_MASK = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+_EVENT = struct.Struct("iIII")
+
+
+def json_complete(path):
+    """False while a writer is midway through the file; a missing file counts as settled."""
+    try:
+        with open(path, 'r') as f:
+            json.load(f)
+    except FileNotFoundError:
+        return True
+    except (OSError, ValueError):
+        return False
+    return True
+
+
+class ProfileWatcher:
+    """Reports profile JSON files that changed on disk.
+
+    Uses inotify on Linux and falls back to stat polling elsewhere (or when
+    inotify is unavailable). Changes are debounced: a file is reported once
+    it has been quiet for DEBOUNCE seconds and parses as complete JSON, so a
+    half-written file is never handed over. `on_change(names)` gets a set of
+    filenames and is called on the watcher thread.
+    """
+
+    def __init__(self, directory, on_change, log=print):
+        self.directory = directory
+        self.on_change = on_change
+        self.log = log
+        self.running = False
+        self.backend = None
+        self.pending = {}   # filename -> time of its last event
+        self.stamps = {}
+
+    def start(self):
+        self.running = True
+        fd = self._inotify_open()
+        self.backend = "inotify" if fd is not None else "polling"
+        if fd is None: self.stamps = self._stat_all()
+        threading.Thread(target=self._watch_inotify if fd is not None else self._watch_polling, args=(fd,), daemon=True).start()
+
+    def stop(self):
+        self.running = False
+
+    def _inotify_open(self):
+        if not sys.platform.startswith("linux"): return None
+        try:
+            libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+            fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+            if fd < 0: raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+            if libc.inotify_add_watch(fd, os.fsencode(self.directory), WATCH_MASK) < 0:
+                os.close(fd)
+                raise OSError(ctypes.get_errno(), "inotify_add_watch failed")
+        except (OSError, AttributeError) as e:
+            self.log(f"Profile watcher: inotify unavailable ({e}), polling instead")
+            return None
+        return fd
+
+    def _watch_inotify(self, fd):
+        try:
+            while self.running:
+                ready, _, _ = select.select([fd], [], [], self._timeout(POLL_INTERVAL))
+                if ready:
+                    now = time.perf_counter()
+                    for name in self._read_events(fd):
+                        self.pending[name] = now
+                self._settle()
+        finally:
+            os.close(fd)
+
+    def _read_events(self, fd):
+        try:
+            data = os.read(fd, 64 * 1024)
+        except BlockingIOError:
+            return []
+        names = []
+        pos = 0
+        while pos + _EVENT.size <= len(data):
+            _, mask, _, length = _EVENT.unpack_from(data, pos)
+            name = data[pos + _EVENT.size:pos + _EVENT.size + length].rstrip(b"\0").decode(errors="replace")
+            pos += _EVENT.size + length
+            if mask & IN_Q_OVERFLOW:
+                # Events were lost; treat every profile as touched
+                names.extend(n for n in os.listdir(self.directory) if n.lower().endswith(".json"))
+            elif name.lower().endswith(".json"):
+                names.append(name)
+        return names
+
+    def _watch_polling(self, _fd):
+        while self.running:
+            time.sleep(self._timeout(POLL_INTERVAL))
+            stamps = self._stat_all()
+            now = time.perf_counter()
+            for name in stamps.keys() | self.stamps.keys():
+                if stamps.get(name) != self.stamps.get(name):
+                    self.pending[name] = now
+            self.stamps = stamps
+            self._settle()
+
+    def _stat_all(self):
+        stamps = {}
+        try:
+            names = os.listdir(self.directory)
+        except OSError:
+            return stamps
+        for name in names:
+            if not name.lower().endswith(".json"): continue
+            try:
+                st = os.stat(os.path.join(self.directory, name))
+            except OSError:
+                continue
+            stamps[name] = (st.st_mtime_ns, st.st_size)
+        return stamps
+
+    def _timeout(self, idle):
+        """Sleep until the oldest pending file is due, or `idle` when nothing is pending."""
+        if not self.pending: return idle
+        due = min(self.pending.values()) + DEBOUNCE - time.perf_counter()
+        return min(idle, max(0.01, due))
+
+    def _settle(self):
+        now = time.perf_counter()
+        due = {name for name, t in self.pending.items() if now - t >= DEBOUNCE}
+        if not due: return
+        ready = set()
+        for name in due:
+            del self.pending[name]
+            # Still unparseable after going quiet: the next write brings it back
+            if json_complete(os.path.join(self.directory, name)): ready.add(name)
+            else: self.log(f"Profile watcher: skipping incomplete {name}")
+        if ready and self.running:
+            self.on_change(ready)
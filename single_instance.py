@@ -0,0 +1,108 @@
+import json
+import os
+import socket
+import sys
+import threading
+import time
+
+# Deliberately free of heavy imports: a second launch runs this before
+# customtkinter, mido or pydirectinput are loaded, forwards and exits.
+
+INSTANCE_HOST = "127.0.0.1"
+INSTANCE_PORT = 47654
+# Relaunches of the running app (admin restart) pass this so they don't forward to the instance they replace
+TAKEOVER_FLAG = "--takeover"
+TAKEOVER_WAIT = 10.0
+MAX_REQUEST = 64 * 1024
+MIDI_EXTENSIONS = (".mid", ".midi")
+
+
+def parse_launch_args(argv):
+    """`[--play] [--takeover] file.mid ...` -> {"files": [absolute paths], "play": bool, "takeover": bool}"""
+    files = [os.path.abspath(a) for a in argv if not a.startswith("--") and a.lower().endswith(MIDI_EXTENSIONS)]
+    return {"files": files, "play": "--play" in argv, "takeover": TAKEOVER_FLAG in argv}
+
+
+def forward_to_running_instance(argv, timeout=0.5):
+    """Hands the launch arguments to an already running instance. Returns True if one took them."""
+    # Frozen builds re-run the main script for multiprocessing children
+    if "--multiprocessing-fork" in argv: return False
+    request = parse_launch_args(argv)
+    if request["takeover"]: return False
+    try:
+        with socket.create_connection((INSTANCE_HOST, INSTANCE_PORT), timeout=timeout) as sock:
+            sock.sendall(json.dumps(request).encode() + b"\n")
+            return sock.makefile("rb").readline().strip() == b"ok"
+    except OSError:
+        return False
+
+
+class InstanceServer:
+    """Listens for launch requests from later instances.
+
+    Owning the port is what makes this the running instance; on Windows the
+    socket is bound exclusively so another process can't share it. Requests
+    are handed to `on_request(request)` on the listener thread.
+    """
+
+    def __init__(self, on_request, log=print):
+        self.on_request = on_request
+        self.log = log
+        self.sock = None
+
+    def start(self, wait=0.0):
+        """Claims the port, retrying for `wait` seconds while a previous instance shuts down."""
+        deadline = time.perf_counter() + wait
+        while True:
+            sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            if hasattr(socket, "SO_EXCLUSIVEADDRUSE"):
+                sock.setsockopt(socket.SOL_SOCKET, socket.SO_EXCLUSIVEADDRUSE, 1)
+            else:
+                # POSIX: only lets us past TIME_WAIT leftovers, never a second listener
+                sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            try:
+                sock.bind((INSTANCE_HOST, INSTANCE_PORT))
+                break
+            except OSError as e:
+                sock.close()
+                if time.perf_counter() >= deadline:
+                    self.log(f"Single-instance port {INSTANCE_PORT} unavailable ({e}); running standalone")
+                    return False
+                time.sleep(0.1)
+        sock.listen(4)
+        self.sock = sock
+        threading.Thread(target=self._serve, args=(sock,), daemon=True).start()
+        return True
+
+    def stop(self):
+        if self.sock is not None:
+            # close() alone doesn't wake a blocked accept() everywhere
+            try:
+                self.sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+            self.sock.close()
+            self.sock = None
+
+    def _serve(self, sock):
+        while True:
+            try:
+                conn, _ = sock.accept()
+            except OSError:
+                return
+            with conn:
+                try:
+                    conn.settimeout(1.0)
+                    line = conn.makefile("rb").readline(MAX_REQUEST)
+                    request = json.loads(line)
+                    files = [f for f in request.get("files", []) if isinstance(f, str)]
+                    self.on_request({"files": files, "play": bool(request.get("play"))})
+                    conn.sendall(b"ok\n")
+                except (OSError, ValueError, AttributeError) as e:
+                    self.log(f"Bad launch request: {e}")
+
+
+def relaunch_args():
+    """Command line that starts this app again as the new owner of the instance port."""
+    args = sys.argv[1:] if getattr(sys, 'frozen', False) else sys.argv
+    return [a for a in args if a != TAKEOVER_FLAG] + [TAKEOVER_FLAG]
@@ -0,0 +1,103 @@
+import threading
+
+import mido
+import pytest
+
+from async_engine import AsyncEngine, RealClock, VirtualClock
+from engine_config import EngineConfig
+from engine_stats import EngineCounters, LatencyStats
+from frame_output import FrameOutput
+from playback_control import PlaybackControl
+from recorder import SessionRecorder
+from tracing import SpanTracer
+
+
+class FakeApp:
+    """Just the attributes the engine touches; UI callbacks run inline."""
+
+    def __init__(self, key_map):
+        self.engine_config = EngineConfig(key_map=key_map)
+        self.playback = PlaybackControl()
+        self.held_keys = set()
+        self.key_lock = threading.Lock()
+        self.live_running = False
+        self.latency = LatencyStats()
+        self.counters = EngineCounters()
+        self.tracer = SpanTracer(capacity=1)
+        self.recorder = SessionRecorder(capacity=1)
+        self.frame_output = FrameOutput(lambda: self.engine_config)
+        self.position = (0.0, 0.0, 1.0)
+        self.finished = threading.Event()
+        self.completed = None
+
+    def log(self, message):
+        pass
+
+    def after(self, _delay, callback, *args):
+        callback(*args)
+
+    def update_note_ui(self, name, active):
+        pass
+
+    def check_can_press(self):
+        return True
+
+    def on_file_finished(self, session, completed):
+        self.completed = completed
+        self.finished.set()
+
+
+@pytest.fixture
+def song(tmp_path):
+    # 480 ticks per beat at the default 120 bpm: 480 ticks = 0.5 s
+    mid = mido.MidiFile(ticks_per_beat=480)
+    track = mido.MidiTrack()
+    track.append(mido.Message('note_on', note=60, velocity=90, time=0))
+    track.append(mido.Message('note_off', note=60, velocity=0, time=480))
+    track.append(mido.Message('note_on', note=62, velocity=90, time=0))
+    track.append(mido.Message('note_off', note=62, velocity=0, time=960))
+    mid.tracks.append(track)
+    path = tmp_path / "song.mid"
+    mid.save(path)
+    return str(path)
+
+
+def play(song, start=0.0, speed=1.0, clock=None):
+    app = FakeApp({60: 'a', 62: 'b'})
+    app.engine_config = app.engine_config.with_changes(speed=speed, fallback=False)
+    clock = clock or VirtualClock()
+    pressed = []
+    engine = AsyncEngine(app, clock=clock, press=lambda keys, action: pressed.append((round(clock.now(), 6), keys, action)))
+    try:
+        session = app.playback.start()
+        engine.send("play", song, session, start)
+        assert app.finished.wait(5.0)
+    finally:
+        engine.close()
+    assert app.completed
+    return pressed, app
+
+
+def test_keys_go_out_at_their_virtual_times(song):
+    pressed, app = play(song)
+    assert pressed == [(0.0, 'a', 'down'), (0.5, 'a', 'up'), (0.5, 'b', 'down'), (1.5, 'b', 'up')]
+    assert app.held_keys == set()
+    # A virtual clock never oversleeps
+    assert app.latency.percentiles()[100] == 0.0
+
+
+def test_speed_scales_the_timeline(song):
+    pressed, _ = play(song, speed=2.0)
+    assert [t for t, _k, _a in pressed] == [0.0, 0.25, 0.25, 0.75]
+
+
+def test_start_offset_skips_earlier_notes(song):
+    pressed, _ = play(song, start=1.0)
+    assert pressed == [(0.5, 'b', 'up')]
+
+
+def test_real_clock_never_fires_early(song):
+    pressed, app = play(song, speed=10.0, clock=RealClock())
+    assert [(k, a) for _t, k, a in pressed] == [('a', 'down'), ('a', 'up'), ('b', 'down'), ('b', 'up')]
+    # Coarse timer sleep, then a fine wait up to the deadline
+    assert min(app.latency.samples[:app.latency.count]) >= 0.0
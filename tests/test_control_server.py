@@ -0,0 +1,120 @@
+import json
+import urllib.error
+import urllib.request
+from types import SimpleNamespace
+
+import pytest
+
+from control_server import ControlServer
+from engine_config import EngineConfig
+from engine_stats import EngineCounters, LatencyStats
+from frame_output import FrameOutput
+from playback_control import PlaybackControl, PLAYING
+
+
+class FakeApp:
+    """Just what the control API reads and calls; `after` runs the command inline."""
+
+    def __init__(self):
+        self.playback = PlaybackControl()
+        self.live_running = False
+        self.current_filename = "default_keymap.json"
+        self.current_metadata = {"name": "Default"}
+        self.engine_config = EngineConfig()
+        self.counters = EngineCounters()
+        self.latency = LatencyStats()
+        self.frame_output = FrameOutput(lambda: self.engine_config)
+        self.held_keys = {"a"}
+        self.transpose_var = SimpleNamespace(get=lambda: self.engine_config.transpose)
+        self.profile_index = SimpleNamespace(profiles=[{"filename": "default_keymap.json"}, {"filename": "wasd.json"}])
+        self.switched = []
+
+    def after(self, _delay, callback, *args):
+        callback(*args)
+
+    def start_file(self):
+        self.playback.start()
+
+    def stop_file(self):
+        self.playback.stop()
+
+    def seek_file(self, seconds):
+        self.playback.start()
+
+    def change_transpose(self, delta):
+        self.engine_config = self.engine_config.with_changes(transpose=self.engine_config.transpose + delta)
+
+    def auto_switch_profile(self, filename):
+        self.switched.append(filename)
+        self.current_filename = filename
+
+
+@pytest.fixture
+def api():
+    app = FakeApp()
+    server = ControlServer(app, port=0)
+    server.start()
+    yield app, f"http://127.0.0.1:{server.port}"
+    server.stop()
+
+
+def call(url, method="POST", headers=None):
+    req = urllib.request.Request(url, method=method, data=b"" if method == "POST" else None, headers=headers or {})
+    try:
+        with urllib.request.urlopen(req, timeout=5) as resp:
+            return resp.status, json.loads(resp.read())
+    except urllib.error.HTTPError as e:
+        return e.code, json.loads(e.read())
+
+
+def test_stats(api):
+    app, base = api
+    app.counters.events = 12
+    status, body = call(f"{base}/stats", "GET")
+    assert status == 200
+    assert body["state"] == "stopped"
+    assert body["events"] == 12
+    assert body["held_keys"] == ["a"]
+    assert body["profile"] == "default_keymap.json"
+
+
+def test_play_and_stop(api):
+    app, base = api
+    assert call(f"{base}/play") == (200, {"ok": True, "result": PLAYING})
+    assert app.playback.state == PLAYING
+    assert call(f"{base}/stop")[0] == 200
+    assert not app.playback.is_playing
+
+
+def test_commands_must_be_posted(api):
+    app, base = api
+    status, body = call(f"{base}/play", "GET")
+    assert status == 405
+    assert "POST" in body["error"]
+    assert not app.playback.is_playing
+
+
+def test_browser_origin_is_refused(api):
+    app, base = api
+    status, _ = call(f"{base}/stop", headers={"Origin": "https://example.com"})
+    assert status == 405
+
+
+def test_bad_arguments_return_400(api):
+    _app, base = api
+    assert call(f"{base}/transpose?delta=up") == (400, {"error": "'delta' must be a number"})
+    assert call(f"{base}/seek") == (400, {"error": "missing 't'"})
+    assert call(f"{base}/play?file=/nonexistent/song.mid")[0] == 400
+
+
+def test_profile_must_be_a_listed_profile(api):
+    app, base = api
+    assert call(f"{base}/profile?name=wasd.json")[0] == 200
+    assert call(f"{base}/profile?name=..%2Fwasd.json") == (400, {"error": "profile names can't contain a path"})
+    assert call(f"{base}/profile?name=requests.jsonl") == (400, {"error": "no profile 'requests.jsonl'"})
+    assert app.switched == ["wasd.json"]
+
+
+def test_unknown_endpoint(api):
+    _app, base = api
+    assert call(f"{base}/nope")[0] == 404
@@ -0,0 +1,42 @@
+from device_monitor import DeviceMonitor
+
+
+def test_unlisted_device_counts_as_present_until_a_scan_lists_it():
+    listed = []
+    monitor = DeviceMonitor(list_inputs=lambda: listed, log=lambda _m: None)
+    monitor.scan(initial=True)
+    # Plugged in after the last scan: the live loop must not treat it as unplugged
+    assert monitor.is_present("Piano 1")
+
+    listed.append("Piano 1")
+    monitor.scan()
+    assert monitor.is_present("Piano 1")
+
+    listed.clear()
+    monitor.scan()
+    assert not monitor.is_present("Piano 1")
+
+    # Re-plugged under another index: gone by name, found again by wait_for
+    listed.append("Piano 2")
+    monitor.scan()
+    assert not monitor.is_present("Piano 1")
+    monitor.running = True
+    assert monitor.wait_for("Piano 1", timeout=0.0) == "Piano 2"
+
+
+def test_identical_twin_does_not_stand_in_for_an_unplugged_device():
+    listed = ["Piano 1", "Piano 2"]
+    monitor = DeviceMonitor(list_inputs=lambda: listed, log=lambda _m: None)
+    monitor.running = True
+    monitor.scan(initial=True)
+
+    listed.remove("Piano 1")
+    monitor.scan()
+    assert not monitor.is_present("Piano 1")
+    assert monitor.is_present("Piano 2")
+    # The twin was connected all along, so it isn't the lost device coming back
+    assert monitor.wait_for("Piano 1", timeout=0.0) is None
+
+    listed.append("Piano 1")
+    monitor.scan()
+    assert monitor.wait_for("Piano 1", timeout=0.0) == "Piano 1"
@@ -0,0 +1,48 @@
+import os
+
+import mido
+
+from dry_run import render_keystrokes, write_trace_csv
+from engine_config import EngineConfig
+
+GOLDEN = os.path.join(os.path.dirname(__file__), "golden", "dry_run_trace.csv")
+
+
+def timed(*events):
+    return [(t, mido.Message(kind, note=note, velocity=vel)) for t, kind, note, vel in events]
+
+
+SONG = timed(
+    (0.0, 'note_on', 60, 90),     # exact
+    (0.0, 'note_on', 64, 90),     # chord binding
+    (0.5, 'note_off', 60, 0),
+    (0.5, 'note_on', 72, 80),     # no binding of its own: fallback
+    (0.75, 'note_on', 72, 0),     # note_on with velocity 0 is a release
+    (1.0, 'note_off', 64, 0),
+    (1.25, 'note_on', 67, 70),    # never released
+)
+KEY_MAP = {60: 'a', 64: ['shift', 'e'], 67: 'g'}
+
+
+def test_trace_matches_golden_file(tmp_path):
+    result = render_keystrokes(SONG, EngineConfig(key_map=KEY_MAP))
+    out = tmp_path / "trace.csv"
+    write_trace_csv(out, result.trace)
+    with open(GOLDEN) as f:
+        assert out.read_text() == f.read()
+
+
+def test_summary_counts():
+    result = render_keystrokes(SONG, EngineConfig(key_map=KEY_MAP))
+    assert result.notes_played == 4
+    assert result.fallback_hits == 1
+    assert result.stuck_keys == ['g']
+    assert result.duration == 1.25
+
+
+def test_unmapped_and_out_of_range_notes():
+    song = timed((0.0, 'note_on', 61, 90), (0.1, 'note_on', 120, 90), (0.2, 'note_on', 120, 0), (0.3, 'note_off', 120, 0))
+    result = render_keystrokes(song, EngineConfig(key_map=KEY_MAP, fallback=False, transpose=12))
+    assert result.trace == []
+    assert dict(result.unmapped) == {73: 1}
+    assert result.out_of_range == 1
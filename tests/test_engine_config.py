@@ -0,0 +1,21 @@
+from engine_config import EngineConfig
+
+
+def test_unchanged_keymap_and_fallback_keep_the_compiled_table():
+    cfg = EngineConfig(key_map={60: 'a'})
+    same = cfg.with_changes(key_map={60: 'a'}, fallback=cfg.fallback, transpose=3)
+    assert same.note_keys is cfg.note_keys
+    assert same.version == cfg.version + 1
+
+
+def test_changed_keymap_or_fallback_recompiles():
+    cfg = EngineConfig(key_map={60: 'a'}, fallback=False)
+    remapped = cfg.with_changes(key_map={60: 'b'})
+    assert remapped.note_keys[60] == 'b'
+    assert cfg.with_changes(fallback=True).note_keys is not cfg.note_keys
+
+
+def test_snapshots_are_hashable():
+    cfg = EngineConfig(key_map={60: 'a'})
+    assert hash(cfg) == hash(EngineConfig(key_map={60: 'a'}))
+    assert cfg.with_changes(speed=2.0) != cfg
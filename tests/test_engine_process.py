@@ -0,0 +1,63 @@
+import threading
+
+from engine_process import EventRing, EngineLatency, StatsReporter, apply_engine_stats, EV_NOTE_ON, EV_FILE_DONE, EV_LIVE_STOPPED
+from engine_stats import EngineCounters, LatencyStats, NOTE_EXACT, NOTE_FALLBACK
+
+
+def test_note_outcomes_reach_the_ui_side_as_deltas():
+    counters = EngineCounters()
+    reporter = StatsReporter(counters, EngineLatency())
+    ui = EngineCounters()
+    counters.count_note(NOTE_FALLBACK, 61)
+    counters.count_note(NOTE_FALLBACK, 61)
+    counters.events = 2
+    apply_engine_stats(ui, LatencyStats(), reporter.take())
+    assert ui.notes[NOTE_FALLBACK][61] == 2 and ui.events == 2
+    # The UI resets its coverage on a profile switch; later reports only add what is new
+    ui.reset_notes()
+    counters.count_note(NOTE_EXACT, 60)
+    apply_engine_stats(ui, LatencyStats(), reporter.take())
+    assert (ui.notes[NOTE_FALLBACK][61], ui.notes[NOTE_EXACT][60]) == (0, 1)
+    assert reporter.take() is None
+
+
+def test_concurrent_pushes_are_not_lost():
+    ring = EventRing.create(capacity=4096)
+    try:
+        def producer(kind):
+            for _ in range(500): ring.push(kind)
+        threads = [threading.Thread(target=producer, args=(k,)) for k in (1, 2, 3, 4)]
+        for t in threads: t.start()
+        for t in threads: t.join()
+        events = ring.drain()
+        assert len(events) == 2000
+        assert sorted({e[1] for e in events}) == [1, 2, 3, 4]
+    finally:
+        ring.close(unlink=True)
+
+
+def test_latency_samples_reach_the_ui_side():
+    latency = EngineLatency()
+    reporter = StatsReporter(EngineCounters(), latency)
+    ui = LatencyStats()
+    latency.add(0.0025)
+    apply_engine_stats(EngineCounters(), ui, reporter.take())
+    # A reset and new samples between two reports replace, rather than extend, the UI's samples
+    latency.reset()
+    latency.add(0.001)
+    apply_engine_stats(EngineCounters(), ui, reporter.take())
+    assert ui.count == 1 and ui.samples[0] == 0.001
+
+
+def test_telemetry_never_takes_the_slots_kept_for_control_events():
+    ring = EventRing.create(capacity=64)
+    try:
+        # The UI has stalled: note display events fill every slot they may use
+        while ring.push(EV_NOTE_ON, 60): pass
+        assert ring.push(EV_LIVE_STOPPED)
+        assert ring.push(EV_FILE_DONE, 1, 7)
+        kinds = [kind for _t, kind, _n, _v in ring.drain()]
+        assert kinds[-2:] == [EV_LIVE_STOPPED, EV_FILE_DONE]
+        assert kinds.count(EV_NOTE_ON) == 60
+    finally:
+        ring.close(unlink=True)
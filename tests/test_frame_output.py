@@ -0,0 +1,41 @@
+import time
+from types import SimpleNamespace
+
+from frame_output import FrameOutput
+
+
+def test_taps_faster_than_the_frame_rate_are_merged_not_queued():
+    sent = []
+    output = FrameOutput(lambda: SimpleNamespace(frame_rate=30), send=sent.append)
+    # Ten taps of one key well inside a single 33 ms frame
+    for _ in range(10):
+        output.submit('a', 'down')
+        output.submit('a', 'up')
+    deadline = time.perf_counter() + 1.0
+    while len(sent) < 2 and time.perf_counter() < deadline:
+        time.sleep(0.01)
+    assert sent == [[('a', True)], [('a', False)]]
+    assert output.stats.merged == 18
+    time.sleep(0.1)
+    assert output.stats.transitions == 2
+
+
+def test_switching_quantization_off_keeps_a_queued_press_ahead_of_its_release():
+    sent = []
+    config = SimpleNamespace(frame_rate=1)
+    output = FrameOutput(lambda: config, send=sent.append)
+    output.submit('a', 'down')
+    config.frame_rate = 0
+    output.send_now('a', 'up', lambda keys, action: sent.append([(keys, action == 'down')]))
+    deadline = time.perf_counter() + 2.0
+    while sum(map(len, sent)) < 2 and time.perf_counter() < deadline:
+        time.sleep(0.01)
+    # The release queued behind the press instead of going out first
+    assert [t for batch in sent for t in batch] == [('a', True), ('a', False)]
+
+
+def test_send_now_goes_straight_out_when_nothing_is_queued():
+    pressed = []
+    output = FrameOutput(lambda: SimpleNamespace(frame_rate=0), send=lambda batch: None)
+    output.send_now(['a'], 'down', lambda keys, action: pressed.append((keys, action)))
+    assert pressed == [(['a'], 'down')]
@@ -0,0 +1,44 @@
+import threading
+
+import midi_processing
+from engine_config import compile_key_table
+from midi_processing import stale_keys, release_keys
+
+
+class FakeApp:
+    def __init__(self, held):
+        self.held_keys = set(held)
+        self.key_lock = threading.Lock()
+        self.logged = []
+
+    def log(self, text):
+        self.logged.append(text)
+
+
+def tables(old_map, new_map, fallback=False):
+    return compile_key_table(old_map, fallback)[0], compile_key_table(new_map, fallback)[0]
+
+
+def test_key_shared_with_unchanged_note_is_stale():
+    # Note 72 keeps 'a', but a held note 60 would now release 'c' and never let go of 'a'
+    old, new = tables({60: 'a', 72: 'a'}, {60: 'c', 72: 'a'})
+    assert stale_keys(old, new) == {'a'}
+
+
+def test_keys_kept_by_the_same_note_are_not_stale():
+    old, new = tables({60: ['shift', 'a'], 62: 'b'}, {60: ['shift', 'x'], 62: 'b'})
+    assert stale_keys(old, new) == {'a'}
+
+
+def test_unchanged_table_has_nothing_stale():
+    old, new = tables({60: 'a'}, {60: 'a'}, fallback=True)
+    assert stale_keys(old, new) == set()
+
+
+def test_release_keys_only_touches_held_keys(monkeypatch):
+    sent = []
+    monkeypatch.setattr(midi_processing, "press_keys_for_midi", lambda keys, action: sent.append((list(keys), action)))
+    app = FakeApp({'a', 'z'})
+    release_keys(app, {'a', 'q'})
+    assert app.held_keys == {'z'}
+    assert sent == [(['a'], 'up')]
@@ -0,0 +1,56 @@
+import time
+from types import SimpleNamespace
+
+from hotkeys import HotkeyDispatcher, InjectedKeyFilter
+
+
+def key(name, event_type="down"):
+    return SimpleNamespace(name=name, event_type=event_type)
+
+
+def make_dispatcher(hotkeys, injected=None):
+    fired = []
+    dispatcher = HotkeyDispatcher(injected=injected or InjectedKeyFilter(), log=lambda _m: None)
+    for action in hotkeys:
+        dispatcher.register(action, lambda a=action: fired.append(a))
+    dispatcher.compile(hotkeys)
+    dispatcher.fire = fired.append
+    return dispatcher, fired
+
+
+def test_output_keys_of_a_remote_engine_are_not_hotkeys():
+    injected = InjectedKeyFilter()
+    dispatcher, fired = make_dispatcher({"next_track": "end", "stop": "f10"}, injected)
+    injected.set_output_keys(('end', ['shiftleft', 'a'], None))
+    dispatcher.on_event(key("end"))
+    dispatcher.on_event(key("f10"))
+    assert fired == ["stop"]
+    assert injected.is_injected("shift")
+
+    injected.set_output_keys(())
+    dispatcher.on_event(key("end", "up"))
+    dispatcher.on_event(key("end"))
+    assert fired == ["stop", "next_track"]
+
+
+def test_marked_keys_expire():
+    injected = InjectedKeyFilter()
+    injected.mark(['pageup'])
+    assert injected.is_injected("page up")
+    injected.recent["page up"] = time.perf_counter() - 1.0
+    assert not injected.is_injected("page up")
+
+
+def test_modifier_only_and_modifier_trigger_combos_fire():
+    dispatcher, fired = make_dispatcher({"pause": "shift", "stop": "ctrl+alt"})
+    dispatcher.on_event(key("left shift"))
+    dispatcher.on_event(key("left shift"))
+    dispatcher.on_event(key("left shift", "up"))
+    assert fired == ["pause"]
+
+    dispatcher.on_event(key("alt"))
+    dispatcher.on_event(key("alt", "up"))
+    assert fired == ["pause"]
+    dispatcher.on_event(key("right ctrl"))
+    dispatcher.on_event(key("alt"))
+    assert fired == ["pause", "stop"]
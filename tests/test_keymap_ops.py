@@ -0,0 +1,70 @@
+import pytest
+
+from keymap_ops import (SCALES, EditHistory, parse_note, parse_key_sequence, scale_notes,
+                        map_sequence, shift_range, copy_range, clear_range)
+
+
+@pytest.mark.parametrize("text, note", [("60", 60), ("C4", 60), ("c#4", 61), ("Db4", 61), ("C-1", 0), ("G9", 127), (" a4 ", 69)])
+def test_parse_note(text, note):
+    assert parse_note(text) == note
+
+
+@pytest.mark.parametrize("text", ["", "H4", "C#", "128", "G#9", "Cb4"])
+def test_parse_note_rejects(text):
+    with pytest.raises(ValueError):
+        parse_note(text)
+
+
+def test_parse_key_sequence_keeps_combos_as_lists():
+    assert parse_key_sequence("Z x, c  shift+v") == ['z', 'x', 'c', ['shift', 'v']]
+
+
+def test_scale_notes():
+    assert scale_notes(60, 72, SCALES["Major (white keys)"]) == [60, 62, 64, 65, 67, 69, 71, 72]
+    assert scale_notes(60, 66, SCALES["Black keys"]) == [61, 63, 66]
+
+
+def test_map_sequence_only_reports_real_changes():
+    key_map = {60: 'z', 62: 'x'}
+    assert map_sequence(key_map, [60, 62, 64], ['z', 'c']) == {62: ('x', 'c')}
+
+
+def test_shift_range_moves_bindings_and_drops_those_past_the_edge():
+    key_map = {60: 'z', 62: 'x', 126: 'q'}
+    assert shift_range(key_map, 60, 62, 12) == {60: ('z', None), 62: ('x', None), 72: (None, 'z'), 74: (None, 'x')}
+    assert shift_range(key_map, 126, 127, 2) == {126: ('q', None)}
+
+
+def test_copy_and_clear_range():
+    key_map = {60: 'z', 61: 'a'}
+    assert copy_range(key_map, {60: 'z', 62: 'x'}, 60, 62) == {61: ('a', None), 62: (None, 'x')}
+    assert clear_range(key_map, 61, 127) == {61: ('a', None)}
+
+
+def test_history_undo_redo_round_trip():
+    key_map = {60: 'z'}
+    history = EditHistory(key_map)
+    history.apply(shift_range(key_map, 60, 60, 1))
+    history.apply(map_sequence(key_map, [62], ['x']))
+    assert key_map == {61: 'z', 62: 'x'}
+    history.undo()
+    history.undo()
+    assert key_map == {60: 'z'}
+    assert history.undo() == {}
+    history.redo()
+    assert key_map == {61: 'z'}
+    # A new edit drops whatever could still be redone
+    history.apply(clear_range(key_map))
+    assert history.redo() == {}
+    assert key_map == {}
+
+
+def test_history_is_bounded():
+    key_map = {}
+    history = EditHistory(key_map, limit=2)
+    for note in range(3):
+        history.apply(map_sequence(key_map, [note], ['k']))
+    assert len(history.done) == 2
+    history.undo()
+    history.undo()
+    assert key_map == {0: 'k'}
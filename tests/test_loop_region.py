@@ -0,0 +1,56 @@
+from engine_config import EngineConfig
+from loop_region import LoopedEvents
+from midi_stream import SongColumns, EV_NOTE_ON, EV_NOTE_OFF
+
+
+def song():
+    # C held from 0.5 to 1.5 straddles A; E sounds from 1.5 to 2.5 and is cut off at B = 2.0
+    cols = SongColumns()
+    cols.append(0.5, EV_NOTE_ON, 60, 100)
+    cols.append(1.5, EV_NOTE_OFF, 60, 0)
+    cols.append(1.5, EV_NOTE_ON, 64, 90)
+    cols.append(2.5, EV_NOTE_OFF, 64, 0)
+    cols.append(3.0, EV_NOTE_ON, 67, 80)
+    return cols
+
+
+def take(events, n):
+    it = iter(events)
+    return [(e.type, e.note, round(e.time, 6)) for e, _ in zip(it, range(n))]
+
+
+def test_wrap_releases_at_b_and_represses_what_sounds_at_a():
+    cfg = EngineConfig(loop_a=1.0, loop_b=2.0, loop_count=2)
+    events = LoopedEvents(song(), lambda: cfg)
+    assert take(events, 8) == [
+        ("note_on", 60, 0.5),
+        ("note_off", 60, 1.0),
+        ("note_on", 64, 0.0),
+        # B: let go of E, press C again in the same tick, resume from A
+        ("note_off", 64, 0.5),
+        ("note_on", 60, 0.0),
+        ("note_off", 60, 0.5),
+        ("note_on", 64, 0.0),
+        # Second and last pass: play on through B
+        ("note_off", 64, 1.0),
+    ]
+    assert events.passes == 1
+
+
+def test_speedup_ends_with_the_loop():
+    cfg = EngineConfig(loop_a=1.0, loop_b=2.0, loop_count=3, loop_speedup=10.0)
+    events = LoopedEvents(song(), lambda: cfg)
+    rates = [events.rate for _ in events]
+    assert max(rates) > 1.2
+    assert rates[-1] == 1.0
+
+
+def test_clearing_the_loop_resets_the_speedup():
+    configs = [EngineConfig(loop_a=1.0, loop_b=2.0, loop_speedup=10.0)]
+    events = LoopedEvents(song(), lambda: configs[0])
+    it = iter(events)
+    for _ in range(6): next(it)
+    assert events.rate > 1.0
+    configs[0] = EngineConfig()
+    next(it)
+    assert (events.rate, events.passes) == (1.0, 0)
@@ -0,0 +1,42 @@
+import threading
+
+import mido
+
+import midi_processing
+from engine_config import EngineConfig
+from engine_stats import EngineCounters
+from frame_output import FrameOutput
+from midi_processing import process_msg
+from playback_control import PlaybackControl
+from tracing import SpanTracer
+
+
+class FakeApp:
+    def __init__(self, key_map):
+        self.engine_config = EngineConfig(key_map=key_map)
+        self.playback = PlaybackControl()
+        self.held_keys = set()
+        self.key_lock = threading.Lock()
+        self.live_running = False
+        self.counters = EngineCounters()
+        self.tracer = SpanTracer(capacity=1)
+        self.frame_output = FrameOutput(lambda: self.engine_config)
+
+    def after(self, _delay, callback, *args):
+        callback(*args)
+
+    def update_note_ui(self, name, active):
+        pass
+
+
+def test_superseded_file_session_cannot_press(monkeypatch):
+    sent = []
+    monkeypatch.setattr(midi_processing, "press_keys_for_midi", lambda keys, action: sent.append((keys, action)))
+    app = FakeApp({60: ['a']})
+    old = app.playback.start()
+    new = app.playback.start()
+    # The old thread is still running its last message after the hand-over released the keys
+    process_msg(app, mido.Message('note_on', note=60, velocity=100), source='file', session=old)
+    assert sent == [] and app.held_keys == set()
+    process_msg(app, mido.Message('note_on', note=60, velocity=100), source='file', session=new)
+    assert sent == [(['a'], 'down')] and app.held_keys == {'a'}
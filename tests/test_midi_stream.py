@@ -0,0 +1,70 @@
+import random
+import struct
+
+import mido
+import pytest
+
+from midi_stream import MidiFormatError, StreamingMidiFile, EV_NOTE_ON
+
+
+def mido_notes(path):
+    """(seconds, is_on, note, velocity, channel) as mido plays the file."""
+    out = []
+    t = 0.0
+    for msg in mido.MidiFile(path):
+        t += msg.time
+        if msg.type in ('note_on', 'note_off'):
+            on = msg.type == 'note_on' and msg.velocity > 0
+            out.append((round(t, 9), on, msg.note, msg.velocity, msg.channel))
+    return out
+
+
+def stream_notes(path):
+    with StreamingMidiFile(path) as mid:
+        return [(round(t, 9), kind == EV_NOTE_ON, data & 0x7F, (data >> 8) & 0x7F, (data >> 16) & 0x0F)
+                for t, kind, data in mid.iter_raw()]
+
+
+def test_matches_mido_on_a_multi_track_file_with_tempo_changes(tmp_path):
+    rng = random.Random(7)
+    mid = mido.MidiFile(ticks_per_beat=480)
+    conductor = mido.MidiTrack([mido.MetaMessage('set_tempo', tempo=500000, time=0)])
+    for tempo in (400000, 750000, 300000):
+        conductor.append(mido.MetaMessage('set_tempo', tempo=tempo, time=rng.randrange(200, 2000)))
+    mid.tracks.append(conductor)
+    for channel in range(3):
+        track = mido.MidiTrack()
+        for _ in range(200):
+            note = rng.randrange(36, 96)
+            track.append(mido.Message('note_on', note=note, velocity=rng.randrange(1, 128), channel=channel, time=rng.randrange(0, 120)))
+            track.append(mido.Message('control_change', control=64, value=rng.randrange(128), channel=channel, time=0))
+            track.append(mido.Message('note_on', note=note, velocity=0, channel=channel, time=rng.randrange(1, 240)))
+        mid.tracks.append(track)
+    path = str(tmp_path / "song.mid")
+    mid.save(path)
+
+    expected = mido_notes(path)
+    got = stream_notes(path)
+    assert len(got) == 1200
+    # Events at the same tick may come from different tracks in either order
+    assert sorted(got) == sorted(expected)
+    assert [e[0] for e in got] == sorted(e[0] for e in got)
+
+
+def smf(track_bytes):
+    header = b'MThd' + struct.pack('>IHHH', 6, 0, 1, 96)
+    return header + b'MTrk' + struct.pack('>I', len(track_bytes)) + track_bytes
+
+
+def test_system_common_messages_keep_running_status(tmp_path):
+    path = tmp_path / "common.mid"
+    # note_on, then a song-position (F2 + 2 data bytes), then a running-status note_on
+    path.write_bytes(smf(b'\x00\x90\x3c\x40' + b'\x00\xf2\x10\x20' + b'\x00\x3e\x40' + b'\x00\xff\x2f\x00'))
+    assert [n[2] for n in stream_notes(str(path))] == [0x3c, 0x3e]
+
+
+def test_truncated_track_raises_a_format_error(tmp_path):
+    path = tmp_path / "short.mid"
+    path.write_bytes(smf(b'\x00\x90\x3c'))
+    with pytest.raises(MidiFormatError):
+        stream_notes(str(path))
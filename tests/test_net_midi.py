@@ -0,0 +1,90 @@
+import threading
+import time
+
+import mido
+
+from net_midi import NetMidiInput, NetMidiSender, encode_packet, decode_packet, parse_peer_list
+
+
+def test_packet_round_trip():
+    packet = encode_packet(7, 12345, 0xCAFE, [b'\x90\x3c\x40', b'\x80\x3c\x00'])
+    seq, ts, ssrc, commands = decode_packet(packet)
+    assert (seq, ts, ssrc) == (7, 12345, 0xCAFE)
+    assert commands == [(0, b'\x90\x3c\x40'), (0, b'\x80\x3c\x00')]
+
+
+def test_running_status_and_long_header():
+    # 10 note-ons under one status byte: 1 + 10 * 2 + 9 deltas = 30 bytes, so the long length header is used
+    body = bytearray(b'\x90\x3c\x40')
+    for n in range(61, 70):
+        body += bytes((0, n, 0x40))
+    packet = encode_packet(1, 0, 1, [bytes(body)])
+    _, _, _, commands = decode_packet(packet)
+    assert [c[1][1] for c in commands] == list(range(60, 70))
+    assert all(c[1][0] == 0x90 for c in commands)
+
+
+def test_loopback_delivers_messages_and_counts_gaps():
+    received = []
+    done = threading.Event()
+
+    def on_message(msg):
+        received.append(msg)
+        if len(received) == 3: done.set()
+
+    logged = []
+    port = NetMidiInput(port=0, host="127.0.0.1", callback=on_message, log=logged.append)
+    sender = NetMidiSender("127.0.0.1", port.sock.getsockname()[1])
+    try:
+        sender.send([mido.Message('note_on', note=60, velocity=100)])
+        sender.send([mido.Message('note_off', note=60)])
+        # Two packets never make it
+        sender.seq = (sender.seq + 2) & 0xFFFF
+        sender.send([mido.Message('note_on', note=64, velocity=90)])
+        assert done.wait(2.0)
+    finally:
+        sender.close()
+        port.close()
+
+    assert [(m.type, m.note) for m in received] == [('note_on', 60), ('note_off', 60), ('note_on', 64)]
+    stats = port.stats
+    assert (stats.packets, stats.messages, stats.lost, stats.late, stats.malformed) == (3, 3, 2, 0, 0)
+    assert any("2 packet(s) lost" in line for line in logged)
+
+
+def test_late_and_malformed_packets_are_counted():
+    port = NetMidiInput(port=0, host="127.0.0.1", callback=lambda msg: None, log=lambda _m: None)
+    try:
+        port._receive(encode_packet(10, 0, 5, [b'\x90\x3c\x40']), 0.0)
+        port._receive(encode_packet(9, 0, 5, [b'\x90\x3c\x40']), 0.0)
+        port._receive(b'\x00garbage', 0.0)
+    finally:
+        port.close()
+    assert (port.stats.packets, port.stats.late, port.stats.malformed) == (1, 1, 1)
+
+
+def test_unlisted_senders_are_rejected_before_decoding():
+    received = []
+    logged = []
+    port = NetMidiInput(port=0, callback=received.append, log=logged.append)
+    # With no peers configured only this machine can reach the socket
+    assert port.sock.getsockname()[0] == "127.0.0.1"
+    port.allowed = set()
+    sender = NetMidiSender("127.0.0.1", port.sock.getsockname()[1])
+    try:
+        sender.send([mido.Message('note_on', note=60, velocity=100)])
+        sender.send([mido.Message('note_on', note=62, velocity=100)])
+        deadline = time.perf_counter() + 2.0
+        while port.stats.rejected < 2 and time.perf_counter() < deadline:
+            time.sleep(0.01)
+    finally:
+        sender.close()
+        port.close()
+    assert received == []
+    assert (port.stats.rejected, port.stats.packets) == (2, 0)
+    assert sum("not a configured peer" in line for line in logged) == 1
+
+
+def test_peer_list_parsing():
+    assert parse_peer_list(" 192.168.1.20, studio-pc  10.0.0.5,") == ("192.168.1.20", "studio-pc", "10.0.0.5")
+    assert parse_peer_list("") == ()
@@ -0,0 +1,41 @@
+from engine_config import EngineConfig
+from midi_stream import SongColumns, EV_NOTE_ON, EV_NOTE_OFF
+from piano_roll import NoteSpans, note_categories, MAPPED, FALLBACK, UNMAPPED
+
+
+def spans_of(events):
+    song = SongColumns()
+    for t, kind, note in events:
+        song.append(t, kind, note, 100 if kind == EV_NOTE_ON else 0)
+    return NoteSpans(song)
+
+
+def test_span_crossing_buckets_is_reported_once():
+    spans = spans_of([(0.5, EV_NOTE_ON, 60), (3.5, EV_NOTE_OFF, 60), (4.0, EV_NOTE_ON, 62), (4.2, EV_NOTE_OFF, 62)])
+    assert list(spans.visible(0.0, 5.0)) == [0, 1]
+    # A viewport that starts inside the long note still finds it, from its first visible bucket
+    assert list(spans.visible(2.2, 3.0)) == [0]
+    assert list(spans.visible(3.6, 3.9)) == []
+
+
+def test_notes_never_released_run_to_the_end_of_the_song():
+    spans = spans_of([(0.0, EV_NOTE_ON, 60), (1.0, EV_NOTE_ON, 64), (2.0, EV_NOTE_OFF, 64), (6.0, EV_NOTE_ON, 67)])
+    by_note = {spans.notes[i]: (spans.starts[i], spans.ends[i]) for i in range(len(spans))}
+    assert by_note == {60: (0.0, 6.0), 64: (1.0, 2.0), 67: (6.0, 6.0)}
+    assert 0 in spans.visible(5.0, 5.5)
+
+
+def test_note_categories_follow_keymap_fallback_and_transpose():
+    cfg = EngineConfig(key_map={60: 'a', 62: 'b'}, fallback=True)
+    cats = note_categories(cfg)
+    # Fallback borrows the same pitch class from another octave
+    assert (cats[60], cats[72], cats[61]) == (MAPPED, FALLBACK, UNMAPPED)
+    assert note_categories(cfg.with_changes(fallback=False))[72] == UNMAPPED
+    shifted = note_categories(cfg.with_changes(transpose=2, fallback=False))
+    assert (shifted[58], shifted[60], shifted[127]) == (MAPPED, MAPPED, UNMAPPED)
+
+
+def test_category_counts():
+    spans = spans_of([(0.0, EV_NOTE_ON, 60), (1.0, EV_NOTE_OFF, 60), (1.0, EV_NOTE_ON, 61), (2.0, EV_NOTE_OFF, 61)])
+    cats = note_categories(EngineConfig(key_map={60: 'a'}, fallback=False))
+    assert spans.category_counts(cats) == [1, 0, 1]
@@ -0,0 +1,20 @@
+from playback_control import PlaybackControl, PLAYING, PAUSED, STOPPED
+
+
+def test_pause_and_resume_do_not_revive_a_stopped_session():
+    playback = PlaybackControl()
+    playback.start()
+    playback.stop()
+    assert not playback.pause()
+    assert not playback.resume()
+    assert playback.state == STOPPED
+
+
+def test_toggle_pause_round_trip():
+    playback = PlaybackControl()
+    seen = []
+    playback.add_listener(lambda state, session: seen.append(state))
+    playback.start()
+    assert playback.toggle_pause()
+    assert playback.toggle_pause()
+    assert seen == [PLAYING, PAUSED, PLAYING]
@@ -0,0 +1,26 @@
+import random
+
+from playlist import Playlist
+
+
+def test_set_entries_while_shuffled_replaces_the_order():
+    queue = Playlist()
+    queue.set_entries(list("abcde"))
+    for _ in range(4):
+        queue.advance()
+    queue.set_shuffle(True)
+    queue.set_entries(["x", "y"])
+    assert sorted(queue.order) == [0, 1]
+    assert queue.pos == 0
+    assert queue.current() in ("x", "y")
+
+
+def test_shuffle_keeps_the_current_song_first():
+    random.seed(1)
+    queue = Playlist()
+    queue.set_entries(list("abcde"))
+    queue.advance()
+    queue.advance()
+    queue.set_shuffle(True)
+    assert queue.current() == "c"
+    assert queue.pos == 0
@@ -0,0 +1,25 @@
+import mido
+
+from recorder import SessionRecorder
+
+
+def test_nothing_is_recorded_after_stop():
+    rec = SessionRecorder(capacity=4)
+    msg = mido.Message('note_on', note=60, velocity=100)
+    assert not rec.record(msg)
+    rec.start()
+    assert rec.record(msg)
+    assert rec.stop() == 1
+    # The live thread may still be holding a message from before the stop
+    assert not rec.record(msg)
+    assert rec.count == 1
+    assert [m.note for _t, m in rec.iter_messages()] == [60]
+
+
+def test_recording_grows_past_its_capacity():
+    rec = SessionRecorder(capacity=2)
+    rec.start()
+    for note in range(5):
+        rec.record(mido.Message('note_on', note=note, velocity=64))
+    rec.stop()
+    assert [m.note for _t, m in rec.iter_messages()] == [0, 1, 2, 3, 4]
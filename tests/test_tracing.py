@@ -0,0 +1,19 @@
+from tracing import SpanTracer, SPAN_EMIT, SPAN_WAIT
+
+
+def test_exporting_twice_does_not_leave_empty_spans():
+    tracer = SpanTracer(capacity=8)
+    tracer.start()
+    tracer.add(SPAN_EMIT, 1.0, 2.0)
+    assert [s[:3] for s in tracer.spans()] == [(SPAN_EMIT, 1.0, 2.0)]
+    tracer.add(SPAN_WAIT, 3.0, 4.0)
+    assert [s[:3] for s in tracer.spans()] == [(SPAN_EMIT, 1.0, 2.0), (SPAN_WAIT, 3.0, 4.0)]
+
+
+def test_wrapped_ring_keeps_the_newest_spans_in_order():
+    tracer = SpanTracer(capacity=4)
+    tracer.start()
+    for n in range(6):
+        tracer.add(SPAN_EMIT, float(n), float(n) + 0.5)
+        list(tracer.spans())
+    assert [s[1] for s in tracer.spans()] == [2.0, 3.0, 4.0, 5.0]
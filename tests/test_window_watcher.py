@@ -0,0 +1,83 @@
+import threading
+import time
+
+import window_watcher
+from window_watcher import WindowMatcher, WindowWatcher
+
+
+def profile(filename, link):
+    return {"filename": filename, "metadata": {"linked_window": link}}
+
+
+def test_longest_pattern_wins_at_the_same_position():
+    matcher = WindowMatcher([profile("base.json", "Genshin"), profile("beta.json", "Genshin Impact Beta"),
+                             profile("sky.json", "Sky"), profile("none.json", "")])
+    assert matcher.match("Genshin Impact Beta - Launcher") == "beta.json"
+    assert matcher.match("GENSHIN IMPACT") == "base.json"
+    assert matcher.match("Sky: Children of the Light") == "sky.json"
+    assert matcher.match("Notepad") is None
+    assert matcher.match("") is None
+
+
+def test_first_match_wins():
+    matcher = WindowMatcher([profile("first.json", "roblox"), profile("second.json", "Roblox"),
+                             profile("piano.json", "piano")])
+    # The same pattern twice: the first profile keeps it
+    assert matcher.match("Roblox") == "first.json"
+    # The leftmost pattern in the title wins
+    assert matcher.match("Piano Rooms - Roblox") == "piano.json"
+    assert matcher.match_any(["Explorer", "Roblox", "Piano"]) == "first.json"
+    assert matcher.match_any(["Explorer"]) is None
+
+
+def test_hundreds_of_profiles_match_like_a_linear_scan():
+    links = [f"game {i} {'x' * (i % 7)}" for i in range(500)]
+    matcher = WindowMatcher([profile(f"p{i}.json", link) for i, link in enumerate(links)])
+    for i in (0, 1, 7, 123, 499):
+        title = f"Playing {links[i]} now"
+        expected = max((l for l in links if l in title.lower()), key=len)
+        assert matcher.match(title) == f"p{links.index(expected)}.json"
+
+
+def test_watcher_reports_only_the_title_that_settles(monkeypatch):
+    monkeypatch.setattr(window_watcher, "POLL_INTERVAL", 0.01)
+    # Alt-tab flapping through linked windows, then resting on one
+    titles = iter(["Genshin", "Sky", "Genshin", "Notepad", "Sky"])
+    current = ["Sky"]
+
+    def get_title():
+        current[0] = next(titles, current[0])
+        return current[0]
+
+    matches = []
+    matched = threading.Event()
+
+    def on_match(filename):
+        matches.append(filename)
+        matched.set()
+
+    matcher = WindowMatcher([profile("genshin.json", "Genshin"), profile("sky.json", "Sky")])
+    watcher = WindowWatcher(lambda: matcher, on_match, debounce=0.2, get_title=get_title, log=lambda _m: None)
+    watcher.start()
+    try:
+        assert matched.wait(2.0)
+        time.sleep(0.3)
+    finally:
+        watcher.stop()
+    assert matches == ["sky.json"]
+
+
+def test_returning_to_the_same_window_is_reported_again():
+    # Our own window is never reported, so game -> app -> game arrives as the same title twice
+    matches = []
+    matcher = WindowMatcher([profile("genshin.json", "Genshin")])
+    watcher = WindowWatcher(lambda: matcher, matches.append, debounce=0.05, get_title=lambda: "", log=lambda _m: None)
+    watcher.start()
+    try:
+        watcher.notify("Genshin Impact")
+        time.sleep(0.2)
+        watcher.notify("Genshin Impact")
+        time.sleep(0.2)
+    finally:
+        watcher.stop()
+    assert matches == ["genshin.json", "genshin.json"]
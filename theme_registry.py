@@ -0,0 +1,92 @@
+import tkinter as tk
+
+# CTk widget options that can hold a theme color
+THEMED_OPTIONS = ("fg_color", "bg_color", "text_color", "text_color_disabled", "hover_color", "border_color",
+                  "button_color", "button_hover_color", "progress_color", "selected_color", "selected_hover_color",
+                  "unselected_color", "dropdown_fg_color", "scrollbar_button_color", "placeholder_text_color")
+
+
+class ThemeColor(str):
+    """A color string that remembers which theme role it came from, so a widget built with it can be re-colored."""
+    def __new__(cls, role, value):
+        color = super().__new__(cls, value)
+        color.role = role
+        return color
+
+
+class ThemeRegistry:
+    """The active theme, switchable while the app runs.
+
+    `colors` maps each role ("BG", "PRIMARY", ...) to a ThemeColor. CTk
+    widgets created with those colors subscribe just by being built with
+    them: `switch` walks the widget tree and swaps any option still holding a
+    ThemeColor for the new theme's color of the same role. Widgets a walk
+    can't reach (canvases, ttk styles) register a callback with `subscribe`.
+    Module namespaces holding COLOR_* names are tracked with `track_names`
+    so code configuring widgets later picks up the new colors too.
+    """
+
+    def __init__(self, themes, name, defaults):
+        self.themes = themes
+        self.defaults = defaults
+        self.namespaces = []
+        self.subscribers = []
+        self.name = None
+        self.colors = {}
+        self.select(name)
+
+    def select(self, name):
+        if name not in self.themes: name = "Default"
+        theme = self.themes[name]
+        self.name = name
+        self.colors = {role: ThemeColor(role, theme.get(role, default)) for role, default in self.defaults.items()}
+
+    def track_names(self, namespace):
+        """Keeps the COLOR_* names in `namespace` (a module's globals()) current across switches.
+
+        Modules that star-import the constants hold their own copies of those
+        names, so each one registers its globals once at import.
+        """
+        self.namespaces.append(namespace)
+
+    def subscribe(self, widget, callback):
+        """callback() runs after every switch for as long as `widget` exists."""
+        self.subscribers.append((widget, callback))
+
+    def switch(self, name, root):
+        self.select(name)
+        colors = self.colors
+        for namespace in self.namespaces:
+            for key, value in list(namespace.items()):
+                if isinstance(value, ThemeColor): namespace[key] = colors[value.role]
+        self.recolor(root)
+        alive = []
+        for widget, callback in self.subscribers:
+            try:
+                if not widget.winfo_exists(): continue
+            except tk.TclError:
+                continue
+            callback()
+            alive.append((widget, callback))
+        self.subscribers = alive
+
+    def recolor(self, widget):
+        colors = self.colors
+        stack = [widget]
+        while stack:
+            w = stack.pop()
+            stack.extend(w.winfo_children())
+            # Only CTk widgets hand back the ThemeColor they were given; plain Tk ones don't know these options
+            changes = {}
+            for option in THEMED_OPTIONS:
+                try:
+                    value = w.cget(option)
+                except (ValueError, AttributeError, tk.TclError):
+                    continue
+                if isinstance(value, ThemeColor) and value != colors[value.role]:
+                    changes[option] = colors[value.role]
+            if changes:
+                try:
+                    w.configure(**changes)
+                except (ValueError, tk.TclError):
+                    pass
@@ -0,0 +1,87 @@
+import atexit
+import ctypes
+import os
+import sys
+
+LINUX_RT_PRIORITY = 50
+THREAD_PRIORITY_TIME_CRITICAL = 15
+
+_timer_period_raised = False
+
+
+def apply_thread_tuning(realtime, cpu_core):
+    """Raises priority and/or pins the calling thread. Returns a message for the log.
+
+    Failures (missing permissions, unsupported platform) are reported and
+    otherwise ignored, so playback simply continues at normal priority.
+    """
+    results = []
+    if realtime:
+        results.append(_raise_priority())
+    if cpu_core is not None and cpu_core >= 0:
+        results.append(_pin_to_core(cpu_core))
+    return "; ".join(results)
+
+
+def _raise_priority():
+    if sys.platform == "win32":
+        kernel32 = ctypes.windll.kernel32
+        raise_timer_resolution()
+        if kernel32.SetThreadPriority(kernel32.GetCurrentThread(), THREAD_PRIORITY_TIME_CRITICAL):
+            return "Thread priority: time critical"
+        return f"Thread priority unchanged (error {kernel32.GetLastError()})"
+
+    if hasattr(os, "sched_setscheduler"):
+        try:
+            # pid 0 is the calling thread on Linux
+            os.sched_setscheduler(0, os.SCHED_FIFO, os.sched_param(LINUX_RT_PRIORITY))
+            return f"Thread priority: SCHED_FIFO {LINUX_RT_PRIORITY}"
+        except PermissionError:
+            pass
+        except OSError as e:
+            return f"Thread priority unchanged ({e})"
+        try:
+            os.setpriority(os.PRIO_PROCESS, 0, -10)
+            return "Real-time scheduling denied, using nice -10"
+        except OSError:
+            return "Real-time scheduling denied (needs CAP_SYS_NICE), running at normal priority"
+
+    return "Thread priority not supported on this platform"
+
+
+def raise_timer_resolution():
+    """Asks Windows for a 1 ms timer so sleeps near a deadline don't overshoot by a 15.6 ms tick.
+
+    Raised once per process and restored at exit; a no-op elsewhere.
+    """
+    # Every timeBeginPeriod needs a matching timeEndPeriod
+    global _timer_period_raised
+    if _timer_period_raised: return
+    try:
+        winmm = ctypes.windll.winmm
+        if winmm.timeBeginPeriod(1) != 0: return
+    except Exception:
+        return
+    _timer_period_raised = True
+    atexit.register(winmm.timeEndPeriod, 1)
+
+
+def _pin_to_core(cpu_core):
+    if cpu_core >= (os.cpu_count() or 1):
+        return f"CPU {cpu_core} does not exist, affinity unchanged"
+
+    if sys.platform == "win32":
+        kernel32 = ctypes.windll.kernel32
+        kernel32.SetThreadAffinityMask.restype = ctypes.c_size_t
+        if kernel32.SetThreadAffinityMask(kernel32.GetCurrentThread(), ctypes.c_size_t(1 << cpu_core)):
+            return f"Pinned to CPU {cpu_core}"
+        return f"Affinity unchanged (error {kernel32.GetLastError()})"
+
+    if hasattr(os, "sched_setaffinity"):
+        try:
+            os.sched_setaffinity(0, {cpu_core})
+            return f"Pinned to CPU {cpu_core}"
+        except OSError as e:
+            return f"Affinity unchanged ({e})"
+
+    return "CPU affinity not supported on this platform"
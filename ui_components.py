@@ -1,7 +1,9 @@
 import customtkinter as ctk
 import tkinter as tk
-from tkinter import ttk, messagebox, colorchooser
+from tkinter import ttk, messagebox, colorchooser, filedialog
 import copy
+import math
+import os
 import threading
 import time
 try:
@@ -11,21 +13,69 @@ except ImportError:
 
 from constants import *
 from utils import *
+from net_midi import NET_BUFFER_OPTIONS
+from piano_roll import note_categories, MAPPED, FALLBACK, UNMAPPED
+from loop_region import loop_active
+from layers import Layer
+from frame_output import FRAME_RATE_OPTIONS
+from engine_stats import NOTE_OUTCOMES, NOTE_EXACT, NOTE_FALLBACK
+from keymap_ops import SCALES, EditHistory, parse_note, parse_key_sequence, scale_notes, diff, map_sequence, shift_range, copy_range, clear_range
+
+THEME.track_names(globals())
+
+PROFILE_ROW_HEIGHT = 52
+
+
+class ProfileRow(ctk.CTkFrame):
+    """One recycled line of the profile list; `show` rebinds it to another profile."""
+    def __init__(self, master, manager):
+        super().__init__(master, fg_color="#2b2b2b", height=PROFILE_ROW_HEIGHT - 4)
+        self.pack_propagate(False)
+        self.profile = None
+
+        info_frame = ctk.CTkFrame(self, fg_color="transparent")
+        info_frame.pack(side="left", padx=10, pady=5)
+        self.name_label = ctk.CTkLabel(info_frame, text="", height=20, font=ctk.CTkFont(size=13, weight="bold"))
+        self.name_label.pack(anchor="w")
+        self.link_label = ctk.CTkLabel(info_frame, text="", height=16, font=ctk.CTkFont(size=11))
+        self.link_label.pack(anchor="w")
+
+        ctk.CTkButton(self, text="Load", width=50, height=24, fg_color="#444", hover_color=COLOR_PRIMARY, command=lambda: manager.do_load(self.profile["filename"])).pack(side="right", padx=5)
+        ctk.CTkButton(self, text="⚙", width=30, height=24, fg_color="transparent", border_width=1, border_color="#555", command=lambda: manager.edit_meta(self.profile)).pack(side="right", padx=5)
+
+    def show(self, prof):
+        if prof is self.profile: return
+        self.profile = prof
+        link = prof["metadata"].get("linked_window", "")
+        self.name_label.configure(text=prof["metadata"].get("name", "Unknown"))
+        if link:
+            self.link_label.configure(text=f"🔗 Auto-switch: {link}", text_color=COLOR_PRIMARY)
+        else:
+            self.link_label.configure(text="No auto-switch linked · manual switch only", text_color="#666")
 
 
 class ProfileManager(ctk.CTkToplevel):
-    def __init__(self, parent, profiles, load_callback, refresh_callback):
+    """Profile list backed by a ProfileIndex.
+
+    Only as many rows as fit the viewport are created; scrolling, resizing and
+    searching rebind those rows to a different slice of the filtered list, so
+    opening and typing cost the same for 10 profiles or 1000.
+    """
+    def __init__(self, parent, index, load_callback, refresh_callback):
         super().__init__(parent)
         self.title("Profile Manager")
         self.geometry("500x400")
-        self.profiles = profiles
+        self.index = index
+        self.profiles = index.profiles
         self.load_callback = load_callback
         self.refresh_callback = refresh_callback
         self.parent = parent
+        self.rows = []
+        self.top = 0
 
         self.attributes("-topmost", True)
         self.grid_columnconfigure(0, weight=1)
-        self.grid_rowconfigure(1, weight=1)
+        self.grid_rowconfigure(2, weight=1)
 
         # Header
         top_frame = ctk.CTkFrame(self, fg_color="transparent")
@@ -33,36 +83,78 @@ class ProfileManager(ctk.CTkToplevel):
         ctk.CTkLabel(top_frame, text="Configuration Profiles", font=ctk.CTkFont(size=16, weight="bold")).pack(side="left")
         ctk.CTkButton(top_frame, text="+ New", width=80, fg_color=COLOR_LIVE_GO, command=self.create_new).pack(side="right")
 
+        # Search
+        search_frame = ctk.CTkFrame(self, fg_color="transparent")
+        search_frame.grid(row=1, column=0, sticky="ew", padx=20, pady=(0, 10))
+        self.count_label = ctk.CTkLabel(search_frame, text="", text_color="gray", font=ctk.CTkFont(size=11))
+        self.count_label.pack(side="right", padx=(10, 0))
+        self.search_var = tk.StringVar()
+        ctk.CTkEntry(search_frame, textvariable=self.search_var, placeholder_text="Search name or linked window...").pack(side="left", fill="x", expand=True)
+        self.search_var.trace_add("write", lambda *_: self.apply_filter())
+
         # List
-        self.scroll = ctk.CTkScrollableFrame(self, fg_color="#222")
-        self.scroll.grid(row=1, column=0, sticky="nsew", padx=20, pady=(0, 20))
-        self.scroll.grid_columnconfigure(0, weight=1)
-        
-        self.populate_list()
+        list_frame = ctk.CTkFrame(self, fg_color="#222")
+        list_frame.grid(row=2, column=0, sticky="nsew", padx=20, pady=(0, 20))
+        self.scrollbar = ctk.CTkScrollbar(list_frame, command=self.on_scrollbar)
+        self.scrollbar.pack(side="right", fill="y")
+        self.body = ctk.CTkFrame(list_frame, fg_color="transparent")
+        self.body.pack(side="left", fill="both", expand=True, padx=5, pady=5)
+        self.body.pack_propagate(False)
+        self.body.bind("<Configure>", self.on_resize)
+        self.bind("<MouseWheel>", self.on_wheel)
+
+        self.apply_filter()
         self.grab_set()
 
-    def populate_list(self):
-        for widget in self.scroll.winfo_children(): widget.destroy()
-        
-        for prof in self.profiles:
-            row = ctk.CTkFrame(self.scroll, fg_color="#2b2b2b")
-            row.pack(fill="x", pady=2)
-            
-            info_frame = ctk.CTkFrame(row, fg_color="transparent")
-            info_frame.pack(side="left", padx=10, pady=5)
-            
-            name = prof["metadata"].get("name", "Unknown")
-            link = prof["metadata"].get("linked_window", "")
-            
-            ctk.CTkLabel(info_frame, text=name, font=ctk.CTkFont(size=13, weight="bold")).pack(anchor="w")
-            if link:
-                ctk.CTkLabel(info_frame, text=f"🔗 Auto-switch: {link}", font=ctk.CTkFont(size=11), text_color=COLOR_PRIMARY).pack(anchor="w")
-            else:
-                ctk.CTkLabel(info_frame, text="No auto-switch linked", font=ctk.CTkFont(size=11), text_color="#666").pack(anchor="w")
-                ctk.CTkLabel(info_frame, text="Manual switch only", font=ctk.CTkFont(size=11), text_color="#666").pack(anchor="w")
+    def apply_filter(self):
+        self.profiles = self.index.filter(self.search_var.get())
+        total = len(self.index.profiles)
+        self.count_label.configure(text=f"{len(self.profiles)} of {total}" if len(self.profiles) != total else f"{total}")
+        self.scroll_to(0)
+
+    def refresh(self):
+        """Picks up a rescanned index without jumping back to the top."""
+        top = self.top
+        self.apply_filter()
+        self.scroll_to(top)
+
+    def page_size(self):
+        return max(1, self.body.winfo_height() // max(1, round(self.body._apply_widget_scaling(PROFILE_ROW_HEIGHT))))
+
+    def on_resize(self, _event=None):
+        # One spare row so a partially visible last line is still drawn
+        needed = self.page_size() + 1
+        while len(self.rows) < needed:
+            self.rows.append(ProfileRow(self.body, self))
+        self.scroll_to(self.top)
+
+    def on_scrollbar(self, action, amount, unit=None):
+        if action == "moveto":
+            self.scroll_to(round(float(amount) * len(self.profiles)))
+        else:
+            step = self.page_size() if unit == "pages" else 1
+            self.scroll_to(self.top + int(amount) * step)
 
-            ctk.CTkButton(row, text="Load", width=50, height=24, fg_color="#444", hover_color=COLOR_PRIMARY, command=lambda f=prof["filename"]: self.do_load(f)).pack(side="right", padx=5)
-            ctk.CTkButton(row, text="⚙", width=30, height=24, fg_color="transparent", border_width=1, border_color="#555", command=lambda p=prof: self.edit_meta(p)).pack(side="right", padx=5)
+    def on_wheel(self, event):
+        self.scroll_to(self.top - (3 if event.delta > 0 else -3))
+
+    def scroll_to(self, top):
+        page = self.page_size()
+        self.top = max(0, min(top, len(self.profiles) - page))
+        self.populate_list()
+        total = len(self.profiles)
+        if total: self.scrollbar.set(self.top / total, min(1.0, (self.top + page) / total))
+        else: self.scrollbar.set(0.0, 1.0)
+
+    def populate_list(self):
+        for i, row in enumerate(self.rows):
+            n = self.top + i
+            if n < len(self.profiles):
+                row.show(self.profiles[n])
+                if not row.winfo_manager(): row.pack(fill="x", pady=2)
+            elif row.winfo_manager():
+                row.pack_forget()
+                row.profile = None
 
     def do_load(self, filename):
         self.load_callback(filename)
@@ -115,9 +207,8 @@ class ProfileManager(ctk.CTkToplevel):
                 metadata["linked_window"] = link
 
             save_profile_data(filename, mappings, metadata)
-            self.refresh_callback() # Refresh parent cache
-            self.profiles = self.parent.profile_cache # Update local list
-            self.populate_list()
+            self.refresh_callback() # Rescans the index, re-parsing only what changed
+            self.apply_filter()
             dialog.destroy()
 
         ctk.CTkButton(dialog, text="Save", command=save, fg_color=COLOR_LIVE_GO).pack(pady=20)
@@ -127,20 +218,23 @@ class SleekEditor(ctk.CTkToplevel):
     def __init__(self, parent, key_map, callback):
         super().__init__(parent)
         self.title("Keymap Editor")
-        self.geometry("400x600")
+        self.geometry("460x760")
+        self.parent = parent
         self.callback = callback
         self.attributes("-topmost", True)
         self.temp_map = copy.deepcopy(key_map)
+        self.history = EditHistory(self.temp_map)
 
         self.grid_columnconfigure(0, weight=1)
         self.grid_rowconfigure(1, weight=1)
 
-        ctk.CTkLabel(self, text="Double-click to edit mappings", font=ctk.CTkFont(size=14, weight="bold")).grid(row=0, column=0, pady=15)
+        ctk.CTkLabel(self, text="Double-click to edit, select rows to set a range", font=ctk.CTkFont(size=14, weight="bold")).grid(row=0, column=0, pady=15)
 
         style = ttk.Style()
         style.theme_use("default")
         style.configure("Treeview", background="#2b2b2b", foreground="white", fieldbackground="#2b2b2b", borderwidth=0, rowheight=28)
         style.map('Treeview', background=[('selected', COLOR_PRIMARY)])
+        THEME.subscribe(self, lambda: style.map('Treeview', background=[('selected', COLOR_PRIMARY)]))
         style.configure("Treeview.Heading", background="#333", foreground="white", relief="flat")
 
         cols = ("MIDI", "Note", "Keys")
@@ -151,43 +245,146 @@ class SleekEditor(ctk.CTkToplevel):
         self.tree.column("MIDI", width=60, anchor="center")
         self.tree.column("Note", width=60, anchor="center")
         self.tree.column("Keys", width=150, anchor="center")
+        self.tree.tag_configure("unmapped", foreground="#666")
 
         self.tree.grid(row=1, column=0, sticky="nsew", padx=20)
         self.populate()
         self.tree.bind("<Double-1>", self.on_click)
+        self.tree.bind("<<TreeviewSelect>>", self.on_select)
+
+        # Bulk operations, all applied to temp_map through the undo history
+        bulk = ctk.CTkFrame(self)
+        bulk.grid(row=2, column=0, sticky="ew", padx=20, pady=(15, 0))
+
+        range_row = ctk.CTkFrame(bulk, fg_color="transparent")
+        range_row.pack(fill="x", padx=10, pady=(10, 5))
+        ctk.CTkLabel(range_row, text="Range").pack(side="left")
+        self.low_entry = ctk.CTkEntry(range_row, width=55)
+        self.low_entry.pack(side="left", padx=(8, 4))
+        self.low_entry.insert(0, "C3")
+        ctk.CTkLabel(range_row, text="to").pack(side="left")
+        self.high_entry = ctk.CTkEntry(range_row, width=55)
+        self.high_entry.pack(side="left", padx=4)
+        self.high_entry.insert(0, "B5")
+        self.scale_var = ctk.StringVar(value="Major (white keys)")
+        ctk.CTkOptionMenu(range_row, variable=self.scale_var, values=list(SCALES), width=150).pack(side="right")
+
+        keys_row = ctk.CTkFrame(bulk, fg_color="transparent")
+        keys_row.pack(fill="x", padx=10, pady=5)
+        self.keys_entry = ctk.CTkEntry(keys_row, placeholder_text="Keys in order, e.g. z x c v b n m shift+a")
+        self.keys_entry.pack(side="left", fill="x", expand=True)
+        ctk.CTkButton(keys_row, text="Map", width=60, fg_color=COLOR_PRIMARY, command=self.map_keys).pack(side="right", padx=(8, 0))
+
+        shift_row = ctk.CTkFrame(bulk, fg_color="transparent")
+        shift_row.pack(fill="x", padx=10, pady=5)
+        ctk.CTkButton(shift_row, text="Oct -", width=55, fg_color="#444", command=lambda: self.shift(-12)).pack(side="left")
+        ctk.CTkButton(shift_row, text="Oct +", width=55, fg_color="#444", command=lambda: self.shift(12)).pack(side="left", padx=5)
+        ctk.CTkButton(shift_row, text="Copy", width=55, fg_color="#444", command=self.copy_from).pack(side="right")
+        # The profile watcher keeps this list current; no need to rescan the folder here
+        profiles = [p["filename"] for p in parent.profile_cache]
+        self.copy_var = ctk.StringVar(value=profiles[0] if profiles else "")
+        ctk.CTkOptionMenu(shift_row, variable=self.copy_var, values=profiles or [""], width=150).pack(side="right", padx=5)
+
+        history_row = ctk.CTkFrame(bulk, fg_color="transparent")
+        history_row.pack(fill="x", padx=10, pady=(5, 10))
+        ctk.CTkButton(history_row, text="Undo", width=55, fg_color="#444", command=self.undo).pack(side="left")
+        ctk.CTkButton(history_row, text="Redo", width=55, fg_color="#444", command=self.redo).pack(side="left", padx=5)
+        self.status = ctk.CTkLabel(history_row, text="", text_color="gray", font=ctk.CTkFont(size=11))
+        self.status.pack(side="right")
 
         action_frame = ctk.CTkFrame(self, fg_color="transparent")
-        action_frame.grid(row=2, column=0, pady=20)
+        action_frame.grid(row=3, column=0, pady=20)
 
         ctk.CTkButton(action_frame, text="Save Changes", command=self.save, fg_color=COLOR_LIVE_GO, hover_color="#238636").pack(side="left", padx=5)
         ctk.CTkButton(action_frame, text="Cancel", command=self.destroy, fg_color="transparent", border_width=1, text_color="#AAAAAA").pack(side="left", padx=5)
         ctk.CTkButton(action_frame, text="Clear All", command=self.clear, fg_color="#333", hover_color=COLOR_DANGER).pack(side="left", padx=5)
 
+        self.bind("<Control-z>", lambda e: self.undo())
+        self.bind("<Control-y>", lambda e: self.redo())
+        self.bind("<Control-Z>", lambda e: self.redo())
         self.grab_set()
 
     def populate(self):
-        for i in self.tree.get_children(): self.tree.delete(i)
-        for note in range(21, 109):
-            key = self.temp_map.get(note, "-")
-            d_key = '+'.join(key) if isinstance(key, list) else key
-            self.tree.insert("", "end", values=(note, midi_to_note_name(note), d_key))
+        # Rows are created once, keyed by note; edits only touch the rows they change
+        for note in range(128):
+            self.tree.insert("", "end", iid=str(note), values=self.row_values(note), tags=self.row_tags(note))
+        # Open at the bottom of a piano's range
+        self.tree.yview_moveto(21 / 128)
+
+    def row_values(self, note):
+        key = self.temp_map.get(note, "-")
+        d_key = '+'.join(key) if isinstance(key, list) else key
+        return (note, midi_to_note_name(note), d_key)
+
+    def row_tags(self, note):
+        return () if note in self.temp_map else ("unmapped",)
+
+    def refresh_rows(self, notes):
+        for note in notes:
+            self.tree.item(str(note), values=self.row_values(note), tags=self.row_tags(note))
+
+    def apply(self, changes, what):
+        self.history.apply(changes)
+        self.refresh_rows(changes)
+        self.status.configure(text=f"{what}: {len(changes)} note(s) changed")
 
     def on_click(self, event):
         item = self.tree.identify('item', event.x, event.y)
         if not item: return
-        vals = self.tree.item(item, "values")
-        note = int(vals[0])
-        dialog = SleekKeyCapture(self, f"Press Key for {vals[1]}")
+        note = int(item)
+        dialog = SleekKeyCapture(self, f"Press Key for {midi_to_note_name(note)}")
         res = dialog.result
         if res is not None:
-            if res: self.temp_map[note] = res[0] if len(res)==1 else res
-            else: self.temp_map.pop(note, None)
-            self.populate()
+            new = (res[0] if len(res)==1 else res) if res else None
+            self.apply(diff(self.temp_map, {note: new}), midi_to_note_name(note))
+
+    def on_select(self, _event=None):
+        notes = [int(i) for i in self.tree.selection()]
+        if len(notes) < 2: return
+        for entry, note in ((self.low_entry, min(notes)), (self.high_entry, max(notes))):
+            entry.delete(0, "end")
+            entry.insert(0, midi_to_note_name(note))
+
+    def get_range(self):
+        try:
+            low, high = parse_note(self.low_entry.get()), parse_note(self.high_entry.get())
+        except ValueError as e:
+            self.status.configure(text=str(e))
+            return None
+        return (low, high) if low <= high else (high, low)
+
+    def map_keys(self):
+        rng = self.get_range()
+        keys = parse_key_sequence(self.keys_entry.get())
+        if not rng or not keys: return
+        notes = scale_notes(*rng, SCALES[self.scale_var.get()])
+        self.apply(map_sequence(self.temp_map, notes, keys), f"Mapped {min(len(notes), len(keys))} keys")
+
+    def shift(self, semitones):
+        rng = self.get_range()
+        if not rng: return
+        self.apply(shift_range(self.temp_map, *rng, semitones), f"Shifted {'up' if semitones > 0 else 'down'}")
+
+    def copy_from(self):
+        rng = self.get_range()
+        filename = self.copy_var.get()
+        if not rng or not filename: return
+        source_map, _ = load_profile_data(filename)
+        self.apply(copy_range(self.temp_map, source_map, *rng), f"Copied from {filename}")
+
+    def undo(self):
+        changes = self.history.undo()
+        self.refresh_rows(changes)
+        self.status.configure(text=f"Undo: {len(changes)} note(s)" if changes else "Nothing to undo")
+
+    def redo(self):
+        changes = self.history.redo()
+        self.refresh_rows(changes)
+        self.status.configure(text=f"Redo: {len(changes)} note(s)" if changes else "Nothing to redo")
 
     def clear(self):
         if messagebox.askyesno("Confirm", "Clear all bindings?"):
-            self.temp_map.clear()
-            self.populate()
+            self.apply(clear_range(self.temp_map), "Cleared")
 
     def save(self):
         self.callback(self.temp_map)
@@ -232,7 +429,7 @@ class HotkeyEditor(ctk.CTkToplevel):
     def __init__(self, parent, current_hotkeys, callback):
         super().__init__(parent)
         self.title("Global Hotkeys")
-        self.geometry("350x380")
+        self.geometry("350x460")
         self.callback = callback
         self.attributes("-topmost", True)
         self.hotkeys = current_hotkeys.copy()
@@ -246,6 +443,8 @@ class HotkeyEditor(ctk.CTkToplevel):
         self.btn_stop = self.create_row("Stop Playback", "stop")
         self.btn_t_up = self.create_row("Transpose Up", "transpose_up")
         self.btn_t_down = self.create_row("Transpose Down", "transpose_down")
+        self.btn_next = self.create_row("Next Track", "next_track")
+        self.btn_prev = self.create_row("Previous Track", "prev_track")
         
         ctk.CTkButton(self, text="Save & Close", command=self.save, fg_color=COLOR_LIVE_GO).pack(pady=20)
         self.grab_set()
@@ -268,6 +467,8 @@ class HotkeyEditor(ctk.CTkToplevel):
         elif key_key == "stop": btn = self.btn_stop
         elif key_key == "transpose_up": btn = self.btn_t_up
         elif key_key == "transpose_down": btn = self.btn_t_down
+        elif key_key == "next_track": btn = self.btn_next
+        elif key_key == "prev_track": btn = self.btn_prev
         
         if btn:
             btn.configure(text="Press key...", fg_color=COLOR_WARN, text_color=COLOR_TEXT_ON_WARN)
@@ -295,11 +496,11 @@ class HotkeyEditor(ctk.CTkToplevel):
         self.destroy()
 
 class ThemeEditor(ctk.CTkToplevel):
-    def __init__(self, parent, restart_callback):
+    def __init__(self, parent, apply_callback):
         super().__init__(parent)
         self.title("Theme Editor")
         self.geometry("700x600")
-        self.restart_callback = restart_callback
+        self.apply_callback = apply_callback
         self.attributes("-topmost", True)
         
         self.grid_columnconfigure(1, weight=1)
@@ -360,12 +561,12 @@ class ThemeEditor(ctk.CTkToplevel):
         action_bar = ctk.CTkFrame(self, height=60, fg_color="#1a1a1a")
         action_bar.grid(row=1, column=0, columnspan=2, sticky="ew")
         
-        ctk.CTkButton(action_bar, text="Apply & Restart", command=self.apply_theme, fg_color=COLOR_PRIMARY).pack(side="right", padx=20, pady=15)
+        ctk.CTkButton(action_bar, text="Apply", command=self.apply_theme, fg_color=COLOR_PRIMARY).pack(side="right", padx=20, pady=15)
         ctk.CTkButton(action_bar, text="Save Changes", command=self.save_theme, fg_color="#444").pack(side="right", padx=5, pady=15)
 
         self.populate_list()
         try:
-            idx = list(THEMES.keys()).index(CURRENT_THEME_NAME)
+            idx = list(THEMES.keys()).index(THEME.name)
             self.theme_listbox.selection_set(idx)
             self.on_theme_select(None)
         except: pass
@@ -422,7 +623,7 @@ class ThemeEditor(ctk.CTkToplevel):
         if not name: return
         new_data = {key: var.get() for key, var in self.color_vars.items()}
         THEMES[name] = new_data
-        self.write_config(current_theme=CURRENT_THEME_NAME)
+        self.write_config(current_theme=THEME.name)
         self.populate_list()
         messagebox.showinfo("Saved", f"Theme '{name}' saved.")
 
@@ -430,8 +631,7 @@ class ThemeEditor(ctk.CTkToplevel):
         name = self.name_var.get()
         self.save_theme()
         self.write_config(current_theme=name)
-        if messagebox.askyesno("Restart Required", "Restart now to apply theme?"):
-            self.restart_callback()
+        self.apply_callback(name)
 
     def write_config(self, current_theme):
         custom = {k: v for k, v in THEMES.items() if k not in DEFAULT_THEMES}
@@ -439,3 +639,379 @@ class ThemeEditor(ctk.CTkToplevel):
         try:
             with open(THEME_FILE, 'w') as f: json.dump(data, f, indent=4)
         except Exception as e: messagebox.showerror("Error", f"Could not save config: {e}")
+
+
+class EngineSettings(ctk.CTkToplevel):
+    def __init__(self, parent):
+        super().__init__(parent)
+        self.title("Engine Settings")
+        self.geometry("380x500")
+        self.attributes("-topmost", True)
+        self.parent = parent
+
+        ctk.CTkLabel(self, text="Playback Engine", font=ctk.CTkFont(size=14, weight="bold")).pack(pady=(20, 10))
+
+        mode_row = ctk.CTkFrame(self, fg_color="transparent")
+        mode_row.pack(fill="x", padx=20, pady=5)
+        ctk.CTkLabel(mode_row, text="Engine Mode").pack(side="left")
+        ctk.CTkOptionMenu(mode_row, values=ENGINE_MODES, variable=parent.engine_mode_var, command=parent.set_engine_mode,
+                          width=150, fg_color="#333", button_color="#444").pack(side="right")
+        ctk.CTkLabel(self, text="Separate Process runs file playback and live input in their own process, "
+                                "so UI work can't stall key timing. Asyncio runs everything on one event loop thread.",
+                     font=ctk.CTkFont(size=11), text_color=COLOR_TEXT_SUB, wraplength=330, justify="left").pack(padx=20, pady=(0, 10), anchor="w")
+
+        ctk.CTkSwitch(self, text="Real-time Priority", variable=parent.realtime_var, button_color=COLOR_PRIMARY, progress_color=COLOR_PRIMARY).pack(padx=20, pady=5, anchor="w")
+        core_row = ctk.CTkFrame(self, fg_color="transparent")
+        core_row.pack(fill="x", padx=20, pady=5)
+        ctk.CTkLabel(core_row, text="Pin Playback to CPU").pack(side="left")
+        ctk.CTkOptionMenu(core_row, values=["Auto"] + [str(i) for i in range(os.cpu_count() or 1)], variable=parent.cpu_core_var,
+                          width=90, fg_color="#333", button_color="#444").pack(side="right")
+        ctk.CTkLabel(self, text="Applied when playback or live input starts. Scheduling lateness is logged after each song.",
+                     font=ctk.CTkFont(size=11), text_color=COLOR_TEXT_SUB, wraplength=330, justify="left").pack(padx=20, pady=(0, 5), anchor="w")
+
+        net_row = ctk.CTkFrame(self, fg_color="transparent")
+        net_row.pack(fill="x", padx=20, pady=(10, 5))
+        ctk.CTkLabel(net_row, text="Network MIDI Jitter Buffer").pack(side="left")
+        ctk.CTkOptionMenu(net_row, values=NET_BUFFER_OPTIONS, variable=parent.net_buffer_var,
+                          width=90, fg_color="#333", button_color="#444").pack(side="right")
+        peers_row = ctk.CTkFrame(self, fg_color="transparent")
+        peers_row.pack(fill="x", padx=20, pady=5)
+        ctk.CTkLabel(peers_row, text="Network MIDI Peers").pack(side="left")
+        ctk.CTkEntry(peers_row, textvariable=parent.net_peers_var, width=150,
+                     placeholder_text="e.g. 192.168.1.20").pack(side="right")
+        ctk.CTkLabel(self, text="Only these hosts may send network MIDI. Left empty, only this computer can.",
+                     font=ctk.CTkFont(size=11), text_color=COLOR_TEXT_SUB, wraplength=330, justify="left").pack(padx=20, pady=(0, 5), anchor="w")
+
+        frame_row = ctk.CTkFrame(self, fg_color="transparent")
+        frame_row.pack(fill="x", padx=20, pady=(10, 0))
+        ctk.CTkLabel(frame_row, text="Frame-Aligned Output").pack(side="left")
+        ctk.CTkOptionMenu(frame_row, values=FRAME_RATE_OPTIONS, variable=parent.frame_rate_var,
+                          width=90, fg_color="#333", button_color="#444").pack(side="right")
+        ctk.CTkLabel(self, text="Batches key changes on the game's frame rate so a quick tap isn't missed between two input polls. "
+                                "Adds up to one frame of latency.",
+                     font=ctk.CTkFont(size=11), text_color=COLOR_TEXT_SUB, wraplength=330, justify="left").pack(padx=20, pady=(0, 5), anchor="w")
+
+        ctk.CTkSwitch(self, text=f"Control API (localhost:{CONTROL_PORT})", variable=parent.control_api_var,
+                      button_color=COLOR_PRIMARY, progress_color=COLOR_PRIMARY).pack(padx=20, pady=(10, 5), anchor="w")
+
+        ctk.CTkButton(self, text="Close", command=self.destroy, fg_color="#444").pack(pady=15)
+
+
+class PianoRollWindow(ctk.CTkToplevel):
+    """Scrolling piano roll of the loaded song.
+
+    Notes are laid out in song time on a canvas that scrolls with the
+    playhead. Only spans near the viewport own a canvas rectangle; items are
+    pooled and handed from notes leaving the view to notes entering it, so a
+    frame costs a few Tk calls however large the song is.
+    """
+    WINDOW = 8.0      # seconds visible
+    LEAD = 0.2        # playhead position as a fraction of the width
+    FPS = 30
+    PX_PER_SEC = 90
+
+    def __init__(self, parent):
+        super().__init__(parent)
+        self.title("Piano Roll")
+        self.geometry(f"{int(self.WINDOW * self.PX_PER_SEC) + 20}x320")
+        self.attributes("-topmost", True)
+        self.parent = parent
+        self.spans = None
+        self.view_start = 0.0
+        self.assigned = {}   # span index -> canvas item
+        self.free = []
+        self.cfg_version = None
+        self.colors = None
+        self.row_h = 1.0
+        self.song_info = ""
+
+        self.info = ctk.CTkLabel(self, text="No song loaded", font=ctk.CTkFont(size=12), text_color=COLOR_TEXT_SUB)
+        self.info.pack(pady=(8, 4))
+        self.canvas = tk.Canvas(self, bg=COLOR_BG, highlightthickness=0, xscrollincrement=1)
+        self.canvas.pack(fill="both", expand=True, padx=10, pady=(0, 4))
+        self.playhead = self.canvas.create_line(0, 0, 0, 0, fill=COLOR_TEXT_MAIN, width=2)
+        self.loop_rect = self.canvas.create_rectangle(0, 0, 0, 0, fill=COLOR_CARD, width=0, state="hidden")
+        legend = ctk.CTkFrame(self, fg_color="transparent")
+        legend.pack(pady=(0, 6))
+        for text, color in (("■ mapped", COLOR_PRIMARY), ("■ fallback", COLOR_WARN), ("■ unreachable", COLOR_DANGER)):
+            ctk.CTkLabel(legend, text=text, font=ctk.CTkFont(size=11), text_color=color).pack(side="left", padx=5)
+        ctk.CTkLabel(legend, text="· scroll to browse, double-click to seek", font=ctk.CTkFont(size=11), text_color=COLOR_TEXT_SUB).pack(side="left", padx=5)
+
+        self.canvas.bind("<Configure>", lambda e: self.relayout())
+        self.canvas.bind("<MouseWheel>", self.on_wheel)
+        THEME.subscribe(self, self.on_theme)
+        self.canvas.bind("<Double-Button-1>", self.on_double_click)
+        self._tick()
+
+    def set_song(self, spans, name):
+        self.spans = spans
+        self.view_start = 0.0
+        self.cfg_version = None
+        self.song_info = f"{name} · {len(spans)} notes · {midi_to_note_name(spans.low)}–{midi_to_note_name(spans.high)}"
+        self.info.configure(text=self.song_info)
+        self.relayout()
+
+    def relayout(self):
+        # Geometry changed: every pooled item has to be placed again
+        for item in self.assigned.values():
+            self.canvas.itemconfigure(item, state="hidden")
+            self.free.append(item)
+        self.assigned.clear()
+        if self.spans is None: return
+        height = max(1, self.canvas.winfo_height())
+        self.row_h = height / (self.spans.high - self.spans.low + 1)
+        self.canvas.configure(scrollregion=(0, 0, self.spans.duration * self.PX_PER_SEC + self.canvas.winfo_width(), height))
+        self.render()
+
+    def on_theme(self):
+        self.canvas.configure(bg=COLOR_BG)
+        self.canvas.itemconfigure(self.playhead, fill=COLOR_TEXT_MAIN)
+        self.canvas.itemconfigure(self.loop_rect, fill=COLOR_CARD)
+        # Forces update_colors to rebuild the palette on the next render
+        self.cfg_version = None
+        if self.spans is not None: self.render()
+
+    def update_colors(self):
+        cfg = self.parent.engine_config
+        if cfg.version == self.cfg_version: return False
+        self.cfg_version = cfg.version
+        cats = note_categories(cfg)
+        palette = {MAPPED: COLOR_PRIMARY, FALLBACK: COLOR_WARN, UNMAPPED: COLOR_DANGER}
+        self.colors = [palette[c] for c in cats]
+        mapped, fallback, unmapped = self.spans.category_counts(cats)
+        self.info.configure(text=f"{self.song_info} · mapped {mapped}, fallback {fallback}, unreachable {unmapped}")
+        return True
+
+    def render(self):
+        spans, canvas = self.spans, self.canvas
+        recolor = self.update_colors()
+        px, row_h, high = self.PX_PER_SEC, self.row_h, spans.high
+        t0 = self.view_start
+        visible = set(spans.visible(t0, t0 + self.WINDOW + 1.0))
+
+        assigned, free = self.assigned, self.free
+        released = [assigned.pop(i) for i in [i for i in assigned if i not in visible]]
+        free.extend(released)
+        for i in visible:
+            item = assigned.get(i)
+            if item is None:
+                item = free.pop() if free else canvas.create_rectangle(0, 0, 0, 0, width=0)
+                y = (high - spans.notes[i]) * row_h
+                canvas.coords(item, spans.starts[i] * px, y, max(spans.ends[i] * px, spans.starts[i] * px + 2), y + max(1.0, row_h - 1))
+                canvas.itemconfigure(item, fill=self.colors[spans.notes[i]], state="normal")
+                assigned[i] = item
+            elif recolor:
+                canvas.itemconfigure(item, fill=self.colors[spans.notes[i]])
+        # Only items freed this frame and not reused need hiding; the rest already are
+        if released:
+            still_free = set(free)
+            for item in released:
+                if item in still_free: canvas.itemconfigure(item, state="hidden")
+
+        cfg = self.parent.engine_config
+        if loop_active(cfg):
+            canvas.coords(self.loop_rect, cfg.loop_a * px, 0, min(cfg.loop_b, spans.duration) * px, canvas.winfo_height())
+            canvas.itemconfigure(self.loop_rect, state="normal")
+            canvas.tag_lower(self.loop_rect)
+        else:
+            canvas.itemconfigure(self.loop_rect, state="hidden")
+
+        total = spans.duration * px + canvas.winfo_width()
+        canvas.xview_moveto(t0 * px / total if total else 0)
+        canvas.tag_raise(self.playhead)
+
+    def _tick(self):
+        if not self.winfo_exists(): return
+        if self.spans is not None:
+            if self.parent.file_playing:
+                pos = self.parent.playback_position()
+                self.view_start = max(0.0, pos - self.LEAD * self.WINDOW)
+                x = pos * self.PX_PER_SEC
+                self.canvas.coords(self.playhead, x, 0, x, self.canvas.winfo_height())
+                self.render()
+            elif self.parent.engine_config.version != self.cfg_version:
+                self.render()
+        self.after(1000 // self.FPS, self._tick)
+
+    def on_wheel(self, event):
+        if self.spans is None or self.parent.file_playing: return
+        self.view_start = min(max(0.0, self.view_start - event.delta / 120), self.spans.duration)
+        self.render()
+
+    def on_double_click(self, event):
+        if self.spans is None: return
+        self.parent.seek_file(self.canvas.canvasx(event.x) / self.PX_PER_SEC)
+
+
+class LayersWindow(ctk.CTkToplevel):
+    """Songs played together on one clock, each with its own mute, solo, transpose, offset and profile."""
+    CURRENT_KEYMAP = "Current keymap"
+
+    def __init__(self, parent):
+        super().__init__(parent)
+        self.title("Layers")
+        self.geometry("640x380")
+        self.attributes("-topmost", True)
+        self.parent = parent
+        self.layer_set = parent.layer_set
+
+        self.grid_columnconfigure(0, weight=1)
+        self.grid_rowconfigure(1, weight=1)
+
+        top_frame = ctk.CTkFrame(self, fg_color="transparent")
+        top_frame.grid(row=0, column=0, sticky="ew", padx=20, pady=15)
+        ctk.CTkLabel(top_frame, text="Layered Playback", font=ctk.CTkFont(size=16, weight="bold")).pack(side="left")
+        ctk.CTkButton(top_frame, text="+ Add Files", width=90, fg_color=COLOR_LIVE_GO, command=self.add_files).pack(side="right")
+
+        self.scroll = ctk.CTkScrollableFrame(self, fg_color="#222")
+        self.scroll.grid(row=1, column=0, sticky="nsew", padx=20)
+
+        action_frame = ctk.CTkFrame(self, fg_color="transparent")
+        action_frame.grid(row=2, column=0, pady=15)
+        ctk.CTkButton(action_frame, text="▶ Play Layers", command=parent.play_layers, fg_color=COLOR_FILE_GO).pack(side="left", padx=5)
+        ctk.CTkButton(action_frame, text="⏹ Stop", command=parent.stop_file, fg_color=COLOR_DANGER).pack(side="left", padx=5)
+
+        parent.scan_profiles()
+        self.profile_names = [self.CURRENT_KEYMAP] + [p["filename"] for p in parent.profile_cache]
+        self.populate()
+
+    def add_files(self):
+        paths = filedialog.askopenfilenames(parent=self, filetypes=[("MIDI files", "*.mid *.midi")])
+        for path in paths:
+            layer = Layer(path)
+            self.layer_set.add(layer)
+            layer.load(lambda l: self.parent.after(0, self.on_loaded, l))
+        self.populate()
+
+    def on_loaded(self, layer):
+        if layer.error: self.parent.log(f"Layer {os.path.basename(layer.path)} failed: {layer.error}")
+        if self.winfo_exists(): self.populate()
+
+    def populate(self):
+        for widget in self.scroll.winfo_children(): widget.destroy()
+        if not len(self.layer_set):
+            ctk.CTkLabel(self.scroll, text="Add MIDI files to play them together", text_color="gray").pack(pady=20)
+        for layer in self.layer_set:
+            self.build_row(layer)
+
+    def build_row(self, layer):
+        row = ctk.CTkFrame(self.scroll, fg_color="#2b2b2b")
+        row.pack(fill="x", pady=2)
+
+        name = os.path.basename(layer.path)
+        status = "loading..." if not layer.ready and not layer.error else ("failed" if layer.error else f"{layer.song.duration:.0f}s")
+        ctk.CTkLabel(row, text=f"{name} ({status})", width=150, anchor="w", font=ctk.CTkFont(size=12, weight="bold")).pack(side="left", padx=10, pady=5)
+
+        ctk.CTkButton(row, text="✕", width=26, height=24, fg_color="transparent", hover_color=COLOR_DANGER, command=lambda: self.remove(layer)).pack(side="right", padx=5)
+
+        profile_var = ctk.StringVar(value=layer.profile or self.CURRENT_KEYMAP)
+        ctk.CTkOptionMenu(row, values=self.profile_names, variable=profile_var, width=120, height=24, fg_color="#333", button_color="#444",
+                          command=lambda v: layer.set_profile(None if v == self.CURRENT_KEYMAP else v, self.parent.engine_config.fallback)).pack(side="right", padx=5)
+
+        offset_entry = ctk.CTkEntry(row, width=45, height=24)
+        offset_entry.insert(0, f"{layer.offset:g}")
+        offset_entry.pack(side="right")
+        def set_offset(_event=None):
+            try:
+                layer.offset = max(0.0, float(offset_entry.get()))
+            except ValueError:
+                offset_entry.delete(0, "end")
+                offset_entry.insert(0, f"{layer.offset:g}")
+        offset_entry.bind("<Return>", set_offset)
+        offset_entry.bind("<FocusOut>", set_offset)
+        ctk.CTkLabel(row, text="Delay s", font=ctk.CTkFont(size=11)).pack(side="right", padx=(10, 4))
+
+        transpose_lbl = ctk.CTkLabel(row, text=f"{layer.transpose:+d}", width=28)
+        def nudge(step):
+            layer.transpose += step
+            transpose_lbl.configure(text=f"{layer.transpose:+d}")
+        ctk.CTkButton(row, text="+", width=22, height=24, fg_color="#444", command=lambda: nudge(1)).pack(side="right")
+        transpose_lbl.pack(side="right")
+        ctk.CTkButton(row, text="-", width=22, height=24, fg_color="#444", command=lambda: nudge(-1)).pack(side="right")
+
+        solo_var = tk.BooleanVar(value=layer.solo)
+        ctk.CTkCheckBox(row, text="S", width=40, variable=solo_var, command=lambda: setattr(layer, "solo", solo_var.get())).pack(side="right")
+        mute_var = tk.BooleanVar(value=layer.mute)
+        ctk.CTkCheckBox(row, text="M", width=40, variable=mute_var, command=lambda: setattr(layer, "mute", mute_var.get())).pack(side="right")
+
+    def remove(self, layer):
+        self.layer_set.remove(layer)
+        self.populate()
+
+
+class NoteHeatmap(ctk.CTkFrame):
+    """Per-note outcome counts: one row per outcome, one column per MIDI note.
+
+    Intensity is log-scaled against the busiest note of each row. The canvas
+    cells are created once and only recoloured when their level changes.
+    """
+    CELL_W = 3
+    ROW_H = 12
+    LABEL_W = 74
+    LEVELS = 8
+    REFRESH_MS = 500
+    ROW_LABELS = ("exact", "fallback", "unmapped", "focus-gated", "out of range")
+
+    def __init__(self, master, counters):
+        super().__init__(master, fg_color="transparent")
+        self.counters = counters
+        rows = len(NOTE_OUTCOMES)
+        self.canvas = tk.Canvas(self, width=self.LABEL_W + 128 * self.CELL_W, height=rows * self.ROW_H + 12, bg=COLOR_BG, highlightthickness=0)
+        self.canvas.pack()
+        self.info = ctk.CTkLabel(self, text="Hover a note for its counts", font=ctk.CTkFont(size=11), text_color=COLOR_TEXT_SUB)
+        self.info.pack()
+
+        self.make_palettes()
+
+        self.cells = []
+        for outcome in range(rows):
+            y = outcome * self.ROW_H
+            self.canvas.create_text(self.LABEL_W - 6, y + self.ROW_H / 2, text=self.ROW_LABELS[outcome], anchor="e", fill=COLOR_TEXT_SUB, font=("Segoe UI", 8), tags="label")
+            self.cells.append([self.canvas.create_rectangle(self.LABEL_W + n * self.CELL_W, y + 1, self.LABEL_W + (n + 1) * self.CELL_W, y + self.ROW_H - 1,
+                                                            width=0, fill=self.palettes[outcome][0]) for n in range(128)])
+        for n in range(0, 128, 12):
+            self.canvas.create_text(self.LABEL_W + n * self.CELL_W, rows * self.ROW_H + 6, text=midi_to_note_name(n), anchor="w", fill=COLOR_TEXT_SUB, font=("Segoe UI", 7), tags="label")
+        self.shown = [[0] * 128 for _ in range(rows)]
+
+        self.canvas.bind("<Motion>", self.on_hover)
+        THEME.subscribe(self, self.on_theme)
+        self.refresh()
+
+    def make_palettes(self):
+        self.palettes = []
+        for outcome in range(len(NOTE_OUTCOMES)):
+            base = COLOR_PRIMARY if outcome == NOTE_EXACT else COLOR_WARN if outcome == NOTE_FALLBACK else COLOR_DANGER
+            self.palettes.append([self.blend("#303030", base, level / self.LEVELS) for level in range(self.LEVELS + 1)])
+
+    def on_theme(self):
+        self.make_palettes()
+        canvas = self.canvas
+        canvas.configure(bg=COLOR_BG)
+        canvas.itemconfigure("label", fill=COLOR_TEXT_SUB)
+        for cells, shown, palette in zip(self.cells, self.shown, self.palettes):
+            for note, level in enumerate(shown):
+                canvas.itemconfigure(cells[note], fill=palette[level])
+
+    def blend(self, c1, c2, f):
+        (r1, g1, b1), (r2, g2, b2) = self.winfo_rgb(c1), self.winfo_rgb(c2)
+        mix = lambda a, b: int((a + (b - a) * f) / 257)
+        return f"#{mix(r1, r2):02x}{mix(g1, g2):02x}{mix(b1, b2):02x}"
+
+    def refresh(self):
+        if not self.winfo_exists(): return
+        canvas = self.canvas
+        for outcome, counts in enumerate(self.counters.notes):
+            shown, cells, palette = self.shown[outcome], self.cells[outcome], self.palettes[outcome]
+            scale = self.LEVELS / math.log1p(max(counts) or 1)
+            for note, count in enumerate(counts):
+                level = min(self.LEVELS, math.ceil(math.log1p(count) * scale)) if count else 0
+                if level != shown[note]:
+                    shown[note] = level
+                    canvas.itemconfigure(cells[note], fill=palette[level])
+        self.after(self.REFRESH_MS, self.refresh)
+
+    def on_hover(self, event):
+        note = (event.x - self.LABEL_W) // self.CELL_W
+        if not 0 <= note < 128: return
+        counts = ", ".join(f"{label} {c[note]}" for label, c in zip(self.ROW_LABELS, self.counters.notes))
+        self.info.configure(text=f"{midi_to_note_name(note)} ({note}): {counts}")
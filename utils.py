@@ -3,6 +3,7 @@ import json
 import os
 import sys
 import pydirectinput
+from hotkeys import INJECTED_KEYS
 from tkinter import messagebox
 
 # --- Windows API Helpers ---
@@ -74,7 +75,7 @@ def load_profile_data(filename):
     
     # Default name derived from filename
     display_name = os.path.splitext(os.path.basename(filename))[0].replace("_", " ").title()
-    default_meta = {"name": display_name, "linked_window": "", "hotkeys": {"play_pause": "f9", "stop": "f10", "transpose_up": "page up", "transpose_down": "page down"}}
+    default_meta = {"name": display_name, "linked_window": "", "hotkeys": {"play_pause": "f9", "stop": "f10", "transpose_up": "page up", "transpose_down": "page down", "next_track": "end", "prev_track": "home"}}
     
     try:
         with open(target_path, 'r') as f:
@@ -88,7 +89,7 @@ def load_profile_data(filename):
                     meta["hotkeys"] = default_meta["hotkeys"]
                 
                 # Ensure new keys exist in old profiles
-                for k, v in [("transpose_up", "page up"), ("transpose_down", "page down")]:
+                for k, v in [("transpose_up", "page up"), ("transpose_down", "page down"), ("next_track", "end"), ("prev_track", "home")]:
                     if k not in meta["hotkeys"]: meta["hotkeys"][k] = v
                 
                 mappings = {int(k): v for k, v in data["mappings"].items()} if "mappings" in data else create_default_88_key_map()
@@ -110,11 +111,60 @@ def save_profile_data(filename, key_map, metadata):
 def press_keys_for_midi(keys, action='down'):
     if not keys: return
     if not isinstance(keys, list): keys = [keys]
+    INJECTED_KEYS.mark(keys)
     if action == 'down':
         for key in keys: pydirectinput.keyDown(key)
     else:
         for key in keys: pydirectinput.keyUp(key)
 
+# Keys pydirectinput sends with the extended-key flag
+_EXTENDED_KEYS = ('up', 'down', 'left', 'right')
+
+def press_key_batch(transitions):
+    """Sends [(key, is_down), ...] in order as one SendInput call instead of one per key."""
+    if not transitions: return
+    INJECTED_KEYS.mark([k for k, _ in transitions])
+    try:
+        mapping = pydirectinput.KEYBOARD_MAPPING
+        inputs = (pydirectinput.Input * len(transitions))()
+    except AttributeError:
+        # pydirectinput without its SendInput internals: one call per key
+        for key, is_down in transitions:
+            (pydirectinput.keyDown if is_down else pydirectinput.keyUp)(key)
+        return
+    extra = ctypes.c_ulong(0)
+    n = 0
+    for key, is_down in transitions:
+        code = mapping.get(key)
+        if code is None: continue
+        flags = pydirectinput.KEYEVENTF_SCANCODE
+        if not is_down: flags |= pydirectinput.KEYEVENTF_KEYUP
+        if key in _EXTENDED_KEYS: flags |= pydirectinput.KEYEVENTF_EXTENDEDKEY
+        ii = pydirectinput.Input_I()
+        ii.ki = pydirectinput.KeyBdInput(0, code, flags, 0, ctypes.pointer(extra))
+        inputs[n] = pydirectinput.Input(ctypes.c_ulong(1), ii)
+        n += 1
+    if n: pydirectinput.SendInput(n, inputs, ctypes.sizeof(pydirectinput.Input))
+
+def resolve_note_keys(note, key_map, fallback=True):
+    key = key_map.get(note)
+    if key: return key
+    if fallback:
+        return find_fallback_key(note, key_map)
+    return None
+
+def note_transition(msg, transpose=0):
+    """Returns (transposed_note, is_down) for note messages, None for anything else or out of range."""
+    if msg.type == 'note_on' and msg.velocity > 0:
+        is_down = True
+    elif msg.type == 'note_off' or msg.type == 'note_on':
+        is_down = False
+    else:
+        return None
+    note_val = msg.note + transpose
+    if not (0 <= note_val <= 127): return None
+    return note_val, is_down
+
 def find_fallback_key(note, key_map):
     target_pitch_class = note % 12
     candidates = [k for k in key_map if k % 12 == target_pitch_class]
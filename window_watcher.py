@@ -0,0 +1,159 @@
+import ctypes
+import re
+import threading
+import time
+
+DEBOUNCE = 0.4
+POLL_INTERVAL = 0.5
+
+EVENT_SYSTEM_FOREGROUND = 0x0003
+WINEVENT_OUTOFCONTEXT = 0x0000
+WINEVENT_SKIPOWNPROCESS = 0x0002
+WM_QUIT = 0x0012
+
+
+def _trie_regex(node):
+    """Regex source for a char trie. Shared prefixes are matched once, and
+    greedy optionals make the longest pattern win at a given position."""
+    alts = [re.escape(ch) + _trie_regex(child) for ch, child in sorted(node.items()) if ch]
+    if not alts: return ""
+    body = alts[0] if len(alts) == 1 else "(?:" + "|".join(alts) + ")"
+    return f"(?:{body})?" if "" in node else body
+
+
+class WindowMatcher:
+    """All `linked_window` patterns compiled into one case-insensitive matcher.
+
+    Patterns are merged into a trie-shaped regex, so a title is scanned once no
+    matter how many profiles exist. The leftmost match in the title wins; of
+    patterns matching at the same position the longest wins, so "Genshin
+    Impact Beta" beats "Genshin".
+    """
+
+    def __init__(self, profiles):
+        self.targets = {}
+        trie = {}
+        for prof in profiles:
+            link = prof["metadata"].get("linked_window", "").strip().lower()
+            if not link or link in self.targets: continue
+            self.targets[link] = prof["filename"]
+            node = trie
+            for ch in link:
+                node = node.setdefault(ch, {})
+            node[""] = True
+        self.regex = re.compile(_trie_regex(trie)) if trie else None
+
+    def match(self, title):
+        if self.regex is None or not title: return None
+        m = self.regex.search(title.lower())
+        return self.targets.get(m.group(0)) if m else None
+
+    def match_any(self, titles):
+        for title in titles:
+            filename = self.match(title)
+            if filename: return filename
+        return None
+
+
+class WindowWatcher:
+    """Reports the profile linked to the foreground window once it settles.
+
+    A source thread calls `notify(title)` on every foreground change. The
+    watcher thread waits until the title has been stable for `debounce`
+    seconds before calling `on_match(filename)`, so alt-tab flapping doesn't
+    thrash the active profile. A settled title is matched even when it
+    repeats: the hook never reports our own window, so returning to a game
+    after switching profiles by hand arrives as the same title again.
+    """
+
+    def __init__(self, get_matcher, on_match, debounce=DEBOUNCE, get_title=None, log=print):
+        self.get_matcher = get_matcher
+        self.on_match = on_match
+        self.debounce = debounce
+        self.get_title = get_title
+        self.log = log
+        self.cond = threading.Condition()
+        self.pending = None
+        self.changed_at = 0.0
+        self.running = False
+        self._source_thread_id = None
+
+    def start(self):
+        self.running = True
+        threading.Thread(target=self._debounce_loop, daemon=True).start()
+        # get_title given explicitly (tests, other platforms) means plain polling
+        if self.get_title is None and hasattr(ctypes, "windll"):
+            target = self._win32_source
+        else:
+            target = self._poll_source
+        threading.Thread(target=target, daemon=True).start()
+
+    def stop(self):
+        with self.cond:
+            self.running = False
+            self.cond.notify_all()
+        if self._source_thread_id:
+            ctypes.windll.user32.PostThreadMessageW(self._source_thread_id, WM_QUIT, 0, 0)
+
+    def notify(self, title):
+        with self.cond:
+            self.pending = title
+            self.changed_at = time.monotonic()
+            self.cond.notify_all()
+
+    def _debounce_loop(self):
+        while True:
+            with self.cond:
+                while self.running and self.pending is None:
+                    self.cond.wait()
+                if not self.running: return
+                remaining = self.changed_at + self.debounce - time.monotonic()
+                if remaining > 0:
+                    self.cond.wait(remaining)
+                    continue
+                title, self.pending = self.pending, None
+
+            filename = self.get_matcher().match(title)
+            if filename:
+                self.on_match(filename)
+
+    def _poll_source(self):
+        get_title = self.get_title
+        if get_title is None:
+            return
+        last = None
+        while self.running:
+            title = get_title()
+            if title != last:
+                last = title
+                self.notify(title)
+            time.sleep(POLL_INTERVAL)
+
+    def _win32_source(self):
+        from ctypes import wintypes
+        user32 = ctypes.windll.user32
+        self._source_thread_id = ctypes.windll.kernel32.GetCurrentThreadId()
+
+        def title_of(hwnd):
+            length = user32.GetWindowTextLengthW(hwnd)
+            buf = ctypes.create_unicode_buffer(length + 1)
+            user32.GetWindowTextW(hwnd, buf, length + 1)
+            return buf.value
+
+        WinEventProc = ctypes.WINFUNCTYPE(None, wintypes.HANDLE, wintypes.DWORD, wintypes.HWND,
+                                          wintypes.LONG, wintypes.LONG, wintypes.DWORD, wintypes.DWORD)
+        proc = WinEventProc(lambda hook, event, hwnd, obj, child, thread, ms: self.notify(title_of(hwnd)))
+        hook = user32.SetWinEventHook(EVENT_SYSTEM_FOREGROUND, EVENT_SYSTEM_FOREGROUND, 0, proc, 0, 0,
+                                      WINEVENT_OUTOFCONTEXT | WINEVENT_SKIPOWNPROCESS)
+        if not hook:
+            self.log("Foreground hook unavailable, polling the active window instead")
+            self._source_thread_id = None
+            self.get_title = lambda: title_of(user32.GetForegroundWindow())
+            self._poll_source()
+            return
+
+        msg = wintypes.MSG()
+        while self.running and user32.GetMessageW(ctypes.byref(msg), 0, 0, 0) > 0:
+            user32.TranslateMessage(ctypes.byref(msg))
+            user32.DispatchMessageW(ctypes.byref(msg))
+        user32.UnhookWinEvent(hook)